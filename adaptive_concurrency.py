@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+自适应并发控制（AIMD）
+统计最近一批详情页请求的成功率、超时率和P95延迟：全部正常时并发浏览器数加1、单浏览器请求速率加一个步长，
+出现拥塞（成功率过低、超时过多或延迟过高）时两者都乘以缩减系数；并发数和速率始终限制在配置范围内，
+每次调整都写入日志和指标CSV（已在上限或下限而数值不变时记为“保持”）
+"""
+
+import os
+import csv
+import math
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+METRIC_FIELDNAMES = ['时间', '样本数', '成功率', '超时率', 'P95延迟秒', '并发数', '请求速率', '动作']
+
+
+class AIMDController:
+    def __init__(self, min_workers=1, max_workers=4, initial_workers=1, min_rate=0.1, max_rate=1.0, initial_rate=0.5,
+                 rate_step=0.05, decrease_factor=0.5, window=30, min_samples=10, adjust_interval=30,
+                 target_success=0.9, max_timeout_rate=0.1, latency_target=15.0, metrics_file=None):
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor必须在0和1之间")
+
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.workers = max(min_workers, min(initial_workers, max_workers))  # 当前允许同时请求的浏览器数
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = max(min_rate, min(initial_rate, max_rate))  # 单个浏览器每秒请求数
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.min_samples = min_samples          # 窗口内至少这么多个结果才做判断
+        self.adjust_interval = adjust_interval  # 两次调整的最小间隔（秒），让上次调整的效果先体现出来
+        self.target_success = target_success
+        self.max_timeout_rate = max_timeout_rate
+        self.latency_target = latency_target    # P95页面加载时间上限（秒）
+        self.metrics_file = metrics_file
+
+        self.results = deque(maxlen=window)     # [(成功, 超时, 延迟秒)]
+        self.condition = threading.Condition()
+        self.active = 0
+        self.last_adjust = time.monotonic()
+        self.local = threading.local()
+
+    @contextmanager
+    def slot(self):
+        """占用一个请求名额，超出当前并发数的浏览器在此等待"""
+        with self.condition:
+            while self.active >= self.workers:
+                self.condition.wait()
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= 1
+                self.condition.notify_all()
+
+    def pace(self):
+        """按当前请求速率等待，间隔从本线程上一次请求开始计算"""
+        interval = 1.0 / self.rate
+        last = getattr(self.local, 'last_request', None)
+        now = time.monotonic()
+        if last is not None and now - last < interval:
+            time.sleep(interval - (now - last))
+        self.local.last_request = time.monotonic()
+
+    def record(self, success, timed_out=False, latency=None):
+        """记录一次详情页请求的结果，latency为页面加载秒数"""
+        with self.condition:
+            self.results.append((success, timed_out, latency))
+        self.maybe_adjust()
+
+    def window_stats(self):
+        results = list(self.results)
+        if not results:
+            return 0, 1.0, 0.0, 0.0
+        latencies = sorted(latency for _, _, latency in results if latency is not None)
+        p95 = latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)] if latencies else 0.0
+        return (len(results), sum(1 for success, _, _ in results if success) / len(results),
+                sum(1 for _, timed_out, _ in results if timed_out) / len(results), p95)
+
+    def maybe_adjust(self):
+        """窗口样本足够且距上次调整超过间隔时，按AIMD规则调整并发数和请求速率"""
+        with self.condition:
+            if len(self.results) < self.min_samples or time.monotonic() - self.last_adjust < self.adjust_interval:
+                return None
+
+            samples, success_rate, timeout_rate, p95 = self.window_stats()
+            previous = (self.workers, self.rate)
+            congested = (success_rate < self.target_success or timeout_rate > self.max_timeout_rate
+                         or p95 > self.latency_target)
+            if congested:
+                self.workers = max(self.min_workers, int(self.workers * self.decrease_factor))
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                action = '减小'
+            else:
+                self.workers = min(self.max_workers, self.workers + 1)
+                self.rate = min(self.max_rate, self.rate + self.rate_step)
+                action = '增大'
+            if (self.workers, self.rate) == previous:
+                action = '保持'  # 已在上限或下限，数值没有变化
+
+            # 调整后重新积累样本，避免旧结果反复触发
+            self.results.clear()
+            self.last_adjust = time.monotonic()
+            self.condition.notify_all()
+
+        metrics = {
+            '时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            '样本数': samples,
+            '成功率': round(success_rate, 3),
+            '超时率': round(timeout_rate, 3),
+            'P95延迟秒': round(p95, 2),
+            '并发数': self.workers,
+            '请求速率': round(self.rate, 3),
+            '动作': action
+        }
+        log = logging.debug if action == '保持' else logging.info
+        log(f"并发控制{action}: 成功率{success_rate:.1%} 超时率{timeout_rate:.1%} P95延迟{p95:.1f}秒 -> "
+            f"并发{self.workers} 速率{self.rate:.2f}次/秒")
+        self.write_metrics(metrics)
+        return metrics
+
+    def write_metrics(self, metrics):
+        if not self.metrics_file:
+            return
+        try:
+            new_file = not os.path.exists(self.metrics_file)
+            with open(self.metrics_file, 'a', newline='', encoding='utf-8-sig') as f:
+                writer = csv.DictWriter(f, fieldnames=METRIC_FIELDNAMES)
+                if new_file:
+                    writer.writeheader()
+                writer.writerow(metrics)
+        except Exception as e:
+            logging.error(f"写入并发控制指标失败: {e}")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+异步日志
+日志记录经QueueHandler放入队列，由QueueListener后台线程写入按大小轮转并gzip压缩的文件；
+逐字段的“成功提取”类消息改为按类型计数、定期汇总输出，其余高频消息可按类型抽样
+"""
+
+import os
+import re
+import gzip
+import time
+import queue
+import atexit
+import shutil
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# 以这些前缀开头的INFO消息只计数，不逐条输出
+DEFAULT_AGGREGATE_PREFIXES = (
+    '成功提取', '提取成功', '通过JavaScript成功提取', '通过遍历找到发表时间', '找到时间线文本',
+    '最终交互数据', '成功获取评论信息', '提取到', '已移除fn-hide类', '通过JavaScript显示了',
+    '已滚动到页面中间位置', '尝试触发隐藏的交互数据元素显示', '在options容器中成功找到交互数据'
+)
+
+
+def message_type(message):
+    """消息类型：冒号前的部分，数字替换为N"""
+    head = re.split(r'[:：]', message, maxsplit=1)[0]
+    return re.sub(r'\d+', 'N', head)[:40]
+
+
+class GzipRotatingFileHandler(RotatingFileHandler):
+    """按大小轮转，轮转出的旧文件压缩为.gz"""
+
+    def __init__(self, filename, max_bytes=50 * 1024 * 1024, backup_count=10, encoding='utf-8'):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.namer = lambda name: f"{name}.gz"
+        self.rotator = self.compress
+
+    @staticmethod
+    def compress(source, dest):
+        with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+class SamplingFilter(logging.Filter):
+    """按消息类型抽样，rates为 {消息前缀: 保留比例}，WARNING及以上级别不抽样"""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+
+        message = record.getMessage()
+        for prefix, rate in self.rates.items():
+            if message.startswith(prefix):
+                every = max(1, round(1 / rate)) if rate > 0 else 0
+                if not every:
+                    return False
+                with self.lock:
+                    count = self.counts.get(prefix, 0)
+                    self.counts[prefix] = count + 1
+                return count % every == 0
+        return True
+
+
+class CounterFilter(logging.Filter):
+    """将指定前缀的INFO消息转为计数，每隔interval秒输出一次汇总"""
+
+    def __init__(self, prefixes=DEFAULT_AGGREGATE_PREFIXES, interval=60):
+        super().__init__()
+        self.prefixes = tuple(prefixes)
+        self.interval = interval
+        self.counts = {}
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.local = threading.local()  # 正在输出汇总的线程，其自身的日志不再计数
+
+    def filter(self, record):
+        if record.levelno != logging.INFO or getattr(self.local, 'flushing', False):
+            return True
+
+        message = record.getMessage()
+        if not message.startswith(self.prefixes):
+            return True
+
+        with self.lock:
+            key = message_type(message)
+            self.counts[key] = self.counts.get(key, 0) + 1
+            due = time.monotonic() - self.last_flush >= self.interval
+
+        if due:
+            self.flush()
+        return False
+
+    def flush(self):
+        """输出并清空当前计数"""
+        with self.lock:
+            if not self.counts:
+                self.last_flush = time.monotonic()
+                return
+            counts, self.counts = self.counts, {}
+            elapsed = time.monotonic() - self.last_flush
+            self.last_flush = time.monotonic()
+
+        summary = ", ".join(f"{key}×{count}" for key, count in sorted(counts.items(), key=lambda x: -x[1]))
+        self.local.flushing = True
+        try:
+            logging.info(f"字段提取统计(近{elapsed:.0f}秒): {summary}")
+        finally:
+            self.local.flushing = False
+
+
+def setup_logging(log_file, level=logging.INFO, async_mode=True, max_bytes=50 * 1024 * 1024, backup_count=10,
+                  aggregate_prefixes=DEFAULT_AGGREGATE_PREFIXES, counter_interval=60, sample_rates=None):
+    """配置根日志：文件轮转压缩，控制台输出，可选异步写入、计数汇总和抽样"""
+    file_handler = GzipRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count)
+    stream_handler = logging.StreamHandler()
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    filters = []
+    if aggregate_prefixes:
+        filters.append(CounterFilter(aggregate_prefixes, counter_interval))
+    if sample_rates:
+        filters.append(SamplingFilter(sample_rates))
+
+    if async_mode:
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        listener = QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+        entry_handlers = [queue_handler]
+        listener.start()
+    else:
+        listener = None
+        entry_handlers = [file_handler, stream_handler]
+
+    for handler in entry_handlers:
+        root.addHandler(handler)
+
+    # 异步模式下所有记录都经过同一个QueueHandler；同步模式挂在根日志上，避免每个handler各计数一次
+    filter_target = entry_handlers[0] if async_mode else root
+    for log_filter in filters:
+        filter_target.addFilter(log_filter)
+
+    stopped = threading.Event()
+
+    def shutdown():
+        """输出剩余计数并等待后台线程写完队列，可重复调用"""
+        if stopped.is_set():
+            return
+        stopped.set()
+        for log_filter in filters:
+            if isinstance(log_filter, CounterFilter):
+                log_filter.flush()
+        if listener:
+            listener.stop()
+
+    atexit.register(shutdown)
+    return shutdown
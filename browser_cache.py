@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+浏览器持久化磁盘缓存
+每个浏览器（工作线程/进程）使用固定名称的持久化配置目录（--user-data-dir）和磁盘缓存目录（--disk-cache-dir），
+浏览器重启后JS、CSS、字体等静态资源直接从磁盘缓存读取；新建的配置目录从预热过的模板复制，
+没有模板时第一个关闭的浏览器把自己的配置目录保存为模板；缓存大小由Chrome按 --disk-cache-size 自行淘汰。
+配置目录使用期间持有文件锁，同一台机器上共用缓存目录的多个进程不会打开同一个配置目录（Chrome不允许）
+每个页面的传输字节数（Performance API 的 transferSize，命中缓存的资源为0）和加载耗时写入指标CSV，
+按 冷启动/模板/复用 和 首页/后续页 汇总，用于对比启用缓存前后的每页流量和首页延迟
+"""
+
+import os
+import csv
+import shutil
+import logging
+import threading
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，改用msvcrt
+    fcntl = None
+    import msvcrt
+
+# Chrome运行时的锁文件，复制配置目录时跳过
+PROFILE_LOCK_FILES = ('SingletonLock', 'SingletonSocket', 'SingletonCookie', 'lockfile')
+
+# 页面及其资源的传输字节数；transferSize为0而decodedBodySize大于0表示从缓存读取
+PAGE_BYTES_JS = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var result = {bytes: 0, resources: 0, cached: 0};
+entries.forEach(function(entry) {
+    result.bytes += entry.transferSize || 0;
+    if (entry.entryType === 'resource') {
+        result.resources += 1;
+        if (!entry.transferSize && entry.decodedBodySize) result.cached += 1;
+    }
+});
+return result;
+"""
+
+METRIC_FIELDNAMES = ['时间', '浏览器', '缓存状态', '首页', '加载秒', '传输字节', '资源数', '缓存命中数', '链接']
+
+
+def lock_file(path):
+    """以非阻塞方式对文件加排他锁，成功返回打开的文件对象，已被其他进程锁定时返回None；
+    持有锁的进程退出时锁自动释放"""
+    f = open(path, 'a+')
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return f
+    except OSError:
+        f.close()
+        return None
+
+
+def unlock_file(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    finally:
+        f.close()
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return total
+
+
+class BrowserProfileCache:
+    def __init__(self, root_dir="browser_cache", max_mb=500, template_dir=None, metrics_file=None):
+        self.root_dir = root_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)  # 单个浏览器磁盘缓存的大小上限
+        self.template_dir = template_dir or os.path.join(root_dir, "template")
+        self.metrics_file = metrics_file
+        self.lock = threading.Lock()
+        self.in_use = {}  # 槽位名 -> 配置目录的文件锁
+        self.states = {}  # 配置目录 -> 缓存状态（冷启动/模板/复用）
+        self.records = []  # [(缓存状态, 首页, 加载秒, 传输字节)]
+        os.makedirs(os.path.join(root_dir, "profiles"), exist_ok=True)
+
+    def acquire(self, name):
+        """取得名为name的浏览器配置目录，同名目录正在被本进程或其他进程使用时加序号；目录不存在时从模板复制"""
+        with self.lock:
+            slot, index = name, 1
+            while True:
+                if slot not in self.in_use:
+                    handle = lock_file(os.path.join(self.root_dir, "profiles", f"{slot}.lock"))
+                    if handle is not None:
+                        self.in_use[slot] = handle
+                        break
+                index += 1
+                slot = f"{name}-{index}"
+
+        profile_dir = os.path.join(self.root_dir, "profiles", slot)
+        if os.path.isdir(profile_dir):
+            state = '复用'
+        elif os.path.isdir(self.template_dir):
+            try:
+                shutil.copytree(self.template_dir, profile_dir, ignore=shutil.ignore_patterns(*PROFILE_LOCK_FILES))
+                state = '模板'
+            except Exception as e:
+                logging.warning(f"从模板复制浏览器配置失败，使用空配置: {e}")
+                shutil.rmtree(profile_dir, ignore_errors=True)
+                os.makedirs(profile_dir, exist_ok=True)
+                state = '冷启动'
+        else:
+            os.makedirs(profile_dir, exist_ok=True)
+            state = '冷启动'
+
+        self.states[profile_dir] = state
+        logging.info(f"浏览器配置目录: {profile_dir}（{state}）")
+        return profile_dir
+
+    def chrome_arguments(self, profile_dir):
+        """启动Chrome所需的配置目录、缓存目录和缓存大小参数"""
+        return [f'--user-data-dir={os.path.abspath(profile_dir)}',
+                f'--disk-cache-dir={os.path.abspath(os.path.join(profile_dir, "cache"))}',
+                f'--disk-cache-size={self.max_bytes}']
+
+    def release(self, profile_dir):
+        """浏览器关闭后调用：还没有模板时把本配置保存为模板，并释放配置目录"""
+        try:
+            with self.lock:
+                save_template = not os.path.isdir(self.template_dir)
+                if save_template:
+                    shutil.copytree(profile_dir, self.template_dir,
+                                    ignore=shutil.ignore_patterns(*PROFILE_LOCK_FILES))
+            if save_template:
+                logging.info(f"已将 {profile_dir} 保存为浏览器配置模板")
+        except Exception as e:
+            logging.error(f"整理浏览器缓存失败 {profile_dir}: {e}")
+        finally:
+            with self.lock:
+                handle = self.in_use.pop(os.path.basename(profile_dir), None)
+                if handle is not None:
+                    unlock_file(handle)
+
+    def record_page(self, profile_dir, url, latency, page_bytes, first):
+        """记录一次页面加载，page_bytes为 PAGE_BYTES_JS 的返回值"""
+        page_bytes = page_bytes or {}
+        state = self.states.get(profile_dir, '冷启动')
+        with self.lock:
+            self.records.append((state, first, latency, page_bytes.get('bytes', 0)))
+        if not self.metrics_file:
+            return
+        try:
+            with self.lock:
+                new_file = not os.path.exists(self.metrics_file)
+                with open(self.metrics_file, 'a', newline='', encoding='utf-8-sig') as f:
+                    writer = csv.DictWriter(f, fieldnames=METRIC_FIELDNAMES)
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerow({
+                        '时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        '浏览器': os.path.basename(profile_dir),
+                        '缓存状态': state,
+                        '首页': int(first),
+                        '加载秒': round(latency, 3),
+                        '传输字节': page_bytes.get('bytes', 0),
+                        '资源数': page_bytes.get('resources', 0),
+                        '缓存命中数': page_bytes.get('cached', 0),
+                        '链接': url
+                    })
+        except Exception as e:
+            logging.error(f"写入浏览器缓存指标失败: {e}")
+
+    def summary(self):
+        """按缓存状态汇总: {状态: {'页面数', '每页字节', '首页字节', '首页加载秒', '后续页加载秒'}}"""
+        with self.lock:
+            records = list(self.records)
+
+        def mean(values):
+            return round(sum(values) / len(values), 3) if values else None
+
+        result = {}
+        for state in ('冷启动', '模板', '复用'):
+            rows = [row for row in records if row[0] == state]
+            if not rows:
+                continue
+            firsts = [row for row in rows if row[1]]
+            others = [row for row in rows if not row[1]]
+            result[state] = {
+                '页面数': len(rows),
+                '每页字节': mean([row[3] for row in rows]),
+                '首页字节': mean([row[3] for row in firsts]),
+                '首页加载秒': mean([row[2] for row in firsts]),
+                '后续页加载秒': mean([row[2] for row in others])
+            }
+        return result
+
+    def log_summary(self):
+        for state, stats in self.summary().items():
+            logging.info(f"浏览器缓存[{state}]: {stats['页面数']}个页面，每页{stats['每页字节']}字节，"
+                         f"首页{stats['首页字节']}字节/{stats['首页加载秒']}秒，后续页{stats['后续页加载秒']}秒")
+        total = directory_size(os.path.join(self.root_dir, "profiles"))
+        logging.info(f"浏览器配置目录共占用{total / 1024 / 1024:.1f}MB: {self.root_dir}")
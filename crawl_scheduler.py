@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+按价值分配爬取页数
+给定一次运行的总页数预算，按车型月销量、近期评论增速和距上次爬取的时间分配各车型页数，
+并按优先级排序，运行被限时中断时最有价值的新数据最先落盘
+"""
+
+import math
+import logging
+from datetime import datetime, timedelta
+
+REVIEWS_PER_PAGE = 10  # 列表页每页评论数
+
+
+class CrawlScheduler:
+    def __init__(self, review_store, velocity_days=30, max_stale_days=30,
+                 sales_weight=0.5, velocity_weight=0.3, staleness_weight=0.2,
+                 min_pages=1, max_pages=25):
+        self.review_store = review_store
+        self.velocity_days = velocity_days
+        self.max_stale_days = max_stale_days
+        self.sales_weight = sales_weight
+        self.velocity_weight = velocity_weight
+        self.staleness_weight = staleness_weight
+        self.min_pages = min_pages
+        self.max_pages = max_pages
+
+    def score_models(self, car_info_list):
+        """计算各车型的优先级权重和需要追平的页数"""
+        now = datetime.now()
+        since = (now - timedelta(days=self.velocity_days)).strftime("%Y-%m-%d")
+        crawl_stats = self.review_store.model_crawl_stats(since)
+
+        total_sales = sum(max(car.get('车型月销量', 0) or 0, 0) for car in car_info_list) or 1
+        velocities = {}
+        for car in car_info_list:
+            stats = crawl_stats.get(str(car['车型ID']), {})
+            velocities[car['车型ID']] = stats.get('近期评论数', 0) / self.velocity_days
+        total_velocity = sum(velocities.values()) or 1
+
+        scored = []
+        for car in car_info_list:
+            stats = crawl_stats.get(str(car['车型ID']), {})
+            last_crawl = stats.get('最近爬取时间')
+            if last_crawl:
+                stale_days = (now - datetime.strptime(last_crawl, "%Y-%m-%d %H:%M:%S")).total_seconds() / 86400
+                # 已爬取过的车型只需追平上次爬取后的新增评论（历史评论会被去重跳过）
+                needed_pages = math.ceil(velocities[car['车型ID']] * stale_days / REVIEWS_PER_PAGE) + 1
+            else:
+                stale_days = self.max_stale_days
+                needed_pages = self.max_pages
+
+            staleness = min(stale_days, self.max_stale_days) / self.max_stale_days
+            weight = (self.sales_weight * (car.get('车型月销量', 0) or 0) / total_sales
+                      + self.velocity_weight * velocities[car['车型ID']] / total_velocity
+                      + self.staleness_weight * staleness / len(car_info_list))
+
+            scored.append({**car, '优先级': weight,
+                           '需要页数': max(self.min_pages, min(self.max_pages, needed_pages))})
+
+        scored.sort(key=lambda item: (-item['优先级'], item['销量排名']))
+        return scored
+
+    def plan(self, car_info_list, page_budget):
+        """按权重将总页数预算分配给各车型，返回按优先级排序并带有'最大页数'的车型列表"""
+        if not car_info_list:
+            return []
+
+        scored = self.score_models(car_info_list)
+        total_weight = sum(item['优先级'] for item in scored) or 1
+
+        # 按权重比例分配，向下取整后余量按小数部分从大到小补足
+        remaining = page_budget
+        allocations = []
+        for item in scored:
+            share = page_budget * item['优先级'] / total_weight
+            pages = min(int(share), item['需要页数'])
+            allocations.append([item, pages, share - int(share)])
+            remaining -= pages
+
+        for allocation in sorted(allocations, key=lambda a: -a[2]):
+            if remaining <= 0:
+                break
+            if allocation[1] < allocation[0]['需要页数']:
+                allocation[1] += 1
+                remaining -= 1
+
+        # 高优先级车型至少分到最小页数，预算不足时低优先级车型本次不爬
+        for allocation in allocations:
+            if remaining <= 0:
+                break
+            shortfall = max(0, self.min_pages - allocation[1])
+            if shortfall and shortfall <= remaining:
+                allocation[1] += shortfall
+                remaining -= shortfall
+
+        # 余量继续按优先级顺序分给尚未追平的车型
+        for allocation in allocations:
+            if remaining <= 0:
+                break
+            extra = min(remaining, allocation[0]['需要页数'] - allocation[1])
+            if extra > 0:
+                allocation[1] += extra
+                remaining -= extra
+
+        plan = []
+        for item, pages, _ in allocations:
+            if pages > 0:
+                plan.append({**item, '最大页数': pages})
+
+        logging.info(f"页数预算{page_budget}，分配{page_budget - remaining}页给{len(plan)}/{len(car_info_list)}个车型")
+        for item in plan[:10]:
+            logging.info(f"  排名{item['销量排名']} {item['车型名称']}: {item['最大页数']}页 (优先级{item['优先级']:.4f})")
+        return plan
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+时间预算
+运行、车型、单条评论三级时间预算，子预算不会超过父预算的剩余时间；
+所有等待和回退策略都按剩余时间截断，预算用完时返回部分结果
+"""
+
+import math
+import time
+
+
+class Deadline:
+    def __init__(self, seconds=None, parent=None, name=""):
+        self.name = name
+        self.parent = parent
+        self.expires_at = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        """剩余秒数，不限时返回inf"""
+        own = self.expires_at - time.monotonic() if self.expires_at is not None else math.inf
+        if self.parent is not None:
+            own = min(own, self.parent.remaining())
+        return max(0.0, own)
+
+    def expired(self):
+        """预算是否已用完"""
+        return self.remaining() <= 0
+
+    def child(self, seconds=None, name=""):
+        """创建子预算"""
+        return Deadline(seconds, parent=self, name=name)
+
+    def timeout(self, default):
+        """将等待超时截断到剩余时间内"""
+        return min(default, self.remaining())
+
+    def sleep(self, seconds):
+        """在剩余时间内休眠，返回休眠后预算是否仍有剩余"""
+        duration = min(seconds, self.remaining())
+        if duration > 0:
+            time.sleep(duration)
+        return not self.expired()
+
+    def expired_scope(self):
+        """返回已用完的最内层预算名称"""
+        if self.expires_at is not None and self.expires_at <= time.monotonic():
+            return self.name
+        if self.parent is not None:
+            return self.parent.expired_scope()
+        return ""
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+车辆信息字段标准化
+将行驶里程、电耗、续航、油耗、裸车购买价、购买时间等展示文本（如“12.58万”“3500公里”）
+按批次向量化解析为带单位的数值列，原始文本保留不变，聚合查询直接使用数值列
+"""
+
+import pandas as pd
+
+# 原始字段 -> 标准化列名（列名后缀为单位）
+NORMALIZED_COLUMNS = {
+    '行驶里程': '行驶里程_km',
+    '夏季电耗': '夏季电耗_kWh每百公里',
+    '春秋电耗': '春秋电耗_kWh每百公里',
+    '冬季电耗': '冬季电耗_kWh每百公里',
+    '夏季续航': '夏季续航_km',
+    '春秋续航': '春秋续航_km',
+    '冬季续航': '冬季续航_km',
+    '百公里油耗': '百公里油耗_L每百公里',
+    '裸车购买价': '裸车购买价_元',
+    '购买时间': '购买日期',
+}
+NORMALIZED_FIELDNAMES = list(NORMALIZED_COLUMNS.values())
+DATE_COLUMNS = {'购买日期'}
+
+NUMBER_PATTERN = r'(\d+(?:\.\d+)?)\s*(万)?'
+
+
+def parse_quantity(series):
+    """提取文本中的第一个数字，带“万”时乘以10000（如“12.58万”“1.2万公里”）"""
+    text = series.fillna('').astype(str).str.replace(',', '', regex=False).str.replace('，', '', regex=False)
+    parts = text.str.extract(NUMBER_PATTERN)
+    values = pd.to_numeric(parts[0], errors='coerce')
+    return values.where(parts[1].isna(), values * 10000)
+
+
+def parse_dates(series):
+    """解析 2024-05、2024年5月、2024/05/01 等格式，统一为 YYYY-MM-DD，只有年月时取当月1日"""
+    text = series.fillna('').astype(str)
+    parts = text.str.extract(r'(\d{4})\s*[-/.年]\s*(\d{1,2})(?:\s*[-/.月]\s*(\d{1,2}))?')
+    dates = pd.to_datetime(
+        {'year': pd.to_numeric(parts[0], errors='coerce'),
+         'month': pd.to_numeric(parts[1], errors='coerce'),
+         'day': pd.to_numeric(parts[2], errors='coerce').fillna(1)},
+        errors='coerce')
+    return dates.dt.strftime('%Y-%m-%d')
+
+
+def normalize_frame(df):
+    """为DataFrame追加标准化列，原始列不变；缺少的原始列按空值处理"""
+    result = df.copy()
+    for field, column in NORMALIZED_COLUMNS.items():
+        raw = df[field] if field in df.columns else pd.Series('', index=df.index)
+        result[column] = parse_dates(raw) if column in DATE_COLUMNS else parse_quantity(raw)
+    return result
+
+
+def normalize_reviews(reviews):
+    """批量标准化评论记录，返回 [{标准化列名: 值或None}, ...]，与输入一一对应"""
+    if not reviews:
+        return []
+
+    df = pd.DataFrame([{field: review.get(field, '') for field in NORMALIZED_COLUMNS} for review in reviews])
+    normalized = normalize_frame(df)[NORMALIZED_FIELDNAMES]
+    normalized = normalized.astype(object).where(normalized.notna(), None)
+    return normalized.to_dict('records')
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑评论关键词词频统计
+分块读取评论爬虫输出的单车型CSV，在进程池中分词，按车型ID和评论字段累计词频和出现评论数；
+只处理新增或有变化的单车型文件，该车型的计数整体替换；同时在进程池中的分块数有上限，内存占用与文件总量无关
+用法: python keyword_stats.py [--top 20 --field 最不满意 --car-id 5769] [--term 异响]
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import argparse
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from review_search import SEARCH_FIELDS, cjk_tokenize
+
+try:
+    import jieba
+except ImportError:  # 未安装jieba时退化为二元切分
+    jieba = None
+
+# 单车型文件名：排名_车型名称_车型ID.csv
+MODEL_FILE_PATTERN = re.compile(r'^\d{3}_.*_(\d+)\.csv$')
+
+# 补充到分词词典的汽车口碑常用词，避免被切碎
+USER_TERMS = ['异响', '续航虚标', '车机卡顿', '胎噪', '风噪', '顿挫', '掉电', '充电桩', '辅助驾驶', '智能驾驶',
+              '后排空间', '后备箱', '隔音', '油耗高', '能耗', '座椅加热', '通风座椅', '方向盘', '悬挂', '底盘']
+
+STOPWORDS = {'的', '了', '是', '在', '也', '都', '就', '和', '还', '有', '很', '比较', '非常', '这个', '一个',
+             '没有', '感觉', '我', '我们', '就是', '还是', '可以', '不', '会', '说', '对', '但是', '因为', '所以',
+             '而且', '然后', '车', '车子', '这款', '一些', '什么', '一下', '不过', '如果', '吧', '啊', '呢', '吗'}
+
+TOKEN_FILTER = re.compile(r'^[一-鿿A-Za-z0-9]{2,}$')
+
+# 不区分字段的汇总计数，评论数按评论去重（同一条评论在多个字段中出现只计一次）
+ALL_FIELDS = '全部'
+
+
+def init_worker():
+    """解析进程初始化：加载词典和自定义词"""
+    if jieba is not None:
+        jieba.setLogLevel(logging.WARNING)
+        for term in USER_TERMS:
+            jieba.add_word(term)
+
+
+def tokenize(text):
+    """分词并过滤停用词、单字和标点"""
+    if not text or not isinstance(text, str):
+        return []
+    words = jieba.lcut(text) if jieba is not None else cjk_tokenize(text).split()
+    return [word for word in words if word not in STOPWORDS and TOKEN_FILTER.match(word)]
+
+
+def count_chunk(records):
+    """解析进程入口：统计一块评论的词频，返回 {字段: (词频Counter, 出现评论数Counter)}，
+    其中 ALL_FIELDS 为各字段合计，出现评论数按评论去重"""
+    result = {field: (Counter(), Counter()) for field in SEARCH_FIELDS + [ALL_FIELDS]}
+    row_count = max((len(texts) for texts in records.values()), default=0)
+    all_terms, all_docs = result[ALL_FIELDS]
+    for i in range(row_count):
+        review_words = set()
+        for field in SEARCH_FIELDS:
+            texts = records.get(field)
+            if not texts:
+                continue
+            words = tokenize(texts[i])
+            result[field][0].update(words)
+            result[field][1].update(set(words))
+            all_terms.update(words)
+            review_words.update(words)
+        all_docs.update(review_words)
+    return result
+
+
+class KeywordStats:
+    def __init__(self, output_dir="autohome_reviews_output", db_path=None, max_workers=None, chunk_size=2000):
+        self.output_dir = output_dir
+        self.db_path = db_path or os.path.join(output_dir, "keyword_stats.db")
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.conn = sqlite3.connect(self.db_path)
+        self.setup_database()
+
+    def setup_database(self):
+        """创建词频表和已处理文件表"""
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS keyword_counts ('
+                              '"车型ID" TEXT NOT NULL, "字段" TEXT NOT NULL, "词" TEXT NOT NULL, '
+                              '"词频" INTEGER NOT NULL, "评论数" INTEGER NOT NULL, '
+                              'PRIMARY KEY ("车型ID", "字段", "词")) WITHOUT ROWID')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_keyword_term ON keyword_counts ("词", "字段")')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS keyword_files ('
+                              '"文件名" TEXT PRIMARY KEY, "车型ID" TEXT, "修改时间" REAL, "大小" INTEGER, "评论条数" INTEGER)')
+            # 旧版本没有各字段合计，清空已处理文件记录，下次更新时重新统计
+            has_counts = self.conn.execute('SELECT 1 FROM keyword_counts LIMIT 1').fetchone()
+            has_totals = self.conn.execute('SELECT 1 FROM keyword_counts WHERE "字段" = ? LIMIT 1',
+                                           (ALL_FIELDS,)).fetchone()
+            if has_counts and not has_totals:
+                self.conn.execute('DELETE FROM keyword_files')
+
+    def changed_files(self):
+        """新增或有变化的单车型文件，返回 [(文件名, 车型ID, 修改时间, 大小)]"""
+        known = {row[0]: (row[1], row[2]) for row in
+                 self.conn.execute('SELECT "文件名", "修改时间", "大小" FROM keyword_files')}
+        changed = []
+        for filename in sorted(os.listdir(self.output_dir)):
+            match = MODEL_FILE_PATTERN.match(filename)
+            if not match:
+                continue
+            stat = os.stat(os.path.join(self.output_dir, filename))
+            if known.get(filename) != (stat.st_mtime, stat.st_size):
+                changed.append((filename, match.group(1), stat.st_mtime, stat.st_size))
+        return changed
+
+    def read_chunks(self, filename):
+        """分块读取单车型文件的评论字段"""
+        filepath = os.path.join(self.output_dir, filename)
+        reader = pd.read_csv(filepath, usecols=lambda column: column in SEARCH_FIELDS, dtype=str,
+                             chunksize=self.chunk_size, encoding='utf-8-sig')
+        for chunk in reader:
+            chunk = chunk.fillna('')
+            yield len(chunk), {field: chunk[field].tolist() for field in SEARCH_FIELDS if field in chunk.columns}
+
+    def update(self):
+        """统计新增或有变化的单车型文件，返回处理的文件数"""
+        changed = self.changed_files()
+        if not changed:
+            logging.info("没有新的单车型文件需要统计")
+            return 0
+
+        logging.info(f"开始统计{len(changed)}个单车型文件的关键词")
+        # 同时在进程池中的分块数上限：足以让解析进程保持忙碌，又不会把全部文件一次读入内存
+        window = 2 * (self.max_workers or os.cpu_count() or 1)
+        in_flight = deque()  # [(文件状态, future)]，按提交顺序收集
+        processed = 0
+
+        def finish(state):
+            nonlocal processed
+            if state['failed']:
+                return
+            try:
+                self.replace_model_counts(state['car_id'], state['totals'])
+                with self.conn:
+                    self.conn.execute('INSERT OR REPLACE INTO keyword_files VALUES (?, ?, ?, ?, ?)',
+                                      (state['filename'], state['car_id'], state['mtime'], state['size'],
+                                       state['review_count']))
+                processed += 1
+                logging.info(f"车型{state['car_id']}关键词统计完成: {state['review_count']}条评论")
+            except Exception as e:
+                logging.error(f"统计文件失败 {state['filename']}: {e}")
+
+        def collect_oldest():
+            state, future = in_flight.popleft()
+            try:
+                for field, (term_counts, doc_counts) in future.result().items():
+                    state['totals'][field][0].update(term_counts)
+                    state['totals'][field][1].update(doc_counts)
+            except Exception as e:
+                logging.error(f"统计文件失败 {state['filename']}: {e}")
+                state['failed'] = True
+            state['remaining'] -= 1
+            if state['read_done'] and state['remaining'] == 0:
+                finish(state)
+
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker) as executor:
+            for filename, car_id, mtime, size in changed:
+                state = {'filename': filename, 'car_id': car_id, 'mtime': mtime, 'size': size, 'review_count': 0,
+                         'totals': {field: (Counter(), Counter()) for field in SEARCH_FIELDS + [ALL_FIELDS]},
+                         'remaining': 0, 'read_done': False, 'failed': False}
+                try:
+                    for rows, records in self.read_chunks(filename):
+                        while len(in_flight) >= window:
+                            collect_oldest()
+                        in_flight.append((state, executor.submit(count_chunk, records)))
+                        state['remaining'] += 1
+                        state['review_count'] += rows
+                except Exception as e:
+                    logging.error(f"读取文件失败 {filename}: {e}")
+                    state['failed'] = True
+                state['read_done'] = True
+                if state['remaining'] == 0:
+                    finish(state)
+
+            while in_flight:
+                collect_oldest()
+
+        return processed
+
+    def replace_model_counts(self, car_id, totals):
+        """单车型文件包含该车型的全部评论，整体替换该车型的计数"""
+        rows = [(car_id, field, term, count, doc_counts[term])
+                for field, (term_counts, doc_counts) in totals.items()
+                for term, count in term_counts.items()]
+        with self.conn:
+            self.conn.execute('DELETE FROM keyword_counts WHERE "车型ID" = ?', (car_id,))
+            self.conn.executemany('INSERT INTO keyword_counts VALUES (?, ?, ?, ?, ?)', rows)
+
+    def top_terms(self, car_id=None, field=None, limit=20):
+        """高频词，可按车型和字段过滤；返回 [(词, 词频, 评论数)]"""
+        conditions, params = [], []
+        if car_id is not None:
+            conditions.append('"车型ID" = ?')
+            params.append(str(car_id))
+        # 不限字段时使用各字段合计，评论数不会因一条评论在多个字段中出现而重复计算
+        conditions.append('"字段" = ?')
+        params.append(field or ALL_FIELDS)
+        where_sql = f'WHERE {" AND ".join(conditions)} '
+        cursor = self.conn.execute(
+            f'SELECT "词", SUM("词频") AS total, SUM("评论数") FROM keyword_counts {where_sql}'
+            f'GROUP BY "词" ORDER BY total DESC LIMIT ?', params + [limit])
+        return cursor.fetchall()
+
+    def term_by_model(self, term, field=None):
+        """某个词在各车型中的出现情况，返回 [(车型ID, 词频, 评论数, 该车型评论条数)]，按评论数降序"""
+        cursor = self.conn.execute(
+            'SELECT k."车型ID", SUM(k."词频"), SUM(k."评论数"), '
+            '(SELECT MAX("评论条数") FROM keyword_files f WHERE f."车型ID" = k."车型ID") '
+            'FROM keyword_counts k WHERE k."词" = ? AND k."字段" = ? GROUP BY k."车型ID" ORDER BY SUM(k."评论数") DESC',
+            (term, field or ALL_FIELDS))
+        return cursor.fetchall()
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def main():
+    """命令行：更新词频统计并输出高频词"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="汽车之家口碑评论关键词词频统计")
+    parser.add_argument("--output-dir", default="autohome_reviews_output", help="评论爬虫输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="分词进程数，默认为CPU核数")
+    parser.add_argument("--car-id", default=None, help="限定车型ID")
+    parser.add_argument("--field", default=None, choices=SEARCH_FIELDS, help="限定评论字段")
+    parser.add_argument("--top", type=int, default=20, help="输出高频词个数")
+    parser.add_argument("--term", default=None, help="查看某个词在各车型中的出现情况，如 异响")
+    args = parser.parse_args()
+
+    if jieba is None:
+        logging.warning("未安装jieba，使用二元切分统计（pip install jieba）")
+
+    stats = KeywordStats(args.output_dir, max_workers=args.workers)
+    try:
+        stats.update()
+
+        if args.term:
+            print(f"“{args.term}”在各车型中的出现情况:")
+            for car_id, count, docs, total in stats.term_by_model(args.term, args.field):
+                share = f"{docs / total:.1%}" if total else "-"
+                print(f"  车型{car_id}: 词频{count}，{docs}条评论提及（占{share}）")
+        else:
+            print("高频词:")
+            for term, count, docs in stats.top_terms(args.car_id, args.field, args.top):
+                print(f"  {term}: 词频{count}，{docs}条评论")
+    finally:
+        stats.close()
+
+
+if __name__ == "__main__":
+    main()
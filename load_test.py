@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+端到端压测
+启动本地模拟站点（mock_autohome.py），用多个进程分别运行评论爬虫、一个进程运行销量排名爬虫，
+汇总评论吞吐（条/分钟）、各类页面的P50/P95延迟和状态码分布，以及每个进程（含浏览器子进程）的CPU和内存；
+指定 --browser-cache 时评论爬虫使用持久化浏览器缓存，报告中给出每页传输字节数和首页加载耗时，
+对同一缓存目录连续运行两次即可对比冷启动和缓存复用
+用法: python load_test.py --workers 4 --models 20 --max-pages 2 --latency-ms 300 --throttle-rate 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import importlib.util
+import multiprocessing
+from datetime import datetime
+
+from mock_autohome import MockAutohomeServer, MockConfig
+from browser_cache import BrowserProfileCache
+
+try:
+    import psutil
+except ImportError:  # 未安装psutil时只统计进程自身和已退出子进程的资源
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REVIEW_SCRIPT = os.path.join(BASE_DIR, "汽车之家口碑评论_20250818V6.py")
+SALES_SCRIPT = os.path.join(BASE_DIR, "汽车之家id获取_claude_20250806V1.py")
+
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+def load_script(path, name):
+    """按文件路径导入爬虫脚本"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ResourceMonitor:
+    """后台采样当前进程及其子进程（浏览器、驱动）的CPU时间和内存"""
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.cpu_by_pid = {}
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.started = time.monotonic()
+
+    def start(self):
+        if psutil is not None:
+            self.thread.start()
+        return self
+
+    def sample(self):
+        root = psutil.Process()
+        rss = 0
+        for process in [root] + root.children(recursive=True):
+            try:
+                times = process.cpu_times()
+                self.cpu_by_pid[process.pid] = times.user + times.system
+                rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        """停止采样，返回 {'CPU秒': ..., '峰值内存MB': ...}"""
+        elapsed = time.monotonic() - self.started
+        if psutil is not None:
+            self.sample()
+            self.stopped.set()
+            self.thread.join()
+            cpu_seconds = sum(self.cpu_by_pid.values())
+            peak_mb = self.peak_rss / 1024 / 1024
+        elif resource is not None:
+            usage = [resource.getrusage(who) for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)]
+            cpu_seconds = sum(u.ru_utime + u.ru_stime for u in usage)
+            peak_mb = max(u.ru_maxrss for u in usage) / 1024  # Linux下单位为KB
+        else:
+            cpu_seconds, peak_mb = 0.0, 0.0
+
+        return {
+            'CPU秒': round(cpu_seconds, 2),
+            'CPU占用率': round(cpu_seconds / elapsed, 3) if elapsed else 0,
+            '峰值内存MB': round(peak_mb, 1)
+        }
+
+
+def review_worker(worker_id, site_url, car_infos, max_pages, output_dir, result_queue, browser_cache_dir=None):
+    """压测进程：用评论爬虫完整处理分配到的车型（爬取、入库、导出）"""
+    # 爬虫脚本只在直接运行时配置日志，spawn方式启动的压测进程需要自行配置
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    monitor = ResourceMonitor().start()
+    started = time.monotonic()
+    result = {'进程': f"评论-{worker_id}", '车型数': len(car_infos), '评论数': 0, '出错车型数': 0}
+    browser_cache = None
+
+    try:
+        module = load_script(REVIEW_SCRIPT, "review_scraper")
+        module.BROWSER_CHECK_URL = f"{site_url}/check"
+        worker_dir = os.path.join(output_dir, f"worker_{worker_id}")
+        if browser_cache_dir:
+            browser_cache = BrowserProfileCache(browser_cache_dir)
+        scraper = module.AutohomeReviewScraper(output_dir=worker_dir, site_url=site_url, browser_cache=browser_cache)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        progress_file = os.path.join(worker_dir, f"progress_{timestamp}.txt")
+
+        try:
+            for car_info in car_infos:
+                try:
+                    result['评论数'] += len(scraper.process_car(car_info, max_pages, timestamp, progress_file))
+                except Exception as e:
+                    result['出错车型数'] += 1
+                    logging.error(f"压测进程{worker_id}处理车型{car_info['车型ID']}失败: {e}")
+            result.update(monitor.stop())
+        finally:
+            scraper.close()
+
+    except Exception as e:
+        result['错误'] = str(e)
+        result.update(monitor.stop())
+
+    if browser_cache:
+        result['浏览器缓存'] = browser_cache.summary()
+    result['耗时秒'] = round(time.monotonic() - started, 1)
+    result['评论每分钟'] = round(result['评论数'] / result['耗时秒'] * 60, 2) if result['耗时秒'] else 0
+    result_queue.put(result)
+
+
+def sales_worker(site_url, target_count, result_queue):
+    """压测进程：用销量排名爬虫爬取模拟排名页"""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    monitor = ResourceMonitor().start()
+    started = time.monotonic()
+    result = {'进程': "销量排名", '车型数': 0}
+
+    try:
+        module = load_script(SALES_SCRIPT, "sales_scraper")
+        scraper = module.AutohomeSalesScraper(snapshot_db=None)
+        try:
+            result['车型数'] = len(scraper.scrape_sales_ranking(target_count, base_url=f"{site_url}/rank/"))
+            result.update(monitor.stop())
+        finally:
+            if scraper.driver:
+                scraper.driver.quit()
+    except Exception as e:
+        result['错误'] = str(e)
+        result.update(monitor.stop())
+
+    result['耗时秒'] = round(time.monotonic() - started, 1)
+    result_queue.put(result)
+
+
+def run_load_test(workers=2, models=10, max_pages=2, sales_target=100, config=None,
+                  output_dir="load_test_output", browser_cache_dir=None):
+    """启动模拟站点和压测进程，返回压测报告"""
+    os.makedirs(output_dir, exist_ok=True)
+    server = MockAutohomeServer(config or MockConfig()).start()
+    logging.info(f"模拟站点已启动: {server.url}")
+
+    # 车型按轮询分给各进程
+    series_ids = server.series_ids[:models]
+    car_infos = [{'车型ID': str(series_id), '销量排名': rank, '车型名称': server.site.series_name(series_id)}
+                 for rank, series_id in enumerate(series_ids, 1)]
+    assignments = [car_infos[i::workers] for i in range(workers)]
+
+    result_queue = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=review_worker,
+                                         args=(i + 1, server.url, cars, max_pages, output_dir, result_queue,
+                                               browser_cache_dir))
+                 for i, cars in enumerate(assignments) if cars]
+    if sales_target:
+        processes.append(multiprocessing.Process(target=sales_worker, args=(server.url, sales_target, result_queue)))
+
+    started = time.monotonic()
+    try:
+        for process in processes:
+            process.start()
+        results = [result_queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+    finally:
+        server.stop()
+    elapsed = time.monotonic() - started
+
+    total_reviews = sum(result.get('评论数', 0) for result in results)
+    report = {
+        '开始时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        '评论进程数': len([result for result in results if result['进程'].startswith('评论')]),
+        '车型数': len(car_infos),
+        '每车型页数': max_pages,
+        '总评论数': total_reviews,
+        '总耗时秒': round(elapsed, 1),
+        '评论每分钟': round(total_reviews / elapsed * 60, 2) if elapsed else 0,
+        '页面统计': server.site.snapshot(),
+        '进程统计': sorted(results, key=lambda result: result['进程']),
+        '模拟站点配置': vars(server.site.config)
+    }
+    return report
+
+
+def print_report(report):
+    print("=" * 60)
+    print(f"总评论数: {report['总评论数']}  总耗时: {report['总耗时秒']}秒  吞吐: {report['评论每分钟']}条/分钟")
+    print("-" * 60)
+    for kind, stats in report['页面统计'].items():
+        print(f"{kind:8s} 请求{stats['requests']:6d}  P50 {stats['p50_ms']:8.1f}ms  P95 {stats['p95_ms']:8.1f}ms  "
+              f"{stats.get('bytes', 0) / 1024:9.1f}KB  状态码 {stats['status']}")
+    print("-" * 60)
+    for result in report['进程统计']:
+        print(f"{result['进程']:10s} 评论{result.get('评论数', '-')!s:>6}  耗时{result['耗时秒']}秒  "
+              f"CPU {result.get('CPU秒', 0)}秒({result.get('CPU占用率', 0):.0%})  峰值内存 {result.get('峰值内存MB', 0)}MB"
+              + (f"  错误: {result['错误']}" if '错误' in result else ""))
+        for state, stats in result.get('浏览器缓存', {}).items():
+            print(f"{'':10s} 浏览器缓存[{state}] 页面{stats['页面数']}  每页{stats['每页字节']}字节  "
+                  f"首页{stats['首页字节']}字节/{stats['首页加载秒']}秒  后续页{stats['后续页加载秒']}秒")
+    print("=" * 60)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    parser = argparse.ArgumentParser(description="汽车之家爬虫端到端压测（本地模拟站点）")
+    parser.add_argument("--workers", type=int, default=2, help="评论爬虫进程数")
+    parser.add_argument("--models", type=int, default=10, help="参与压测的车型数")
+    parser.add_argument("--max-pages", type=int, default=2, help="每个车型爬取的列表页数")
+    parser.add_argument("--sales-target", type=int, default=100, help="销量排名爬取数量，0表示不压测排名爬虫")
+    parser.add_argument("--latency-ms", type=float, default=150, help="响应延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.6, help="延迟对数正态分布的sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="随机返回429的比例")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每秒请求数上限，超出返回429")
+    parser.add_argument("--show-counters", action="store_true", help="互动数据不放在fn-hide容器中")
+    parser.add_argument("--static-kb", type=int, default=300, help="每个页面引用的静态资源总大小（KB）")
+    parser.add_argument("--browser-cache", default=None, help="持久化浏览器缓存目录，不指定时每次使用临时配置")
+    parser.add_argument("--output-dir", default="load_test_output", help="压测输出目录")
+    args = parser.parse_args()
+
+    if psutil is None:
+        logging.warning("未安装psutil，浏览器子进程的CPU和内存无法计入（pip install psutil）")
+
+    config = MockConfig(model_count=max(args.models, 200), latency_ms=args.latency_ms,
+                        latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+                        hide_counters=not args.show_counters, static_kb=args.static_kb)
+    report = run_load_test(args.workers, args.models, args.max_pages, args.sales_target, config, args.output_dir,
+                           args.browser_cache)
+    print_report(report)
+
+    report_file = os.path.join(args.output_dir, f"load_test_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"压测报告已保存到 {report_file}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+本地模拟汽车之家站点
+按固定随机种子生成销量排名页、口碑列表页（分页）和口碑详情页，页面结构与两个爬虫使用的选择器一致；
+可配置响应延迟分布、错误率、429限流和隐藏(fn-hide)的互动数据，页面引用可缓存的JS/CSS/字体静态资源，
+用于压测，不访问真实站点
+用法: python mock_autohome.py --port 8765 --latency-ms 200 --error-rate 0.01 --throttle-rate 0.02
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from html import escape
+from datetime import date, timedelta
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+CATEGORIES = ['空间', '驾驶感受', '续航', '外观', '内饰', '性价比', '智能化', '油耗', '配置']
+PURPOSES = ['上下班通勤', '家庭出行', '长途旅行', '接送孩子', '周末自驾', '商务接待', '跑网约车']
+PHRASES = ['空间很大', '后排宽敞', '加速有力', '底盘扎实', '隔音一般', '车机偶尔卡顿', '续航比较实在',
+           '冬季掉电明显', '刹车有点软', '座椅舒适', '胎噪偏大', '性价比高', '内饰做工不错', '油耗偏高']
+SERIES_NAMES = ['Model Y', '星愿', '秦PLUS', '海鸥', '宋PLUS', '元PLUS', '轩逸', '朗逸', '小米SU7', '问界M7',
+                '理想L6', '零跑C11', '博越L', '哈弗H6', '长安CS75', '卡罗拉', '思域', '凯美瑞', '速腾', '帕萨特']
+
+PAGE_STYLE = "<style>.fn-hide{display:none}</style>"
+
+
+class MockConfig:
+    def __init__(self, seed=1, model_count=200, reviews_per_model=120, reviews_per_page=10, rank_page_size=50,
+                 latency_ms=150, latency_sigma=0.6, error_rate=0.0, throttle_rate=0.0, rate_limit=0,
+                 retry_after=2, hide_counters=True, static_kb=300):
+        self.seed = seed
+        self.model_count = model_count
+        self.reviews_per_model = reviews_per_model
+        self.reviews_per_page = reviews_per_page
+        self.rank_page_size = rank_page_size   # 排名页首屏车型数，其余通过“加载更多”追加
+        self.latency_ms = latency_ms           # 响应延迟中位数（毫秒），按对数正态分布抽样
+        self.latency_sigma = latency_sigma     # 对数正态分布的sigma，越大长尾越重
+        self.error_rate = error_rate           # 随机返回500的比例
+        self.throttle_rate = throttle_rate     # 随机返回429的比例
+        self.rate_limit = rate_limit           # 每秒请求数上限，超出返回429，0表示不限
+        self.retry_after = retry_after
+        self.hide_counters = hide_counters     # 互动数据放在fn-hide容器中，与真实站点一致
+        self.static_kb = static_kb             # 每个页面引用的静态资源总大小（KB），0表示不引用
+
+
+# 静态资源：路径 -> (内容类型, 占总大小的比例)
+STATIC_ASSETS = {
+    '/static/app.js': ('application/javascript', 0.6),
+    '/static/app.css': ('text/css', 0.25),
+    '/static/iconfont.woff2': ('font/woff2', 0.15)
+}
+
+
+def stable_random(*keys):
+    """按键生成确定的随机数发生器，同一页面多次请求内容一致"""
+    digest = hashlib.md5("|".join(str(key) for key in keys).encode('utf-8')).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+class MockSite:
+    """生成页面内容并记录请求统计"""
+
+    def __init__(self, config):
+        self.config = config
+        rng = random.Random(config.seed)
+        self.series_ids = sorted(rng.sample(range(1000, 9999), config.model_count))
+        self.lock = threading.Lock()
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.stats = {}  # {页面类型: {'status': {状态码: 次数}, 'latency': [毫秒, ...], 'bytes': 字节数}}
+        self.static_bodies = {path: self.static_body(path, share) for path, (_, share) in STATIC_ASSETS.items()}
+
+    # ---------- 请求控制 ----------
+
+    def admit(self):
+        """按限流和随机错误决定本次响应状态码"""
+        if self.config.rate_limit:
+            with self.lock:
+                now = time.monotonic()
+                if now - self.window_start >= 1:
+                    self.window_start, self.window_count = now, 0
+                self.window_count += 1
+                if self.window_count > self.config.rate_limit:
+                    return 429
+        roll = random.random()
+        if roll < self.config.throttle_rate:
+            return 429
+        if roll < self.config.throttle_rate + self.config.error_rate:
+            return 500
+        return 200
+
+    def delay(self):
+        """按对数正态分布抽样响应延迟（秒）"""
+        if self.config.latency_ms <= 0:
+            return 0
+        return random.lognormvariate(math.log(self.config.latency_ms / 1000), self.config.latency_sigma)
+
+    def record(self, kind, status, latency, size=0):
+        with self.lock:
+            entry = self.stats.setdefault(kind, {'status': {}, 'latency': [], 'bytes': 0})
+            entry['status'][status] = entry['status'].get(status, 0) + 1
+            entry['latency'].append(round(latency * 1000, 1))
+            entry['bytes'] += size
+
+    def snapshot(self):
+        """请求统计：各页面类型的状态码分布和延迟分位数"""
+        with self.lock:
+            result = {}
+            for kind, entry in self.stats.items():
+                latencies = sorted(entry['latency'])
+                result[kind] = {
+                    'requests': len(latencies),
+                    'status': dict(entry['status']),
+                    'p50_ms': percentile(latencies, 50),
+                    'p95_ms': percentile(latencies, 95),
+                    'bytes': entry['bytes']
+                }
+            return result
+
+    # ---------- 数据生成 ----------
+
+    def static_body(self, path, share):
+        """按配置大小生成确定内容的静态资源"""
+        size = int(self.config.static_kb * 1024 * share)
+        filler = f"/* {path} */\n".encode('utf-8')
+        return (filler * (size // len(filler) + 1))[:size]
+
+    def head(self, title):
+        """页面head，引用静态资源"""
+        assets = ""
+        if self.config.static_kb:
+            assets = ('<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js"></script>'
+                      '<link rel="preload" href="/static/iconfont.woff2" as="font" crossorigin>')
+        return f"<head><title>{escape(title)}</title>{PAGE_STYLE}{assets}</head>"
+
+    def series_name(self, series_id):
+        rng = stable_random('name', series_id)
+        return f"{rng.choice(SERIES_NAMES)}{'' if rng.random() < 0.5 else rng.choice(['DM-i', 'EV', 'PLUS', 'Pro'])}"
+
+    def review_ids(self, series_id):
+        count = stable_random('count', series_id).randint(self.config.reviews_per_model // 2,
+                                                          self.config.reviews_per_model)
+        return [f"{series_id}{index:05d}" for index in range(count, 0, -1)]  # 按发表时间倒序
+
+    def review(self, review_id):
+        series_id = int(review_id[:-5])
+        rng = stable_random('review', review_id)
+        published = date(2025, 8, 1) - timedelta(days=rng.randint(0, 900))
+        return {
+            'series_id': series_id,
+            'name': self.series_name(series_id),
+            'spec': f"{published.year}款 {rng.choice(['标准版', '长续航版', '高性能版', '智驾版'])}",
+            'published': published.isoformat(),
+            'mileage': f"{rng.randint(300, 60000)}公里",
+            'price': f"{rng.uniform(6, 40):.2f}万",
+            'bought': f"{published.year}-{published.month:02d}",
+            'place': rng.choice(['北京', '上海', '广州', '深圳', '成都', '杭州']),
+            'purposes': rng.sample(PURPOSES, rng.randint(1, 3)),
+            'satisfied': "，".join(rng.sample(PHRASES, 3)),
+            'unsatisfied': "，".join(rng.sample(PHRASES, 2)),
+            'ratings': {category: rng.choice([60, 70, 80, 90, 100]) for category in CATEGORIES},
+            'comments': {category: "，".join(rng.sample(PHRASES, 2)) for category in CATEGORIES},
+            'views': rng.randint(100, 50000),
+            'goods': rng.randint(0, 2000),
+            'replies': rng.randint(0, 300)
+        }
+
+    # ---------- 页面渲染 ----------
+
+    def rank_rows(self, start, count):
+        rows = []
+        for rank in range(start + 1, min(start + count, len(self.series_ids)) + 1):
+            series_id = self.series_ids[rank - 1]
+            rng = stable_random('rank', series_id)
+            rows.append(
+                f'<div class="tw-flex" data-rank-num="{rank}">'
+                f'<div class="tw-text-nowrap tw-text-lg tw-font-medium">{escape(self.series_name(series_id))}</div>'
+                f'<div class="tw-font-medium tw-text-[#717887]">{rng.uniform(5, 15):.2f}-{rng.uniform(15, 35):.2f}万</div>'
+                f'<strong class="tw-font-bold">{rng.uniform(4, 5):.2f}</strong>'
+                f'<span class="tw-relative tw-top-[1px] tw-ml-[3px] tw-text-[18px] tw-font-bold">'
+                f'{max(100, 50000 - rank * 97 + rng.randint(0, 90))}</span>'
+                f'<button data-series-id="{series_id}">查成交价</button></div>')
+        return "".join(rows)
+
+    def rank_page(self):
+        size = self.config.rank_page_size
+        script = (
+            "<script>var loaded=%d;function loadMore(){fetch('/rank/more?start='+loaded)"
+            ".then(function(r){return r.text();}).then(function(html){"
+            "document.getElementById('rank-list').insertAdjacentHTML('beforeend',html);loaded+=%d;});}</script>"
+            % (size, size))
+        return (f"<html>{self.head('销量排行')}<body><div id='rank-list'>"
+                f"{self.rank_rows(0, size)}</div><button class='load-more' onclick='loadMore()'>加载更多</button>"
+                f"{script}</body></html>")
+
+    def list_page(self, series_id, page):
+        review_ids = self.review_ids(series_id)
+        per_page = self.config.reviews_per_page
+        last_page = max(1, math.ceil(len(review_ids) / per_page))
+        cards = []
+        for review_id in review_ids[(page - 1) * per_page:page * per_page]:
+            review = self.review(review_id)
+            purposes = "".join(f'<li class="list_target__76fWs">{escape(p)}</li>' for p in review['purposes'])
+            ratings = "".join(f'<span>{category}<em class="list_nice_value__hI2Bw">{review["ratings"][category] / 20:.1f}</em></span>'
+                              for category in CATEGORIES[:3])
+            cards.append(
+                f'<div class="list_item__card"><div class="list_spec">{escape(review["spec"])}</div>'
+                f'<div class="list_date">{review["published"]}</div><div class="list_nice">{ratings}</div>'
+                f'<p class="list_text">{escape(review["satisfied"])}</p>'
+                f'<div class="list_buy_target__rsfaE"><ul>{purposes}</ul></div>'
+                f'<a href="/detail/view_{review_id}.html" target="_blank">查看完整口碑</a></div>')
+
+        next_class = "athm-page-next disabled" if page >= last_page else "athm-page-next"
+        next_href = f"/{series_id}?order=1&page={min(page + 1, last_page)}"
+        return (f"<html>{self.head(self.series_name(series_id) + '口碑')}<body>"
+                f"{''.join(cards)}<div class='athm-page'><a class='{next_class}' href='{next_href}'>下一页</a></div>"
+                f"</body></html>")
+
+    def detail_page(self, review_id):
+        review = self.review(review_id)
+        info = [('行驶里程', review['mileage']), ('裸车购买价', review['price']),
+                ('购买时间', review['bought']), ('购买地点', review['place'])]
+        info_html = "".join(f'<li class="item-info"><span class="key">{escape(value)}</span>'
+                            f'<span class="name">{name}</span></li>' for name, value in info)
+
+        sections = [f'<div class="space kb-item"><h1>最满意</h1><p class="kb-item-msg">{escape(review["satisfied"])}</p></div>',
+                    f'<div class="space kb-item"><h1>最不满意</h1><p class="kb-item-msg">{escape(review["unsatisfied"])}</p></div>']
+        for category in CATEGORIES:
+            sections.append(
+                f'<div class="space kb-item"><h1>{category}<div class="athm-star">'
+                f'<span class="kb-star" style="width: {review["ratings"][category]}%"></span></div></h1>'
+                f'<p class="kb-item-msg">{escape(review["comments"][category])}</p></div>')
+
+        hidden = " fn-hide" if self.config.hide_counters else ""
+        options = (f'<div class="options{hidden}"><span class="option-views">{review["views"]}</span>'
+                   f'<span class="option-goods">{review["goods"]}</span>'
+                   f'<span class="option-comments">{review["replies"]}</span></div>')
+
+        return (f"<html>{self.head('口碑详情')}<body>"
+                f'<div class="main-series">{escape(review["name"])}</div><div class="main-spec">{escape(review["spec"])}</div>'
+                f'<div class="timeline-con"><i class="timeline"></i><span>{review["published"]} 首次发表</span></div>'
+                f'<ul class="car-info">{info_html}</ul>{"".join(sections)}{options}</body></html>')
+
+    def render(self, path, query):
+        """返回 (页面类型, html)，未知路径返回 (None, None)"""
+        if path.startswith('/rank/more'):
+            start = int(query.get('start', ['0'])[0])
+            return 'rank', self.rank_rows(start, self.config.rank_page_size)
+        if path.startswith('/rank'):
+            return 'rank', self.rank_page()
+
+        match = re.match(r'^/detail/view_(\d+)\.html$', path)
+        if match:
+            return 'detail', self.detail_page(match.group(1))
+
+        match = re.match(r'^/(\d+)/?$', path)
+        if match:
+            return 'list', self.list_page(int(match.group(1)), max(1, int(query.get('page', ['1'])[0])))
+
+        if path in ('/', '/check'):
+            return 'check', "<html><head><title>mock autohome</title></head><body>ok</body></html>"
+        return None, None
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(len(sorted_values) * p / 100) - 1))
+    return sorted_values[index]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        started = time.monotonic()
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path == '/__stats':
+            self.send_body(200, json.dumps(self.site.snapshot(), ensure_ascii=False), 'application/json')
+            return
+
+        if parsed.path in STATIC_ASSETS:
+            # 静态资源只模拟延迟，不参与限流和随机错误，允许浏览器长期缓存
+            time.sleep(self.site.delay())
+            body = self.site.static_bodies[parsed.path]
+            self.send_bytes(200, body, STATIC_ASSETS[parsed.path][0],
+                            headers={'Cache-Control': 'public, max-age=86400'})
+            self.site.record('static', 200, time.monotonic() - started, len(body))
+            return
+
+        kind, html = self.site.render(parsed.path, query)
+        if kind is None:
+            self.send_body(404, "not found")
+            return
+
+        time.sleep(self.site.delay())
+        status = self.site.admit() if kind != 'check' else 200
+        if status == 429:
+            self.send_body(429, "<html><body>访问过于频繁</body></html>",
+                           headers={'Retry-After': str(self.site.config.retry_after)})
+        elif status == 500:
+            self.send_body(500, "<html><body>服务器错误</body></html>")
+        else:
+            self.send_body(200, html)
+        self.site.record(kind, status, time.monotonic() - started, len(html.encode('utf-8')) if status == 200 else 0)
+
+    def send_body(self, status, body, content_type='text/html; charset=utf-8', headers=None):
+        self.send_bytes(status, body.encode('utf-8'), content_type, headers)
+
+    def send_bytes(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # 请求统计通过 /__stats 查看
+
+
+class MockAutohomeServer:
+    """在后台线程中运行模拟站点"""
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        self.site = MockSite(config or MockConfig())
+        handler = type('BoundMockHandler', (MockHandler,), {'site': self.site})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def series_ids(self):
+        return self.site.series_ids
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    """命令行启动模拟站点"""
+    parser = argparse.ArgumentParser(description="本地模拟汽车之家站点")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--models", type=int, default=200, help="车型数量")
+    parser.add_argument("--reviews", type=int, default=120, help="每个车型的最多评论数")
+    parser.add_argument("--latency-ms", type=float, default=150, help="响应延迟中位数（毫秒）")
+    parser.add_argument("--latency-sigma", type=float, default=0.6, help="延迟对数正态分布的sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="随机返回429的比例")
+    parser.add_argument("--rate-limit", type=int, default=0, help="每秒请求数上限，超出返回429")
+    parser.add_argument("--show-counters", action="store_true", help="互动数据不放在fn-hide容器中")
+    parser.add_argument("--static-kb", type=int, default=300, help="每个页面引用的静态资源总大小（KB）")
+    args = parser.parse_args()
+
+    config = MockConfig(model_count=args.models, reviews_per_model=args.reviews, latency_ms=args.latency_ms,
+                        latency_sigma=args.latency_sigma, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, rate_limit=args.rate_limit,
+                        hide_counters=not args.show_counters, static_kb=args.static_kb)
+    server = MockAutohomeServer(config, port=args.port)
+    print(f"模拟站点已启动: {server.url}  (排名页 {server.url}/rank/，口碑列表 {server.url}/{server.series_ids[0]}?order=1)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
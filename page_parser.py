@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+评论详情页离线解析
+浏览器线程只负责加载页面和读取互动数据，页面源码交给进程池解析车辆信息和评论详情，
+抓取和解析可以分别扩展；解析结果与浏览器内逐元素提取的字段一致
+"""
+
+import re
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+
+from review_record import ReviewRecord
+
+# 发表时间的日期格式，按顺序尝试
+DATE_PATTERNS = [
+    r'(\d{4}-\d{2}-\d{2})\s+首次发表',  # 2025-08-15 首次发表
+    r'(\d{4}-\d{1,2}-\d{1,2})\s+首次发表',  # 支持单数日期
+    r'(\d{4}/\d{2}/\d{2})\s+首次发表',  # 2025/08/15 首次发表
+    r'(\d{4}\.\d{2}\.\d{2})\s+首次发表',  # 2025.08.15 首次发表
+    r'(\d{4}-\d{2}-\d{2})',  # 仅日期格式
+]
+
+CATEGORIES = ['空间', '驾驶感受', '续航', '外观', '内饰', '性价比', '智能化', '油耗', '配置']
+
+CAR_INFO_ITEMS = ['行驶里程', '夏季电耗', '春秋电耗', '冬季电耗', '夏季续航', '春秋续航', '冬季续航',
+                  '百公里油耗', '裸车购买价', '购买时间', '购买地点']
+
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+
+def parse_star_rating(style):
+    """由星级填充宽度换算5分制评分"""
+    width_match = re.search(r'width:\s*(\d+)%', style or '')
+    if width_match:
+        return round(int(width_match.group(1)) / 20, 1)
+    return 0
+
+
+def parse_publish_date(text):
+    """从时间线文本中提取发表日期，统一为YYYY-MM-DD"""
+    for pattern in DATE_PATTERNS:
+        match = re.search(pattern, text)
+        if match:
+            return match.group(1).replace('/', '-').replace('.', '-')
+    return ""
+
+
+class Node:
+    """简化的DOM节点"""
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs or [])
+        self.parent = parent
+        self.children = []  # 子节点或文本
+
+    @property
+    def classes(self):
+        return (self.attrs.get('class') or '').split()
+
+    def own_text(self):
+        """节点自身的直接文本，对应XPath的text()"""
+        return "".join(child for child in self.children if isinstance(child, str))
+
+    def text(self):
+        """节点及其后代的全部文本，去掉首尾空白"""
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            else:
+                stack.extend(reversed(node.children))
+        return re.sub(r'[ \t\r\f\v]+', ' ', "".join(parts)).strip()
+
+    def iter(self):
+        """按文档顺序遍历后代元素"""
+        stack = list(reversed([child for child in self.children if isinstance(child, Node)]))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([child for child in node.children if isinstance(child, Node)]))
+
+    def find_all(self, tag=None, cls=None):
+        return [node for node in self.iter()
+                if (tag is None or node.tag == tag) and (cls is None or cls in node.classes)]
+
+    def find(self, tag=None, cls=None):
+        for node in self.iter():
+            if (tag is None or node.tag == tag) and (cls is None or cls in node.classes):
+                return node
+        return None
+
+    def following_siblings(self):
+        if self.parent is None:
+            return []
+        siblings = [child for child in self.parent.children if isinstance(child, Node)]
+        return siblings[siblings.index(self) + 1:]
+
+
+class TreeBuilder(HTMLParser):
+    """用标准库HTMLParser构建简化DOM，容忍未闭合标签"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('document')
+        self.current = self.root
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth += 1
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth = 1
+            return
+        if tag == 'br':
+            self.current.children.append('\n')  # 与浏览器渲染文本一致，换行保留
+            return
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        if not self.skip_depth and tag not in SKIP_TAGS:
+            self.current.children.append(Node(tag, attrs, self.current))
+
+    def handle_endtag(self, tag):
+        if self.skip_depth:
+            if tag in SKIP_TAGS:
+                self.skip_depth -= 1
+            return
+        # 向上找到匹配的开始标签，中间未闭合的标签一并关闭
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.current.children.append(data)
+
+
+def build_tree(html):
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def find_heading(root, keyword):
+    """第一个直接文本包含关键字的h1"""
+    for h1 in root.find_all('h1'):
+        if keyword in h1.own_text():
+            return h1
+    return None
+
+
+def heading_message(h1):
+    """标题对应的正文：优先取后续兄弟p.kb-item-msg，其次取父节点下的p.kb-item-msg"""
+    for sibling in h1.following_siblings():
+        if sibling.tag == 'p' and 'kb-item-msg' in sibling.classes:
+            return sibling.text()
+    if h1.parent is not None:
+        for child in h1.parent.children:
+            if isinstance(child, Node) and child.tag == 'p' and 'kb-item-msg' in child.classes:
+                return child.text()
+    return None
+
+
+def parse_publish_time(root):
+    """提取发表时间"""
+    # 时间线容器
+    timeline = root.find(cls='timeline-con')
+    if timeline is not None:
+        span = timeline.find('span')
+        if span is not None:
+            publish_date = parse_publish_date(span.text())
+            if publish_date:
+                return publish_date
+
+    for span in root.find_all('span'):
+        text = span.text()
+        if '首次发表' in span.own_text():
+            publish_date = parse_publish_date(text)
+            if publish_date:
+                return publish_date
+
+    # 遍历所有包含日期格式的span
+    for span in root.find_all('span'):
+        text = span.text()
+        if '首次发表' in text or re.match(r'\d{4}-\d{1,2}-\d{1,2}', text):
+            date_match = re.search(r'(\d{4}-\d{1,2}-\d{1,2})', text)
+            if date_match:
+                return date_match.group(1)
+    return ""
+
+
+def parse_car_info(root):
+    """提取车辆基本信息"""
+    series = root.find(cls='main-series')
+    spec = root.find(cls='main-spec')
+    car_info = {
+        '车型名称': series.text() if series is not None else "",
+        '车型版本': spec.text() if spec is not None else "",
+        '发表时间': parse_publish_time(root)
+    }
+
+    info_items = dict.fromkeys(CAR_INFO_ITEMS, '')
+    for section in root.find_all('ul', 'car-info'):
+        for item in section.find_all('li', 'item-info'):
+            key_elem = item.find(cls='key')
+            name_elem = item.find(cls='name')
+            if key_elem is None or name_elem is None:
+                continue
+            name_text = name_elem.text()
+            if name_text in info_items:
+                info_items[name_text] = key_elem.text()
+
+    car_info.update(info_items)
+    return car_info
+
+
+def parse_review_details(root):
+    """提取最满意、最不满意和各分类评分、评论"""
+    review_data = {}
+
+    for field in ('最满意', '最不满意'):
+        h1 = find_heading(root, field)
+        message = heading_message(h1) if h1 is not None else None
+        review_data[field] = message or ""
+
+    for category in CATEGORIES:
+        h1 = find_heading(root, category)
+        if h1 is None:
+            review_data[f'{category}评分'] = 0
+            review_data[f'{category}评论'] = ""
+            continue
+
+        star_container = h1.find(cls='athm-star')
+        star_fill = star_container.find(cls='kb-star') if star_container is not None else None
+        review_data[f'{category}评分'] = parse_star_rating(star_fill.attrs.get('style')) if star_fill is not None else 0
+        review_data[f'{category}评论'] = heading_message(h1) or ""
+
+    review_data['追加口碑'] = parse_followups(root)
+    return review_data
+
+
+def parse_followups(root):
+    """提取追加口碑（车主后续补充的使用感受，可能有多条），每条为 标题 + 正文"""
+    followups = []
+    for h1 in root.find_all('h1'):
+        title = h1.own_text().strip()
+        if '追加' in title:
+            message = heading_message(h1)
+            if message:
+                followups.append(f"{title}\n{message}")
+    return "\n\n".join(followups)
+
+
+def parse_review_payload(payload):
+    """解析进程入口：由抓取阶段的页面源码生成完整评论记录"""
+    root = build_tree(payload['html'])
+    result = ReviewRecord(parse_car_info(root), parse_review_details(root), payload.get('互动数据', {}))
+    result['评论链接'] = payload['评论链接']
+    result['爬取时间'] = payload['爬取时间']
+    result['缺失字段'] = payload.get('缺失字段', '')
+    return result
+
+
+class ParsePipeline:
+    """页面源码解析进程池，按提交顺序返回结果"""
+
+    def __init__(self, max_workers=None):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.pending = []  # [(序号, 附加数据, future)]
+
+    def submit(self, index, payload, extra=None):
+        """提交一个页面，extra为随结果返回的附加数据（如购车目的）"""
+        self.pending.append((index, extra, self.executor.submit(parse_review_payload, payload)))
+
+    def drain(self):
+        """等待已提交的页面全部解析完成，按序号返回 [(序号, 附加数据, 记录或异常)]"""
+        results = []
+        for index, extra, future in sorted(self.pending, key=lambda item: item[0]):
+            try:
+                results.append((index, extra, future.result()))
+            except Exception as e:
+                results.append((index, extra, e))
+        self.pending = []
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
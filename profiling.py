@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+爬虫性能剖析
+按比例抽取车型（或排名页），在其爬取期间运行剖析器：
+sampling 模式由后台线程定时采集爬取线程的调用栈，开销低，可在生产环境对部分车型常开；
+cprofile 模式为确定性剖析，记录每次函数调用，开销较大，适合排查时短时间开启
+每个被剖析的车型输出一个文件，运行结束时合并为整次运行的折叠栈（可用 speedscope、flamegraph.pl 生成火焰图）
+"""
+
+import os
+import sys
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_MODES = ('sampling', 'cprofile')
+
+
+def frame_label(frame):
+    """调用栈中一帧的标签：函数名 (文件名:行号)"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """后台线程定时采集目标线程的调用栈，累计为折叠栈计数"""
+
+    def __init__(self, thread_id, interval=0.01, max_depth=64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None and len(labels) < self.max_depth:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+
+
+class ModelProfiler:
+    def __init__(self, output_dir="profiles", mode='sampling', sample_rate=0.1, interval=0.01, seed=None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"不支持的剖析模式: {mode}，可选 {PROFILE_MODES}")
+
+        self.mode = mode
+        self.sample_rate = sample_rate  # 被剖析的车型比例
+        self.interval = interval        # sampling 模式的采样间隔（秒）
+        self.random = random.Random(seed)
+        self.run_dir = os.path.join(output_dir, datetime.now().strftime('%Y%m%d_%H%M%S'))
+        self.lock = threading.Lock()
+        self.merged_stacks = Counter()
+        self.merged_stats = None
+        self.records = []  # [(名称, 耗时秒, 样本数)]
+        self.closed = False
+
+    def selected(self):
+        with self.lock:
+            return self.random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, name):
+        """剖析一段代码，未被抽中时直接执行"""
+        if self.closed or not self.selected():
+            yield
+            return
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        started = time.perf_counter()
+        if self.mode == 'sampling':
+            sampler = StackSampler(threading.get_ident(), self.interval).start()
+            try:
+                yield
+            finally:
+                self.save_stacks(name, sampler.stop(), time.perf_counter() - started, sampler.samples)
+        else:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # 同一时刻只能有一个确定性剖析器（如多线程并发爬取时），本次跳过
+                logging.warning(f"剖析{name}跳过: {e}")
+                yield
+                return
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self.save_stats(name, profiler, time.perf_counter() - started)
+
+    def save_stacks(self, name, stacks, elapsed, samples):
+        """保存单个车型的折叠栈并合并到整次运行"""
+        try:
+            self.write_collapsed(os.path.join(self.run_dir, f"{name}.collapsed"), stacks)
+            with self.lock:
+                self.merged_stacks.update(stacks)
+                self.records.append((name, elapsed, samples))
+            logging.info(f"剖析{name}完成: 耗时{elapsed:.1f}秒，采样{samples}次")
+        except Exception as e:
+            logging.error(f"保存剖析结果失败 {name}: {e}")
+
+    def save_stats(self, name, profiler, elapsed):
+        """保存单个车型的cProfile结果并合并到整次运行"""
+        try:
+            filepath = os.path.join(self.run_dir, f"{name}.prof")
+            profiler.dump_stats(filepath)
+            with self.lock:
+                if self.merged_stats is None:
+                    self.merged_stats = pstats.Stats(filepath)
+                else:
+                    self.merged_stats.add(filepath)
+                self.records.append((name, elapsed, 0))
+            logging.info(f"剖析{name}完成: 耗时{elapsed:.1f}秒")
+        except Exception as e:
+            logging.error(f"保存剖析结果失败 {name}: {e}")
+
+    def write_collapsed(self, filepath, stacks):
+        with open(filepath, 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+    def write_summary(self, filepath, top=30):
+        """合并结果摘要：各剖析对象耗时，以及自身耗时和累计耗时最多的函数"""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(f"剖析模式: {self.mode}  抽样比例: {self.sample_rate}\n")
+            f.write("=" * 60 + "\n")
+            for name, elapsed, samples in self.records:
+                f.write(f"{name}: 耗时{elapsed:.1f}秒" + (f"，采样{samples}次" if samples else "") + "\n")
+
+            if self.mode == 'cprofile':
+                if self.merged_stats is not None:
+                    f.write("\n按累计耗时排序:\n")
+                    self.merged_stats.stream = f
+                    self.merged_stats.sort_stats('cumulative').print_stats(top)
+                return
+
+            total = sum(self.merged_stacks.values()) or 1
+            self_counts = Counter()
+            inclusive_counts = Counter()
+            for stack, count in self.merged_stacks.items():
+                frames = stack.split(";")
+                self_counts[frames[-1]] += count
+                for label in set(frames):
+                    inclusive_counts[label] += count
+
+            for title, counts in (("自身耗时", self_counts), ("累计耗时", inclusive_counts)):
+                f.write(f"\n按{title}排序（占全部样本比例）:\n")
+                for label, count in counts.most_common(top):
+                    f.write(f"  {count / total:6.1%}  {label}\n")
+
+    def close(self):
+        """写出整次运行的合并结果，返回合并文件路径"""
+        if self.closed:
+            return None
+        self.closed = True
+        if not self.records:
+            return None
+
+        try:
+            if self.mode == 'sampling':
+                merged_path = os.path.join(self.run_dir, "merged.collapsed")
+                self.write_collapsed(merged_path, self.merged_stacks)
+            else:
+                merged_path = os.path.join(self.run_dir, "merged.prof")
+                self.merged_stats.dump_stats(merged_path)
+            self.write_summary(os.path.join(self.run_dir, "summary.txt"))
+            logging.info(f"剖析结果已保存到 {self.run_dir}（{len(self.records)}个，合并文件 {merged_path}）")
+            return merged_path
+
+        except Exception as e:
+            logging.error(f"保存合并剖析结果失败: {e}")
+            return None
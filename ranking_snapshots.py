@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+销量排名快照存储
+每次排名爬取结果按快照时间写入SQLite，提供新上榜、落榜、排名和销量变化的对比接口
+"""
+
+import csv
+import sqlite3
+import logging
+from datetime import datetime
+
+
+class RankingSnapshotStore:
+    def __init__(self, db_path="autohome_rankings.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(self.db_path)
+        self.setup_database()
+
+    def setup_database(self):
+        """创建快照表"""
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS ranking_snapshots (
+                    snapshot_time TEXT NOT NULL,
+                    "车型ID" TEXT NOT NULL,
+                    "销量排名" INTEGER,
+                    "车型名称" TEXT,
+                    "车型月销量" INTEGER,
+                    "价格区间" TEXT,
+                    "用户评分" REAL,
+                    PRIMARY KEY (snapshot_time, "车型ID")
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_snapshots_car_id ON ranking_snapshots ("车型ID", snapshot_time)')
+
+    def ingest(self, sales_data, snapshot_time=None):
+        """写入一次排名快照，返回快照时间"""
+        if not sales_data:
+            return None
+
+        if snapshot_time is None:
+            crawl_times = [item['爬取时间'] for item in sales_data if item.get('爬取时间')]
+            snapshot_time = min(crawl_times) if crawl_times else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        rows = []
+        for item in sales_data:
+            if not item.get('车型ID'):
+                continue
+            rows.append((snapshot_time, str(item['车型ID']), int(item.get('销量排名') or 0), item.get('车型名称', ''),
+                         int(item.get('车型月销量') or 0), item.get('价格区间', ''), float(item.get('用户评分') or 0)))
+
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO ranking_snapshots (snapshot_time, "车型ID", "销量排名", "车型名称", '
+                    '"车型月销量", "价格区间", "用户评分") VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            logging.info(f"排名快照 {snapshot_time} 写入{len(rows)}个车型")
+            return snapshot_time
+
+        except Exception as e:
+            logging.error(f"写入排名快照失败: {e}")
+            return None
+
+    def ingest_csv(self, csv_file, snapshot_time=None):
+        """导入已有的排名CSV文件"""
+        for encoding in ('utf-8-sig', 'gbk'):
+            try:
+                with open(csv_file, 'r', encoding=encoding) as f:
+                    sales_data = list(csv.DictReader(f))
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            logging.error(f"无法识别文件编码: {csv_file}")
+            return None
+
+        return self.ingest(sales_data, snapshot_time)
+
+    def list_snapshots(self):
+        """所有快照时间，按时间升序"""
+        cursor = self.conn.execute('SELECT DISTINCT snapshot_time FROM ranking_snapshots ORDER BY snapshot_time')
+        return [row[0] for row in cursor]
+
+    def load_snapshot(self, snapshot_time):
+        """读取一次快照，返回 车型ID -> 车型数据"""
+        cursor = self.conn.execute(
+            'SELECT "车型ID", "销量排名", "车型名称", "车型月销量", "价格区间", "用户评分" '
+            'FROM ranking_snapshots WHERE snapshot_time = ?', (snapshot_time,))
+        columns = ['车型ID', '销量排名', '车型名称', '车型月销量', '价格区间', '用户评分']
+        return {row[0]: dict(zip(columns, row)) for row in cursor}
+
+    def diff(self, old_time=None, new_time=None):
+        """对比两次快照，默认对比最近两次"""
+        snapshots = self.list_snapshots()
+        if new_time is None:
+            new_time = snapshots[-1] if snapshots else None
+        if old_time is None:
+            earlier = [t for t in snapshots if new_time and t < new_time]
+            old_time = earlier[-1] if earlier else None
+
+        new = self.load_snapshot(new_time) if new_time else {}
+        old = self.load_snapshot(old_time) if old_time else {}
+
+        entrants = sorted((new[car_id] for car_id in new.keys() - old.keys()), key=lambda x: x['销量排名'])
+        dropped = sorted((old[car_id] for car_id in old.keys() - new.keys()), key=lambda x: x['销量排名'])
+
+        changes = []
+        for car_id in new.keys() & old.keys():
+            changes.append({
+                **new[car_id],
+                '旧排名': old[car_id]['销量排名'],
+                '排名变化': old[car_id]['销量排名'] - new[car_id]['销量排名'],  # 正数表示上升
+                '旧月销量': old[car_id]['车型月销量'],
+                '销量变化': new[car_id]['车型月销量'] - old[car_id]['车型月销量']
+            })
+        changes.sort(key=lambda x: (-x['排名变化'], x['销量排名']))
+
+        logging.info(f"排名对比 {old_time} -> {new_time}: 新上榜{len(entrants)}个，落榜{len(dropped)}个")
+        return {
+            '旧快照': old_time,
+            '新快照': new_time,
+            '新上榜': entrants,
+            '落榜': dropped,
+            '排名变化': changes
+        }
+
+    def history(self, car_id):
+        """单个车型的历次排名和销量"""
+        cursor = self.conn.execute(
+            'SELECT snapshot_time, "销量排名", "车型月销量" FROM ranking_snapshots '
+            'WHERE "车型ID" = ? ORDER BY snapshot_time', (str(car_id),))
+        return [{'快照时间': row[0], '销量排名': row[1], '车型月销量': row[2]} for row in cursor]
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑分类评分聚合
+按车型ID、车型版本维护9个分类评分的直方图，均值、中位数、分位数均由直方图向量化计算
+评分为星级宽度换算的0.1分刻度，直方图计数即可精确还原分布；
+按评分变更日志（rating_changes，由评论存储的触发器维护）的序号增量累加，已有评论的评分变化时先减去旧值再加上新值；
+近似重复评论不计入，评论被判为重复或取消重复时同样记入变更日志
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+RATING_CATEGORIES = ['空间', '驾驶感受', '续航', '外观', '内饰', '性价比', '智能化', '油耗', '配置']
+
+# 0.0 ~ 5.0 分，0.1 分一档
+RATING_BINS = 51
+RATING_VALUES = np.arange(RATING_BINS) / 10.0
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# 缓存格式版本：2 起变更日志已排除近似重复评论
+CACHE_VERSION = 2
+
+
+class RatingAggregator:
+    def __init__(self, db_path="autohome_reviews_output/autohome_reviews.db", cache_path=None):
+        self.db_path = db_path
+        self.cache_path = cache_path or os.path.splitext(db_path)[0] + "_rating_cache.npz"
+        self.group_keys = []        # [(车型ID, 车型版本), ...]
+        self.group_index = {}       # (车型ID, 车型版本) -> 行号
+        self.counts = np.zeros((0, len(RATING_CATEGORIES), RATING_BINS), dtype=np.int64)
+        self.last_change = 0       # 已汇入的评分变更日志序号
+        self.stats_cache = {}
+        self.lock = threading.RLock()  # 并发模式下多个浏览器线程共用同一个聚合实例
+        self.load_cache()
+
+    def load_cache(self):
+        """加载已缓存的直方图和增量水位"""
+        if not os.path.exists(self.cache_path):
+            return
+
+        try:
+            cache = np.load(self.cache_path, allow_pickle=False)
+            if 'version' not in cache or int(cache['version']) != CACHE_VERSION:
+                # 旧版缓存按rowid记录水位，或变更日志未排除近似重复评论，重新计算
+                logging.info("评分聚合缓存为旧格式，将重新计算")
+                return
+            self.group_keys = list(zip(cache['car_ids'].tolist(), cache['specs'].tolist()))
+            self.group_index = {key: i for i, key in enumerate(self.group_keys)}
+            self.counts = cache['counts']
+            self.last_change = int(cache['last_change'])
+            logging.info(f"评分聚合缓存已加载: {len(self.group_keys)}个车型版本，水位序号={self.last_change}")
+        except Exception as e:
+            logging.warning(f"评分聚合缓存加载失败，将重新计算: {e}")
+            self.reset()
+
+    def save_cache(self):
+        """保存直方图和增量水位"""
+        try:
+            with self.lock:
+                car_ids = np.array([key[0] for key in self.group_keys], dtype=str)
+                specs = np.array([key[1] for key in self.group_keys], dtype=str)
+                with open(self.cache_path, 'wb') as f:
+                    np.savez_compressed(f, car_ids=car_ids, specs=specs, counts=self.counts,
+                                        last_change=np.int64(self.last_change), version=np.int64(CACHE_VERSION))
+        except Exception as e:
+            logging.error(f"保存评分聚合缓存失败: {e}")
+
+    def reset(self):
+        """清空聚合结果"""
+        self.group_keys = []
+        self.group_index = {}
+        self.counts = np.zeros((0, len(RATING_CATEGORIES), RATING_BINS), dtype=np.int64)
+        self.last_change = 0
+        self.stats_cache = {}
+
+    def table_exists(self, conn, name):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+
+    def exclude_duplicates_sql(self, conn):
+        # 近似重复评论（同一口碑多版本转发、重复发布）不计入评分分布
+        if self.table_exists(conn, 'review_duplicates'):
+            return ' AND "评论ID" NOT IN (SELECT "评论ID" FROM review_duplicates)'
+        return ''
+
+    def refresh(self):
+        """读取水位之后的评分变更并累加到直方图（评分变化的评论先减旧值再加新值，
+        近似重复的标记和取消由触发器记为-1/+1），返回变更条数"""
+        with self.lock:
+            columns = ", ".join(f'"{category}评分"' for category in RATING_CATEGORIES)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                # 首次聚合，或数据库还没有变更日志时，只能全量计算
+                full = ((self.last_change == 0 and not self.group_keys)
+                        or not self.table_exists(conn, 'rating_changes'))
+                if not full:
+                    df = pd.read_sql_query(
+                        f'SELECT "序号", "车型ID", "车型版本", "权重", {columns} FROM rating_changes '
+                        f'WHERE "序号" > ? ORDER BY "序号"',
+                        conn, params=(self.last_change,))
+            finally:
+                conn.close()
+
+            if full:
+                return self.rebuild()
+            if df.empty:
+                return 0
+
+            self.add_batch(df, df['权重'].to_numpy(dtype=np.int64))
+            self.last_change = int(df['序号'].max())
+            logging.info(f"评分聚合汇入{len(df)}条评分变更")
+            return len(df)
+
+    def rebuild(self):
+        """从评论表全量重新聚合，水位设为同一读事务内变更日志的最大序号"""
+        with self.lock:
+            self.reset()
+            columns = ", ".join(f'"{category}评分"' for category in RATING_CATEGORIES)
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute("BEGIN")  # 日志序号和评论表读取同一个快照
+                if self.table_exists(conn, 'rating_changes'):
+                    self.last_change = conn.execute(
+                        'SELECT COALESCE(MAX("序号"), 0) FROM rating_changes').fetchone()[0]
+                df = pd.read_sql_query(f'SELECT "车型ID", "车型版本", {columns} FROM reviews '
+                                       f'WHERE 1 = 1{self.exclude_duplicates_sql(conn)}', conn)
+                conn.rollback()
+            finally:
+                conn.close()
+
+            if not df.empty:
+                self.add_batch(df)
+            logging.info(f"评分聚合全量计算{len(df)}条评论，水位序号={self.last_change}")
+            return len(df)
+
+    def add_batch(self, df, weights=None):
+        """将一批评论评分向量化累加到直方图，weights为每行的权重（+1累加，-1减去），默认全部为+1"""
+        car_ids = df['车型ID'].fillna('').astype(str).to_numpy()
+        specs = df['车型版本'].fillna('').astype(str).to_numpy()
+
+        # 为新出现的车型版本分配行号
+        group_rows = np.empty(len(df), dtype=np.int64)
+        new_keys = []
+        for i, key in enumerate(zip(car_ids, specs)):
+            row = self.group_index.get(key)
+            if row is None:
+                row = len(self.group_keys) + len(new_keys)
+                self.group_index[key] = row
+                new_keys.append(key)
+            group_rows[i] = row
+
+        if new_keys:
+            self.group_keys.extend(new_keys)
+            padding = np.zeros((len(new_keys), len(RATING_CATEGORIES), RATING_BINS), dtype=np.int64)
+            self.counts = np.concatenate([self.counts, padding])
+
+        ratings = df[[f'{category}评分' for category in RATING_CATEGORIES]].apply(
+            pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        bins = np.rint(np.nan_to_num(ratings) * 10).astype(np.int64)
+        # 评分为0表示页面上没有该分类
+        valid = (ratings > 0) & (bins < RATING_BINS)
+
+        rows = np.broadcast_to(group_rows[:, None], ratings.shape)[valid]
+        categories = np.broadcast_to(np.arange(len(RATING_CATEGORIES))[None, :], ratings.shape)[valid]
+        values = 1 if weights is None else np.broadcast_to(weights[:, None], ratings.shape)[valid]
+        np.add.at(self.counts, (rows, categories, bins[valid]), values)
+
+        self.stats_cache = {}
+
+    def _stats_from_counts(self, counts):
+        """由直方图计算样本数、均值和分位数，counts形状为[组数, 分类数, 档位数]"""
+        totals = counts.sum(axis=-1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (counts * RATING_VALUES).sum(axis=-1) / totals
+
+        cumulative = counts.cumsum(axis=-1)
+        percentiles = {}
+        for p in PERCENTILES:
+            threshold = np.ceil(totals * p / 100.0)[..., None]
+            index = np.argmax(cumulative >= np.maximum(threshold, 1), axis=-1)
+            percentiles[p] = np.where(totals > 0, RATING_VALUES[index], np.nan)
+
+        # 直方图按整星分为5档：(0,1] (1,2] (2,3] (3,4] (4,5]
+        star_edges = [1, 11, 21, 31, 41, RATING_BINS]
+        stars = np.stack([counts[..., star_edges[i]:star_edges[i + 1]].sum(axis=-1) for i in range(5)], axis=-1)
+        return totals, means, percentiles, stars
+
+    def get_stats(self, level='车型版本'):
+        """返回评分分布统计表，level为'车型ID'或'车型版本'"""
+        if level in self.stats_cache:
+            return self.stats_cache[level]
+
+        if level == '车型ID':
+            car_codes, car_ids = pd.factorize(pd.Series([key[0] for key in self.group_keys], dtype=object))
+            counts = np.zeros((len(car_ids), len(RATING_CATEGORIES), RATING_BINS), dtype=np.int64)
+            np.add.at(counts, car_codes, self.counts)
+            keys = [(car_id,) for car_id in car_ids]
+            key_columns = ['车型ID']
+        else:
+            counts = self.counts
+            keys = self.group_keys
+            key_columns = ['车型ID', '车型版本']
+
+        totals, means, percentiles, stars = self._stats_from_counts(counts)
+
+        group_count, category_count = totals.shape
+        group_rows = np.repeat(np.arange(group_count), category_count)
+        category_rows = np.tile(np.arange(category_count), group_count)
+
+        stats = pd.DataFrame({column: [keys[g][i] for g in group_rows] for i, column in enumerate(key_columns)})
+        stats['分类'] = [RATING_CATEGORIES[c] for c in category_rows]
+        stats['样本数'] = totals.ravel()
+        stats['均值'] = np.round(means.ravel(), 3)
+        for p in PERCENTILES:
+            stats['中位数' if p == 50 else f'P{p}'] = percentiles[p].ravel()
+        for i in range(5):
+            stats[f'{i + 1}星'] = stars[..., i].ravel()
+
+        stats = stats[stats['样本数'] > 0].reset_index(drop=True)
+        self.stats_cache[level] = stats
+        return stats
+
+    def export_stats(self, output_dir, timestamp):
+        """导出按车型和按车型版本的评分分布"""
+        try:
+            for level, name in (('车型ID', 'model'), ('车型版本', 'spec')):
+                filepath = os.path.join(output_dir, f"rating_stats_by_{name}_{timestamp}.csv")
+                self.get_stats(level).to_csv(filepath, index=False, encoding='utf-8-sig')
+                logging.info(f"评分分布已保存到 {filepath}")
+        except Exception as e:
+            logging.error(f"导出评分分布失败: {e}")
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑数据本地查询服务
+在评论库和排名快照库之上提供只读HTTP接口（车型统计、最新评论、评分分布、排名历史），
+查询结果序列化后放入带过期时间的LRU缓存；后台线程轮询 model_versions 表，
+某个车型重新保存后只淘汰该车型及全局列表的缓存，热点查询直接从内存返回
+用法: python review_api.py --port 8600 [--ranking-db autohome_rankings.db]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from rating_aggregator import RatingAggregator
+
+# 最新评论接口返回的字段
+RECENT_REVIEW_FIELDS = ['评论ID', '车型版本', '发表时间', '行驶里程', '裸车购买价', '购买地点', '最满意', '最不满意',
+                        '观看数', '点赞数', '评论数', '购车目的', '评论链接']
+
+
+class ResultCache:
+    """带过期时间的LRU缓存，键为 (范围, 车型ID, 接口, 参数)，车型ID为None表示跨车型的全局结果"""
+
+    def __init__(self, max_entries=1024, ttl=600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # 键 -> (写入时间, 值)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.versions = {}  # (范围, 车型ID) -> 淘汰次数，车型ID为'*'表示整个范围
+
+    def token(self, scope, car_id):
+        """计算结果之前取得的版本标记，put时标记已变化说明期间发生过淘汰"""
+        with self.lock:
+            return self.versions.get((scope, '*'), 0), self.versions.get((scope, car_id), 0)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, token=None):
+        """写入缓存；token与当前版本不一致（计算期间该车型被淘汰）时不写入，返回是否写入"""
+        with self.lock:
+            if token is not None and token != (self.versions.get((key[0], '*'), 0),
+                                                self.versions.get((key[0], key[1]), 0)):
+                return False
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            return True
+
+    def invalidate(self, scope, car_ids=None):
+        """淘汰某个范围的缓存；指定车型时只淘汰这些车型和该范围的全局结果"""
+        with self.lock:
+            bumped = [(scope, '*')] if car_ids is None else [(scope, None)] + [(scope, car_id) for car_id in car_ids]
+            for version_key in bumped:
+                self.versions[version_key] = self.versions.get(version_key, 0) + 1
+            stale = [key for key in self.entries
+                     if key[0] == scope and (car_ids is None or key[1] is None or key[1] in car_ids)]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {'条目数': len(self.entries), '命中': self.hits, '未命中': self.misses,
+                    '命中率': round(self.hits / total, 4) if total else 0, '淘汰': self.invalidations}
+
+
+class ReviewQueryService:
+    def __init__(self, db_path="autohome_reviews_output/autohome_reviews.db", ranking_db=None,
+                 cache=None, poll_interval=2.0):
+        self.db_path = db_path
+        self.ranking_db = ranking_db if ranking_db and os.path.exists(ranking_db) else None
+        self.cache = cache or ResultCache()
+        self.poll_interval = poll_interval
+        self.local = threading.local()  # 每个请求线程一个只读连接
+        self.rating_aggregator = RatingAggregator(db_path)
+        self.rating_lock = threading.Lock()
+        self.ratings_stale = True
+        self.model_versions = {}
+        self.data_versions = {}
+        self.watch_conns = {}  # data_version 是连接级的计数，必须始终用同一个连接轮询
+        self.stopped = threading.Event()
+        self.watcher = threading.Thread(target=self.watch, daemon=True)
+
+    def connect(self, path):
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def reviews_conn(self):
+        if getattr(self.local, 'reviews', None) is None:
+            self.local.reviews = self.connect(self.db_path)
+        return self.local.reviews
+
+    def ranking_conn(self):
+        if getattr(self.local, 'ranking', None) is None:
+            self.local.ranking = self.connect(self.ranking_db)
+        return self.local.ranking
+
+    def has_table(self, conn, name):
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+
+    def start(self):
+        self.watch_conns['reviews'] = self.connect(self.db_path)
+        if self.ranking_db:
+            self.watch_conns['ranking'] = self.connect(self.ranking_db)
+        self.check_versions()
+        self.watcher.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.watcher.join()
+        for conn in self.watch_conns.values():
+            conn.close()
+        self.watch_conns = {}
+
+    def watch(self):
+        """后台轮询数据版本，发现变化时淘汰对应缓存"""
+        while not self.stopped.wait(self.poll_interval):
+            self.check_versions()
+
+    def check_versions(self):
+        """PRAGMA data_version 只在其他连接提交后变化，未变化时不读取任何表"""
+        try:
+            for scope, conn in self.watch_conns.items():
+                data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+                if self.data_versions.get(scope) == data_version:
+                    continue
+                first_check = scope not in self.data_versions
+                self.data_versions[scope] = data_version
+
+                if scope == 'ranking':
+                    if not first_check:
+                        self.cache.invalidate('ranking')
+                    continue
+
+                if not self.has_table(conn, 'model_versions'):
+                    continue
+                versions = dict(conn.execute('SELECT "车型ID", "版本" FROM model_versions'))
+                changed = {car_id for car_id, version in versions.items() if self.model_versions.get(car_id) != version}
+                self.model_versions = versions
+                if changed and not first_check:
+                    removed = self.cache.invalidate('reviews', changed)
+                    self.ratings_stale = True
+                    logging.info(f"{len(changed)}个车型数据已更新，淘汰缓存{removed}条")
+        except Exception as e:
+            logging.error(f"检查数据版本失败: {e}")
+
+    def cached(self, scope, car_id, endpoint, params, compute):
+        """查询结果序列化为JSON字节后缓存，命中时直接返回；计算期间该车型数据被更新时，结果只返回不缓存"""
+        key = (scope, car_id, endpoint, params)
+        body = self.cache.get(key)
+        if body is None:
+            token = self.cache.token(scope, car_id)
+            body = json.dumps(compute(), ensure_ascii=False, default=str).encode('utf-8')
+            self.cache.put(key, body, token)
+        return body
+
+    def models(self):
+        """所有车型的评论数和最近爬取时间"""
+        def compute():
+            cursor = self.reviews_conn().execute(
+                'SELECT "车型ID", MAX("车型名称"), COUNT(*), MAX("发表时间"), MAX("爬取时间") '
+                'FROM reviews GROUP BY "车型ID" ORDER BY COUNT(*) DESC')
+            return [{'车型ID': row[0], '车型名称': row[1], '评论数量': row[2], '最新发表时间': row[3],
+                     '最近爬取时间': row[4]} for row in cursor]
+        return self.cached('reviews', None, 'models', (), compute)
+
+    def model_stats(self, car_id):
+        """单车型统计：评论数、近似重复数、互动数据合计、标准化价格和里程均值"""
+        def compute():
+            conn = self.reviews_conn()
+            exclude_sql = ''
+            duplicates = 0
+            if self.has_table(conn, 'review_duplicates'):
+                exclude_sql = ' AND "评论ID" NOT IN (SELECT "评论ID" FROM review_duplicates)'
+                duplicates = conn.execute('SELECT COUNT(*) FROM review_duplicates WHERE "车型ID" = ?',
+                                          (car_id,)).fetchone()[0]
+            row = conn.execute(
+                'SELECT COUNT(*), MAX("车型名称"), MIN("发表时间"), MAX("发表时间"), MAX("爬取时间"), '
+                'SUM("观看数"), SUM("点赞数"), SUM("评论数"), AVG("裸车购买价_元"), AVG("行驶里程_km") '
+                f'FROM reviews WHERE "车型ID" = ?{exclude_sql}', (car_id,)).fetchone()
+            if not row[0]:
+                return None
+            stats = {
+                '车型ID': car_id, '车型名称': row[1], '评论数量': row[0], '近似重复评论数': duplicates,
+                '最早发表时间': row[2], '最新发表时间': row[3], '最近爬取时间': row[4],
+                '总观看数': row[5] or 0, '总点赞数': row[6] or 0, '总评论数': row[7] or 0,
+                '平均裸车价_元': round(row[8], 0) if row[8] is not None else None,
+                '平均行驶里程_km': round(row[9], 0) if row[9] is not None else None,
+                '数据版本': self.model_versions.get(car_id)
+            }
+            return stats
+        return self.cached('reviews', car_id, 'stats', (), compute)
+
+    def recent_reviews(self, car_id, limit=20):
+        """单车型最新发表的评论"""
+        def compute():
+            column_sql = ", ".join(f'"{name}"' for name in RECENT_REVIEW_FIELDS)
+            cursor = self.reviews_conn().execute(
+                f'SELECT {column_sql} FROM reviews WHERE "车型ID" = ? ORDER BY "发表时间" DESC LIMIT ?',
+                (car_id, limit))
+            return [dict(zip(RECENT_REVIEW_FIELDS, row)) for row in cursor]
+        return self.cached('reviews', car_id, 'reviews', (limit,), compute)
+
+    def rating_distribution(self, car_id, level='车型ID'):
+        """单车型的分类评分分布，level为'车型ID'或'车型版本'"""
+        def compute():
+            with self.rating_lock:
+                if self.ratings_stale:
+                    self.ratings_stale = False
+                    self.rating_aggregator.refresh()
+                stats = self.rating_aggregator.get_stats(level)
+                stats = stats[stats['车型ID'] == car_id]
+                return json.loads(stats.to_json(orient='records', force_ascii=False))
+        return self.cached('reviews', car_id, 'ratings', (level,), compute)
+
+    def ranking_history(self, car_id):
+        """单车型的历次销量排名"""
+        def compute():
+            if not self.ranking_db:
+                return []
+            cursor = self.ranking_conn().execute(
+                'SELECT snapshot_time, "销量排名", "车型月销量", "用户评分" FROM ranking_snapshots '
+                'WHERE "车型ID" = ? ORDER BY snapshot_time', (car_id,))
+            return [{'快照时间': row[0], '销量排名': row[1], '车型月销量': row[2], '用户评分': row[3]} for row in cursor]
+        return self.cached('ranking', car_id, 'ranking', (), compute)
+
+
+class ReviewApiHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def do_GET(self):
+        started = time.perf_counter()
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = [part for part in parsed.path.split('/') if part]
+
+        try:
+            if parts == ['models']:
+                body = self.service.models()
+            elif parts == ['__cache']:
+                body = json.dumps(self.service.cache.stats(), ensure_ascii=False).encode('utf-8')
+            elif len(parts) == 3 and parts[0] == 'models':
+                car_id, endpoint = parts[1], parts[2]
+                if endpoint == 'stats':
+                    body = self.service.model_stats(car_id)
+                elif endpoint == 'reviews':
+                    limit = min(int(query.get('limit', ['20'])[0]), 500)
+                    body = self.service.recent_reviews(car_id, limit)
+                elif endpoint == 'ratings':
+                    level = query.get('level', ['车型ID'])[0]
+                    if level not in ('车型ID', '车型版本'):
+                        return self.send_json(400, {'错误': f"不支持的level: {level}"})
+                    body = self.service.rating_distribution(car_id, level)
+                elif endpoint == 'ranking':
+                    body = self.service.ranking_history(car_id)
+                else:
+                    return self.send_json(404, {'错误': f"未知接口: {parsed.path}"})
+            else:
+                return self.send_json(404, {'错误': f"未知接口: {parsed.path}"})
+
+            if body == b'null':
+                return self.send_json(404, {'错误': "没有该车型的数据"})
+            self.send_body(200, body, started)
+
+        except ValueError as e:
+            self.send_json(400, {'错误': str(e)})
+        except Exception as e:
+            logging.error(f"查询失败 {self.path}: {e}")
+            self.send_json(500, {'错误': str(e)})
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def send_body(self, status, body, started=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if started is not None:
+            self.send_header('X-Query-Ms', f"{(time.perf_counter() - started) * 1000:.2f}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def create_server(service, host='127.0.0.1', port=8600):
+    """创建绑定了查询服务的HTTP服务器"""
+    handler = type('BoundReviewApiHandler', (ReviewApiHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="汽车之家口碑数据本地查询服务")
+    parser.add_argument("--output-dir", default="autohome_reviews_output", help="评论爬虫输出目录")
+    parser.add_argument("--db", default=None, help="评论库路径，默认为输出目录下的 autohome_reviews.db")
+    parser.add_argument("--ranking-db", default="autohome_rankings.db", help="排名快照库路径")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--cache-size", type=int, default=1024, help="缓存的查询结果条数上限")
+    parser.add_argument("--ttl", type=float, default=600, help="缓存过期时间（秒）")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="检查数据版本的间隔（秒）")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(args.output_dir, "autohome_reviews.db")
+    if not os.path.exists(db_path):
+        logging.error(f"评论库不存在: {db_path}")
+        return 1
+
+    service = ReviewQueryService(db_path, args.ranking_db, ResultCache(args.cache_size, args.ttl),
+                                 args.poll_interval).start()
+    server = create_server(service, args.host, args.port)
+    logging.info(f"查询服务已启动: http://{args.host}:{server.server_address[1]}  "
+                 f"(/models, /models/<车型ID>/stats|reviews|ratings|ranking, /__cache)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑评论链接去重
+将详情页链接规范化为整数评论ID，用mmap映射到文件的布隆过滤器判断是否已爬取，跨车型、跨运行持久有效
+"""
+
+import os
+import math
+import mmap
+import struct
+import hashlib
+import logging
+
+from review_store import parse_review_id
+
+# 文件头：魔数、位数组长度、已写入数量、哈希函数个数
+HEADER_FORMAT = '<4sQQI'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b'AHBF'
+
+
+def review_id_to_int(review_id):
+    """将评论ID转换为64位整数，非纯数字ID使用稳定哈希"""
+    if review_id.isdigit():
+        return int(review_id) & 0xFFFFFFFFFFFFFFFF
+    digest = hashlib.blake2b(review_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class ReviewDedupFilter:
+    def __init__(self, path="autohome_reviews_output/review_ids.bloom", capacity=20000000, error_rate=0.001):
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = 0
+        self.num_hashes = 0
+        self.count = 0
+        self.file = None
+        self.mm = None
+        self.open_filter()
+
+    def open_filter(self):
+        """打开或创建布隆过滤器文件"""
+        if not os.path.exists(self.path):
+            # 按目标容量和误判率计算位数组长度和哈希函数个数
+            num_bits = int(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2))
+            num_bits = (num_bits + 7) // 8 * 8
+            num_hashes = max(1, round(num_bits / self.capacity * math.log(2)))
+
+            file_dir = os.path.dirname(self.path)
+            if file_dir and not os.path.exists(file_dir):
+                os.makedirs(file_dir)
+
+            with open(self.path, 'wb') as f:
+                f.write(struct.pack(HEADER_FORMAT, MAGIC, num_bits, 0, num_hashes))
+                f.truncate(HEADER_SIZE + num_bits // 8)
+            logging.info(f"创建去重过滤器: {self.path} ({num_bits // 8 // 1024 // 1024}MB, {num_hashes}个哈希函数)")
+
+        self.file = open(self.path, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        magic, self.num_bits, self.count, self.num_hashes = struct.unpack_from(HEADER_FORMAT, self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"去重过滤器文件格式错误: {self.path}")
+
+        logging.info(f"去重过滤器已加载，已记录{self.count}个评论ID")
+
+    def _positions(self, review_key):
+        """双重哈希计算位位置"""
+        digest = hashlib.blake2b(review_key.to_bytes(8, 'big'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def normalize(self, review_url):
+        """将详情页链接规范化为整数评论ID"""
+        review_id = parse_review_id(review_url)
+        if not review_id:
+            return None
+        return review_id_to_int(review_id)
+
+    def contains(self, review_url):
+        """判断评论是否已爬取过"""
+        review_key = self.normalize(review_url)
+        if review_key is None:
+            return False
+
+        for position in self._positions(review_key):
+            if not self.mm[HEADER_SIZE + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, review_url):
+        """记录已爬取的评论，返回是否为新ID"""
+        review_key = self.normalize(review_url)
+        if review_key is None:
+            return False
+
+        is_new = False
+        for position in self._positions(review_key):
+            offset = HEADER_SIZE + (position >> 3)
+            bit = 1 << (position & 7)
+            byte = self.mm[offset]
+            if not byte & bit:
+                self.mm[offset] = byte | bit
+                is_new = True
+
+        if is_new:
+            self.count += 1
+            struct.pack_into('<Q', self.mm, 12, self.count)
+            if self.count == self.capacity:
+                logging.warning(f"去重过滤器已达到设计容量{self.capacity}，误判率将上升")
+        return is_new
+
+    def add_reviews(self, reviews):
+        """记录已成功入库的评论，字段不完整的评论不计入，下次仍会完整爬取；返回新记录的数量"""
+        return sum(1 for review in reviews if not review.get('缺失字段') and self.add(review.get('评论链接', '')))
+
+    def flush(self):
+        """将修改刷入磁盘"""
+        if self.mm:
+            self.mm.flush()
+
+    def close(self):
+        """关闭过滤器文件"""
+        if self.mm:
+            self.mm.flush()
+            self.mm.close()
+            self.mm = None
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑评论近似重复检测
+将最满意/最不满意及各分类评论拼接后按字符3-gram切片，批量计算MinHash签名，
+用LSH分段分桶只与同桶评论比较；随评论入库增量更新，近似重复的评论归入最早入库的代表评论
+"""
+
+import re
+import zlib
+import sqlite3
+import logging
+import hashlib
+import numpy as np
+
+from review_store import parse_review_id
+from review_search import SEARCH_FIELDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# 去掉空白和标点，只保留文字、字母、数字参与切片
+NOISE_PATTERN = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def review_text(review):
+    """拼接参与比较的评论字段"""
+    return "".join(str(review.get(field) or '') for field in SEARCH_FIELDS)
+
+
+def shingle_hashes(text, shingle_size=3):
+    """字符n-gram切片的32位哈希集合"""
+    text = NOISE_PATTERN.sub('', text)
+    if len(text) < shingle_size:
+        return np.zeros(0, dtype=np.uint64)
+    shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+    return np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class NearDuplicateIndex:
+    def __init__(self, db_path="autohome_reviews_output/autohome_reviews.db", num_perm=128, bands=32,
+                 threshold=0.8, shingle_size=3, min_shingles=10, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm必须能被bands整除")
+
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold          # 签名估计的Jaccard相似度达到该值视为近似重复
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles    # 过短的评论不参与检测，避免空评论互相匹配
+        self.max_chunk_shingles = 20000     # 每次向量化计算的切片数上限，控制内存
+
+        # 固定种子，跨运行的签名可以互相比较
+        rng = np.random.RandomState(seed)
+        self.perm_a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.perm_b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.setup_database()
+
+    def setup_database(self):
+        """创建签名表、LSH分桶表和重复关系表"""
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_minhash ('
+                              '"评论ID" TEXT PRIMARY KEY, "车型ID" TEXT, signature BLOB NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_lsh ('
+                              'band INTEGER NOT NULL, bucket INTEGER NOT NULL, "评论ID" TEXT NOT NULL, '
+                              'PRIMARY KEY (band, bucket, "评论ID")) WITHOUT ROWID')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_lsh_review ON review_lsh ("评论ID")')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_duplicates ('
+                              '"评论ID" TEXT PRIMARY KEY, "代表评论ID" TEXT NOT NULL, "车型ID" TEXT, "相似度" REAL)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_duplicates_rep ON review_duplicates ("代表评论ID")')
+
+    def signatures(self, hash_sets):
+        """批量计算MinHash签名，返回 (评论数, num_perm) 数组，空切片集合对应行为MAX_HASH"""
+        result = np.full((len(hash_sets), self.num_perm), MAX_HASH, dtype=np.uint64)
+        start = 0
+        while start < len(hash_sets):
+            # 按切片总数分块，块内所有切片一次性完成 num_perm 次哈希
+            end, total = start, 0
+            while end < len(hash_sets) and (end == start or total + len(hash_sets[end]) <= self.max_chunk_shingles):
+                total += len(hash_sets[end])
+                end += 1
+
+            chunk = hash_sets[start:end]
+            lengths = np.array([len(hashes) for hashes in chunk])
+            if lengths.sum():
+                values = np.concatenate(chunk)
+                hashed = (np.outer(values, self.perm_a) + self.perm_b) % MERSENNE_PRIME & MAX_HASH
+                offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+                non_empty = lengths > 0
+                result[start:end][non_empty] = np.minimum.reduceat(hashed, offsets[non_empty], axis=0)
+            start = end
+        return result
+
+    def band_buckets(self, signature):
+        """签名分段后的桶号"""
+        buckets = []
+        for band in range(self.bands):
+            segment = signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+            digest = hashlib.blake2b(segment, digest_size=8).digest()
+            buckets.append((band, int.from_bytes(digest, 'big', signed=True)))
+        return buckets
+
+    def find_similar(self, review_id, signature, buckets):
+        """在同桶评论中找相似度最高且达到阈值的一条，返回 (评论ID, 相似度) 或 None"""
+        candidates = set()
+        for band, bucket in buckets:
+            cursor = self.conn.execute('SELECT "评论ID" FROM review_lsh WHERE band = ? AND bucket = ?', (band, bucket))
+            candidates.update(row[0] for row in cursor)
+        candidates.discard(review_id)
+        if not candidates:
+            return None
+
+        candidates = list(candidates)
+        placeholders = ", ".join("?" for _ in candidates)
+        rows = self.conn.execute(f'SELECT "评论ID", signature FROM review_minhash WHERE "评论ID" IN ({placeholders})',
+                                 candidates).fetchall()
+        if not rows:
+            return None
+
+        stored = np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint64).reshape(len(rows), self.num_perm)
+        similarities = (stored == signature).mean(axis=1)
+        best = int(similarities.argmax())
+        if similarities[best] >= self.threshold:
+            return rows[best][0], float(similarities[best])
+        return None
+
+    def representative(self, review_id):
+        """沿重复关系找到代表评论"""
+        row = self.conn.execute('SELECT "代表评论ID" FROM review_duplicates WHERE "评论ID" = ?', (review_id,)).fetchone()
+        return row[0] if row else review_id
+
+    def add_reviews(self, car_id, reviews):
+        """增量加入一批已入库的评论，返回本批新发现的近似重复数"""
+        items = []
+        for review in reviews:
+            review_id = parse_review_id(review.get('评论链接', ''))
+            hashes = shingle_hashes(review_text(review), self.shingle_size)
+            if review_id and len(hashes) >= self.min_shingles:
+                items.append((review_id, hashes))
+        if not items:
+            return 0
+
+        signatures = self.signatures([hashes for _, hashes in items])
+        found = 0
+
+        try:
+            with self.conn:
+                for (review_id, _), signature in zip(items, signatures):
+                    # 重新入库（如追加口碑后再次爬取）时以最新内容重新分桶
+                    self.conn.execute('DELETE FROM review_lsh WHERE "评论ID" = ?', (review_id,))
+                    self.conn.execute('DELETE FROM review_duplicates WHERE "评论ID" = ?', (review_id,))
+
+                    buckets = self.band_buckets(signature)
+                    match = self.find_similar(review_id, signature, buckets)
+                    rep_id = self.representative(match[0]) if match else review_id
+                    if rep_id != review_id:
+                        self.conn.execute(
+                            'INSERT OR REPLACE INTO review_duplicates ("评论ID", "代表评论ID", "车型ID", "相似度") '
+                            'VALUES (?, ?, ?, ?)', (review_id, rep_id, str(car_id), round(match[1], 3)))
+                        found += 1
+
+                    self.conn.execute('INSERT OR REPLACE INTO review_minhash ("评论ID", "车型ID", signature) VALUES (?, ?, ?)',
+                                      (review_id, str(car_id), signature.tobytes()))
+                    # 只有代表评论进入分桶，重复簇再大也不会让同桶候选数膨胀
+                    if rep_id == review_id:
+                        self.conn.executemany('INSERT OR IGNORE INTO review_lsh (band, bucket, "评论ID") VALUES (?, ?, ?)',
+                                              [(band, bucket, review_id) for band, bucket in buckets])
+
+            if found:
+                logging.info(f"车型{car_id}发现{found}条近似重复评论")
+            return found
+
+        except Exception as e:
+            logging.error(f"近似重复检测失败: {e}")
+            return 0
+
+    def duplicate_ids(self, car_id=None):
+        """被判定为近似重复（非代表）的评论ID集合"""
+        if car_id is None:
+            cursor = self.conn.execute('SELECT "评论ID" FROM review_duplicates')
+        else:
+            cursor = self.conn.execute('SELECT "评论ID" FROM review_duplicates WHERE "车型ID" = ?', (str(car_id),))
+        return {row[0] for row in cursor}
+
+    def clusters(self, min_size=2):
+        """近似重复簇：代表评论ID -> [代表评论ID, 重复评论ID, ...]"""
+        result = {}
+        for review_id, rep_id in self.conn.execute('SELECT "评论ID", "代表评论ID" FROM review_duplicates'):
+            result.setdefault(rep_id, [rep_id]).append(review_id)
+        return {rep_id: members for rep_id, members in result.items() if len(members) >= min_size}
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
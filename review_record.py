@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑评论记录类型
+每条评论是一个按标准字段顺序定义 __slots__ 的对象，不再为每条评论保存一份中文键的字典；
+提供 get/[] 等字典式读写，CSV、Parquet 和数据库写入都直接按字段顺序取值成行，批量写出
+"""
+
+import csv
+import logging
+import hashlib
+from operator import attrgetter
+
+import pandas as pd
+
+# 评论CSV的标准字段顺序
+REVIEW_FIELDNAMES = [
+    '车型名称', '车型版本', '发表时间', '行驶里程', '夏季电耗', '春秋电耗', '冬季电耗',
+    '夏季续航', '春秋续航', '冬季续航', '百公里油耗', '裸车购买价',
+    '购买时间', '购买地点', '最满意', '最不满意',
+    '空间评分', '空间评论', '驾驶感受评分', '驾驶感受评论',
+    '续航评分', '续航评论', '外观评分', '外观评论',
+    '内饰评分', '内饰评论', '性价比评分', '性价比评论',
+    '智能化评分', '智能化评论', '油耗评分', '油耗评论',
+    '配置评分', '配置评论', '追加口碑', '观看数', '点赞数', '评论数',
+    '购车目的', '评论链接', '爬取时间', '缺失字段'
+]
+
+# 数值型字段（评分、互动数据）
+NUMERIC_FIELDS = {name for name in REVIEW_FIELDNAMES if name.endswith('评分')} | {'观看数', '点赞数', '评论数'}
+
+# 评论正文字段，内容哈希只覆盖这些字段（互动数据每次都在变化，不参与）
+CONTENT_FIELDS = [name for name in REVIEW_FIELDNAMES
+                  if name in ('最满意', '最不满意', '追加口碑') or name.endswith(('评分', '评论'))]
+
+_FIELD_SET = frozenset(REVIEW_FIELDNAMES)
+_get_values = attrgetter(*REVIEW_FIELDNAMES)
+
+
+class ReviewRecord:
+    """一条口碑评论，槽位值为None表示该字段未赋值（与字典中不存在该键等价）"""
+
+    __slots__ = tuple(REVIEW_FIELDNAMES)
+
+    def __init__(self, *parts):
+        """按顺序合并多个字典（如车辆信息、评论详情、互动数据），后者覆盖前者"""
+        for name in REVIEW_FIELDNAMES:
+            object.__setattr__(self, name, None)
+        for part in parts:
+            self.update(part)
+
+    @classmethod
+    def from_row(cls, row):
+        """由按标准字段顺序排列的一行值构造，如数据库查询结果"""
+        record = cls.__new__(cls)
+        for name, value in zip(REVIEW_FIELDNAMES, row):
+            object.__setattr__(record, name, value)
+        return record
+
+    def __reduce__(self):
+        # 进程间传递时只序列化一行值，不带字段名
+        return ReviewRecord.from_row, (_get_values(self),)
+
+    def __getitem__(self, name):
+        value = getattr(self, name, None) if name in _FIELD_SET else None
+        if value is None:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        if name not in _FIELD_SET:
+            raise KeyError(f"评论记录没有字段: {name}")
+        object.__setattr__(self, name, value)
+
+    def __contains__(self, name):
+        return name in _FIELD_SET and getattr(self, name) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __repr__(self):
+        return f"ReviewRecord({self.to_dict()!r})"
+
+    def get(self, name, default=None):
+        value = getattr(self, name, None) if name in _FIELD_SET else None
+        return default if value is None else value
+
+    def update(self, data):
+        for name, value in data.items():
+            self[name] = value
+
+    def keys(self):
+        return [name for name, value in zip(REVIEW_FIELDNAMES, _get_values(self)) if value is not None]
+
+    def items(self):
+        return [(name, value) for name, value in zip(REVIEW_FIELDNAMES, _get_values(self)) if value is not None]
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def row(self):
+        """按标准字段顺序取值，未赋值的字段为空字符串"""
+        return ['' if value is None else value for value in _get_values(self)]
+
+    def raw_row(self):
+        """按标准字段顺序取值，未赋值的字段为None（csv模块写出为空）"""
+        return _get_values(self)
+
+
+def content_hash(review):
+    """评论正文的内容哈希，评分统一为一位小数，文本去掉首尾空白"""
+    parts = []
+    for name in CONTENT_FIELDS:
+        value = review.get(name)
+        if name.endswith('评分'):
+            try:
+                value = f"{float(value or 0):.1f}"
+            except (TypeError, ValueError):
+                value = ''
+        else:
+            value = str(value or '').strip()
+        parts.append(value)
+    return hashlib.blake2b("\x1f".join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def review_rows(reviews, raw=False):
+    """按标准字段顺序逐条生成行，兼容仍以字典表示的评论"""
+    for review in reviews:
+        if isinstance(review, ReviewRecord):
+            yield review.raw_row() if raw else review.row()
+        else:
+            yield [review.get(name, '') for name in REVIEW_FIELDNAMES]
+
+
+def write_csv(reviews, filepath):
+    """批量写出评论CSV，返回写出的条数"""
+    with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(REVIEW_FIELDNAMES)
+        writer.writerows(review_rows(reviews, raw=True))
+    return len(reviews)
+
+
+def write_parquet(reviews, filepath):
+    """批量写出评论Parquet文件（需要pyarrow或fastparquet），评分和互动数据按数值列保存"""
+    df = pd.DataFrame.from_records(list(review_rows(reviews, raw=True)), columns=REVIEW_FIELDNAMES)
+    for name in NUMERIC_FIELDS:
+        df[name] = pd.to_numeric(df[name], errors='coerce')
+    df.to_parquet(filepath, index=False)
+    logging.info(f"Parquet文件已保存到 {filepath}")
+    return len(df)
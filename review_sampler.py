@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+抽样爬取的样本量与置信区间
+以列表页评论卡片为抽样框，随机顺序逐条爬取详情页，持续更新9个分类评分均值的置信区间，
+误差界全部达到目标即停止（样本数不足的分类不判定，占比很低的稀疏分类不阻止停止）；
+样本为简单随机抽样，每条评论的抽样权重为 总体数/样本数
+"""
+
+import math
+
+from rating_aggregator import RATING_CATEGORIES
+
+Z_SCORES = {0.8: 1.282, 0.9: 1.645, 0.95: 1.96, 0.98: 2.326, 0.99: 2.576}
+
+
+def z_score(confidence):
+    """置信水平对应的正态分位数"""
+    if confidence not in Z_SCORES:
+        raise ValueError(f"不支持的置信水平: {confidence}，可选 {sorted(Z_SCORES)}")
+    return Z_SCORES[confidence]
+
+
+def required_sample_size(population, margin, stddev=1.0, confidence=0.95):
+    """均值估计达到误差界margin所需的样本量（含有限总体校正），stddev为评分标准差的先验估计"""
+    if population <= 0:
+        return 0
+    n0 = (z_score(confidence) * stddev / margin) ** 2
+    return min(population, math.ceil(n0 / (1 + (n0 - 1) / population)))
+
+
+def purpose_shares(cards):
+    """抽样框内各购车目的的占比（列表页可见，无需抽样）"""
+    counts = {}
+    for card in cards:
+        for purpose in filter(None, (p.strip() for p in str(card.get('购车目的', '')).split(','))):
+            counts[purpose] = counts.get(purpose, 0) + 1
+    total = len(cards) or 1
+    return {purpose: count / total for purpose, count in sorted(counts.items(), key=lambda x: -x[1])}
+
+
+class SampleEstimator:
+    def __init__(self, population, confidence=0.95, margin=0.15, min_samples=10, min_category_samples=30,
+                 sparse_share=0.2):
+        self.population = population
+        self.z = z_score(confidence)
+        self.confidence = confidence
+        self.margin = margin              # 评分均值的目标误差界（分）
+        self.min_samples = min_samples    # 样本太少时方差估计不可靠，至少抽取这么多条
+        self.min_category_samples = min_category_samples  # 分类样本数达到该值才按误差界判定
+        self.sparse_share = sparse_share  # 分类出现比例低于该值且样本数不足时视为稀疏分类（如纯电车型的油耗）
+        self.sample_count = 0
+        # 各分类的样本数、均值、离差平方和（Welford在线算法）
+        self.moments = {category: [0, 0.0, 0.0] for category in RATING_CATEGORIES}
+
+    def add(self, review):
+        """加入一条样本，评分为0或缺失表示该评论没有这个分类"""
+        self.sample_count += 1
+        for category, moment in self.moments.items():
+            try:
+                value = float(review.get(f'{category}评分') or 0)
+            except (TypeError, ValueError):
+                continue
+            if value <= 0:
+                continue
+            moment[0] += 1
+            delta = value - moment[1]
+            moment[1] += delta / moment[0]
+            moment[2] += delta * (value - moment[1])
+
+    def error_bound(self, category):
+        """分类评分均值的置信区间半宽，样本不足2条时为inf"""
+        n, _, m2 = self.moments[category]
+        if n < 2:
+            return math.inf
+        variance = m2 / (n - 1)
+        fpc = (self.population - self.sample_count) / (self.population - 1) if self.population > 1 else 0
+        return self.z * math.sqrt(variance / n * max(fpc, 0))
+
+    def satisfied(self):
+        """是否可以停止抽样：样本已覆盖总体，或所有非稀疏分类的样本数和误差界都达到目标"""
+        if self.sample_count >= self.population:
+            return True
+        if self.sample_count < self.min_samples:
+            return False
+
+        checked = 0
+        for category, (n, _, _) in self.moments.items():
+            if n == 0:
+                continue
+            if n < self.min_category_samples:
+                if n < self.sparse_share * self.sample_count:
+                    continue  # 稀疏分类，样本少时误差界没有意义，不阻止停止
+                return False
+            if self.error_bound(category) > self.margin:
+                return False
+            checked += 1
+        return checked > 0
+
+    def weight(self):
+        """每条样本的抽样权重"""
+        return self.population / self.sample_count if self.sample_count else 0
+
+    def estimates(self):
+        """各分类的均值估计和置信区间"""
+        rows = []
+        for category, (n, mean, _) in self.moments.items():
+            if n == 0:
+                continue
+            bound = self.error_bound(category)
+            rows.append({
+                '分类': category,
+                '样本数': n,
+                '均值': round(mean, 3),
+                '误差界': round(bound, 3) if bound != math.inf else '',
+                '置信水平': self.confidence
+            })
+        return rows
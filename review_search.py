@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+口碑评论全文检索
+将最满意/最不满意及各分类评论按中文二元分词写入SQLite FTS5索引，随评论入库增量更新
+用法: python review_search.py 异响 [--car-id 5769] [--field 最不满意]
+"""
+
+import re
+import sqlite3
+import logging
+import argparse
+
+from review_store import parse_review_id
+
+# 参与全文检索的评论字段
+SEARCH_FIELDS = [
+    '最满意', '最不满意',
+    '空间评论', '驾驶感受评论', '续航评论', '外观评论', '内饰评论',
+    '性价比评论', '智能化评论', '油耗评论', '配置评论'
+]
+
+# 中日韩文字连续片段，或其他字母数字片段
+TOKEN_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9A-Za-z]+')
+CJK_PATTERN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]')
+
+
+def cjk_tokenize(text):
+    """中文按重叠二元切分，英文数字按词切分，返回空格分隔的词串"""
+    if not text:
+        return ""
+
+    tokens = []
+    for run in TOKEN_PATTERN.findall(str(text)):
+        if CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run.lower())
+    return " ".join(tokens)
+
+
+class ReviewSearchIndex:
+    def __init__(self, db_path="autohome_reviews_output/autohome_reviews.db"):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(self.db_path)
+        self.setup_index()
+
+    def setup_index(self):
+        """创建FTS5索引表，rowid与评论表一致"""
+        columns = ", ".join(f'"{name}"' for name in SEARCH_FIELDS)
+        with self.conn:
+            self.conn.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS review_fts USING fts5({columns}, tokenize="unicode61")')
+
+    def index_reviews(self, reviews):
+        """增量索引一批已入库的评论；索引内容取自评论表中入库后的行，
+        部分重爬时保留的旧字段（入库时空值不覆盖）同样会被索引"""
+        columns = ", ".join(f'"{name}"' for name in SEARCH_FIELDS)
+        rows = []
+        for review in reviews:
+            review_id = parse_review_id(review.get('评论链接', ''))
+            found = self.conn.execute(f'SELECT rowid, {columns} FROM reviews WHERE "评论ID" = ?',
+                                      (review_id,)).fetchone()
+            if not found:
+                continue
+            rows.append([found[0]] + [cjk_tokenize(value) for value in found[1:]])
+
+        if not rows:
+            return 0
+
+        try:
+            placeholders = ", ".join("?" for _ in range(len(SEARCH_FIELDS) + 1))
+            with self.conn:
+                self.conn.executemany(
+                    f'INSERT OR REPLACE INTO review_fts(rowid, {columns}) VALUES ({placeholders})', rows)
+            logging.info(f"全文索引更新{len(rows)}条评论")
+            return len(rows)
+
+        except Exception as e:
+            logging.error(f"更新全文索引失败: {e}")
+            return 0
+
+    def rebuild(self):
+        """从评论表全量重建索引"""
+        columns = ", ".join(f'"{name}"' for name in SEARCH_FIELDS)
+        cursor = self.conn.execute(f'SELECT rowid, {columns} FROM reviews')
+        rows = [[row[0]] + [cjk_tokenize(value) for value in row[1:]] for row in cursor]
+
+        placeholders = ", ".join("?" for _ in range(len(SEARCH_FIELDS) + 1))
+        with self.conn:
+            self.conn.execute('DELETE FROM review_fts')
+            self.conn.executemany(f'INSERT INTO review_fts(rowid, {columns}) VALUES ({placeholders})', rows)
+        logging.info(f"全文索引重建完成，共{len(rows)}条评论")
+        return len(rows)
+
+    def search(self, query, car_id=None, field=None, limit=50):
+        """检索评论，返回匹配评论及其车型、版本信息"""
+        tokens = cjk_tokenize(query)
+        if not tokens:
+            return []
+
+        columns = ", ".join(f'r."{name}"' for name in SEARCH_FIELDS)
+        base_sql = (f'SELECT r."评论ID", r."车型ID", r."车型名称", r."车型版本", r."发表时间", r."评论链接", {columns} '
+                    f'FROM reviews r ')
+        params = []
+
+        if len(query.strip()) == 1:
+            # 单字无法命中二元索引，退化为逐行匹配
+            like_sql = " OR ".join(f'r."{name}" LIKE ?' for name in ([field] if field else SEARCH_FIELDS))
+            sql = base_sql + f'WHERE ({like_sql}) '
+            params.extend(f'%{query.strip()}%' for _ in ([field] if field else SEARCH_FIELDS))
+        else:
+            match_expr = f'"{tokens}"'
+            if field:
+                match_expr = f'"{field}" : {match_expr}'
+            sql = base_sql + 'JOIN review_fts f ON f.rowid = r.rowid WHERE review_fts MATCH ? '
+            params.append(match_expr)
+
+        if car_id is not None:
+            sql += 'AND r."车型ID" = ? '
+            params.append(str(car_id))
+        sql += 'ORDER BY r."发表时间" DESC LIMIT ?'
+        params.append(limit)
+
+        results = []
+        keyword = query.strip().lower()
+        for row in self.conn.execute(sql, params):
+            texts = dict(zip(SEARCH_FIELDS, row[6:]))
+            matched_fields = [name for name, text in texts.items() if text and keyword in str(text).lower()]
+            results.append({
+                '评论ID': row[0],
+                '车型ID': row[1],
+                '车型名称': row[2],
+                '车型版本': row[3],
+                '发表时间': row[4],
+                '评论链接': row[5],
+                '匹配字段': matched_fields,
+                '匹配内容': {name: texts[name] for name in matched_fields}
+            })
+        return results
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+def search_reviews(query, db_path="autohome_reviews_output/autohome_reviews.db", car_id=None, field=None, limit=50):
+    """检索入口：返回匹配的评论列表"""
+    index = ReviewSearchIndex(db_path)
+    try:
+        return index.search(query, car_id=car_id, field=field, limit=limit)
+    finally:
+        index.close()
+
+
+def main():
+    """命令行检索"""
+    parser = argparse.ArgumentParser(description="汽车之家口碑评论全文检索")
+    parser.add_argument("query", help="检索关键词，如 异响、续航虚标")
+    parser.add_argument("--db", default="autohome_reviews_output/autohome_reviews.db", help="评论数据库路径")
+    parser.add_argument("--car-id", default=None, help="限定车型ID")
+    parser.add_argument("--field", default=None, choices=SEARCH_FIELDS, help="限定检索字段")
+    parser.add_argument("--limit", type=int, default=50, help="最多返回条数")
+    parser.add_argument("--rebuild", action="store_true", help="检索前从评论表重建索引")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        index = ReviewSearchIndex(args.db)
+        index.rebuild()
+        index.close()
+
+    results = search_reviews(args.query, args.db, args.car_id, args.field, args.limit)
+    print(f"共找到{len(results)}条匹配评论")
+    for item in results:
+        print(f"[{item['车型名称']} | {item['车型版本']} | {item['发表时间']}] {item['评论链接']}")
+        for name, text in item['匹配内容'].items():
+            print(f"  {name}: {text[:80]}")
+
+
+if __name__ == "__main__":
+    main()
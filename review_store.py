@@ -0,0 +1,453 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+汽车之家口碑评论持久化存储
+以评论链接中解析出的评论ID为主键，批量upsert写入SQLite，分车型CSV改为从存储导出；
+里程、电耗、价格等展示文本入库时同时写入标准化数值列
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from field_normalizer import NORMALIZED_COLUMNS, NORMALIZED_FIELDNAMES, DATE_COLUMNS, normalize_reviews
+from review_record import REVIEW_FIELDNAMES, NUMERIC_FIELDS, CONTENT_FIELDS, ReviewRecord, review_rows, content_hash
+
+# 评分聚合关注的字段，变化时由触发器写入 rating_changes
+RATING_FIELDNAMES = [name for name in REVIEW_FIELDNAMES if name.endswith('评分')]
+
+# 快速模式下从列表页评论卡片提取的精简字段
+CARD_FIELDNAMES = ['车型ID', '评论链接', '购车目的', '可见评分', '评论摘要', '发表时间', '车型版本', '爬取时间']
+
+
+def parse_review_id(review_url):
+    """从评论链接中解析评论ID"""
+    if not review_url:
+        return ""
+
+    # 详情页链接形如 .../detail/view_01jxxxx.html 或 .../view_2345678_1.html
+    match = re.search(r'view_([0-9A-Za-z]+)', review_url)
+    if match:
+        return match.group(1)
+
+    # 兜底：取链接中最后一段较长的数字
+    numbers = re.findall(r'\d{5,}', review_url)
+    if numbers:
+        return numbers[-1]
+
+    return review_url.split('?')[0].rstrip('/')
+
+
+class ReviewStore:
+    def __init__(self, db_path="autohome_reviews_output/autohome_reviews.db"):
+        self.db_path = db_path
+        self.conn = None
+        self.setup_database()
+
+    def setup_database(self):
+        """创建评论表和二级索引"""
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        column_types = [(name, 'NUMERIC' if name in NUMERIC_FIELDS else 'TEXT') for name in REVIEW_FIELDNAMES]
+        column_types += [(name, 'TEXT' if name in DATE_COLUMNS else 'REAL') for name in NORMALIZED_FIELDNAMES]
+        column_types += [('首次入库时间', 'TEXT'), ('更新时间', 'TEXT')]
+        columns = ['"评论ID" TEXT PRIMARY KEY', '"车型ID" TEXT NOT NULL']
+        columns += [f'"{name}" {column_type}' for name, column_type in column_types]
+
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS reviews ({", ".join(columns)})')
+            # 旧版本数据库补齐新增字段
+            existing = {row[1] for row in self.conn.execute('PRAGMA table_info(reviews)')}
+            for name, column_type in column_types:
+                if name not in existing:
+                    self.conn.execute(f'ALTER TABLE reviews ADD COLUMN "{name}" {column_type}')
+            backfill = not set(NORMALIZED_FIELDNAMES) <= existing
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reviews_car_id ON reviews ("车型ID")')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reviews_publish_time ON reviews ("发表时间")')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reviews_spec ON reviews ("车型版本")')
+            # 互动数据时间序列
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_counters ('
+                              '"评论ID" TEXT NOT NULL, "采集时间" TEXT NOT NULL, '
+                              '"观看数" INTEGER, "点赞数" INTEGER, "评论数" INTEGER, '
+                              'PRIMARY KEY ("评论ID", "采集时间")) WITHOUT ROWID')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_reviews_price ON reviews ("裸车购买价_元")')
+            # 快速模式的列表页精简记录
+            card_columns = ", ".join(f'"{name}" TEXT' for name in CARD_FIELDNAMES)
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS review_cards ("评论ID" TEXT PRIMARY KEY, {card_columns})')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_review_cards_car_id ON review_cards ("车型ID", "发表时间")')
+            # 抽样模式的样本及抽样权重
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_samples ('
+                              '"抽样时间" TEXT NOT NULL, "车型ID" TEXT NOT NULL, "评论ID" TEXT NOT NULL, '
+                              '"总体数" INTEGER, "样本数" INTEGER, "抽样权重" REAL, '
+                              'PRIMARY KEY ("抽样时间", "车型ID", "评论ID")) WITHOUT ROWID')
+            # 各车型数据版本，每次重新保存时递增，供查询服务判断缓存是否失效
+            self.conn.execute('CREATE TABLE IF NOT EXISTS model_versions ('
+                              '"车型ID" TEXT PRIMARY KEY, "版本" INTEGER NOT NULL, "更新时间" TEXT)')
+            # 近似重复关系（由 review_minhash 维护），评分变更日志的触发器依赖此表
+            self.conn.execute('CREATE TABLE IF NOT EXISTS review_duplicates ('
+                              '"评论ID" TEXT PRIMARY KEY, "代表评论ID" TEXT NOT NULL, "车型ID" TEXT, "相似度" REAL)')
+            # 评分变更日志：新增评论记一行（权重+1），评分或车型版本变化时记旧值（-1）和新值（+1），
+            # 近似重复评论不计入评分分布：被判为重复时记-1，取消重复时按当前评分记+1，重复期间的评分变化不记录；
+            # 序号单调递增，评分聚合以此为增量水位
+            rating_columns = ", ".join(f'"{name}" NUMERIC' for name in RATING_FIELDNAMES)
+            self.conn.execute('CREATE TABLE IF NOT EXISTS rating_changes ('
+                              '"序号" INTEGER PRIMARY KEY AUTOINCREMENT, "评论ID" TEXT, "车型ID" TEXT, "车型版本" TEXT, '
+                              f'"权重" INTEGER NOT NULL, {rating_columns})')
+            change_columns = ", ".join(f'"{name}"' for name in ['评论ID', '车型ID', '车型版本', '权重'] + RATING_FIELDNAMES)
+
+            def change_values(row, weight):
+                return ", ".join([f'{row}."评论ID"', f'{row}."车型ID"', f'{row}."车型版本"', str(weight)]
+                                 + [f'{row}."{name}"' for name in RATING_FIELDNAMES])
+
+            changed_sql = " OR ".join(f'OLD."{name}" IS NOT NEW."{name}"'
+                                      for name in ['车型ID', '车型版本'] + RATING_FIELDNAMES)
+            not_duplicate_sql = 'NOT EXISTS (SELECT 1 FROM review_duplicates d WHERE d."评论ID" = NEW."评论ID")'
+
+            def duplicate_change(row, weight):
+                return (f'INSERT INTO rating_changes ({change_columns}) '
+                        f'SELECT {change_values("r", weight)} FROM reviews r WHERE r."评论ID" = {row}."评论ID"; ')
+
+            # 旧版本的触发器不区分近似重复评论，重新创建
+            for trigger in ('reviews_rating_insert', 'reviews_rating_update',
+                            'duplicates_rating_insert', 'duplicates_rating_delete'):
+                self.conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            self.conn.execute(f'CREATE TRIGGER reviews_rating_insert AFTER INSERT ON reviews '
+                              f'WHEN {not_duplicate_sql} BEGIN '
+                              f'INSERT INTO rating_changes ({change_columns}) VALUES ({change_values("NEW", 1)}); END')
+            self.conn.execute(f'CREATE TRIGGER reviews_rating_update AFTER UPDATE ON reviews '
+                              f'WHEN ({changed_sql}) AND {not_duplicate_sql} BEGIN '
+                              f'INSERT INTO rating_changes ({change_columns}) VALUES ({change_values("OLD", -1)}); '
+                              f'INSERT INTO rating_changes ({change_columns}) VALUES ({change_values("NEW", 1)}); END')
+            self.conn.execute(f'CREATE TRIGGER duplicates_rating_insert AFTER INSERT ON review_duplicates BEGIN '
+                              f'{duplicate_change("NEW", -1)}END')
+            self.conn.execute(f'CREATE TRIGGER duplicates_rating_delete AFTER DELETE ON review_duplicates BEGIN '
+                              f'{duplicate_change("OLD", 1)}END')
+            # 详情页的HTTP校验信息和评论正文哈希，用于条件请求和跳过未变化的评论
+            self.conn.execute('CREATE TABLE IF NOT EXISTS page_validators ('
+                              '"评论ID" TEXT PRIMARY KEY, "ETag" TEXT, "最后修改时间" TEXT, "内容哈希" TEXT, '
+                              '"检查时间" TEXT, "变化时间" TEXT) WITHOUT ROWID')
+
+        logging.info(f"评论存储初始化成功: {self.db_path}")
+
+        # 旧数据库新增标准化列后，为已有评论补算
+        if backfill:
+            self.backfill_normalized()
+
+    def _build_upsert_sql(self):
+        """生成upsert语句，文本字段为空时保留已有内容"""
+        insert_columns = ['评论ID', '车型ID'] + REVIEW_FIELDNAMES + NORMALIZED_FIELDNAMES + ['首次入库时间', '更新时间']
+        placeholders = ", ".join("?" for _ in insert_columns)
+
+        updates = ['"车型ID" = excluded."车型ID"']
+        for name in REVIEW_FIELDNAMES:
+            if name == '缺失字段':
+                updates.append(f'"{name}" = excluded."{name}"')
+            else:
+                # 本次为空（如超出时间预算未提取）时保留已有内容
+                updates.append(f'"{name}" = COALESCE(NULLIF(excluded."{name}", \'\'), reviews."{name}")')
+        for name in NORMALIZED_FIELDNAMES:
+            updates.append(f'"{name}" = COALESCE(excluded."{name}", reviews."{name}")')
+        updates.append('"更新时间" = excluded."更新时间"')
+
+        column_sql = ", ".join(f'"{name}"' for name in insert_columns)
+        return (f'INSERT INTO reviews ({column_sql}) VALUES ({placeholders}) '
+                f'ON CONFLICT("评论ID") DO UPDATE SET {", ".join(updates)}')
+
+    def upsert_reviews(self, car_id, reviews, batch_size=500, written_reviews=None):
+        """批量upsert评论数据，每批一个事务；written_reviews为列表时追加已成功提交的评论"""
+        if not reviews:
+            return 0
+
+        sql = self._build_upsert_sql()
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        written = 0
+        validators = []
+
+        try:
+            for start in range(0, len(reviews), batch_size):
+                batch = reviews[start:start + batch_size]
+                normalized_batch = normalize_reviews(batch)
+                rows = []
+                stored = []
+                for review, values, normalized in zip(batch, review_rows(batch), normalized_batch):
+                    review_id = parse_review_id(review.get('评论链接', ''))
+                    if not review_id:
+                        logging.warning(f"评论缺少链接，无法入库: {review.get('车型名称', '')}")
+                        continue
+                    row = [review_id, str(car_id)] + values
+                    row.extend(normalized[name] for name in NORMALIZED_FIELDNAMES)
+                    row.extend([now, now])
+                    rows.append(row)
+                    stored.append(review)
+                    # 只有完整提取的评论才记录内容哈希
+                    if not review.get('缺失字段'):
+                        validators.append((review_id, None, None, content_hash(review), now))
+
+                with self.conn:
+                    self.conn.executemany(sql, rows)
+                written += len(rows)
+                if written_reviews is not None:
+                    written_reviews.extend(stored)
+
+            self.update_validators(validators)
+
+            logging.info(f"车型{car_id}写入评论存储{written}条")
+            return written
+
+        except Exception as e:
+            logging.error(f"写入评论存储失败: {e}")
+            return written
+
+    def backfill_normalized(self, batch_size=50000):
+        """按批次为已有评论计算标准化列"""
+        raw_fields = list(NORMALIZED_COLUMNS.keys())
+        raw_sql = ", ".join(f'"{name}"' for name in raw_fields)
+        set_sql = ", ".join(f'"{name}" = ?' for name in NORMALIZED_FIELDNAMES)
+        updated = 0
+        last_rowid = 0
+
+        try:
+            while True:
+                rows = self.conn.execute(
+                    f'SELECT rowid, {raw_sql} FROM reviews WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                    (last_rowid, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_rowid = rows[-1][0]
+
+                normalized_batch = normalize_reviews([dict(zip(raw_fields, row[1:])) for row in rows])
+                with self.conn:
+                    self.conn.executemany(
+                        f'UPDATE reviews SET {set_sql} WHERE rowid = ?',
+                        [[normalized[name] for name in NORMALIZED_FIELDNAMES] + [row[0]]
+                         for row, normalized in zip(rows, normalized_batch)])
+                updated += len(rows)
+
+            logging.info(f"已为{updated}条评论补算标准化字段")
+            return updated
+
+        except Exception as e:
+            logging.error(f"补算标准化字段失败: {e}")
+            return updated
+
+    def fetch_model_reviews(self, car_id):
+        """读取指定车型的全部评论，按发表时间倒序"""
+        column_sql = ", ".join(f'"{name}"' for name in REVIEW_FIELDNAMES)
+        cursor = self.conn.execute(
+            f'SELECT {column_sql} FROM reviews WHERE "车型ID" = ? ORDER BY "发表时间" DESC',
+            (str(car_id),))
+        return [ReviewRecord.from_row(row) for row in cursor]
+
+    def count_reviews(self, car_id=None):
+        """统计评论数量"""
+        if car_id is None:
+            return self.conn.execute('SELECT COUNT(*) FROM reviews').fetchone()[0]
+        return self.conn.execute('SELECT COUNT(*) FROM reviews WHERE "车型ID" = ?', (str(car_id),)).fetchone()[0]
+
+    def model_crawl_stats(self, since_date):
+        """各车型自since_date以来发表的评论数和最近一次爬取时间"""
+        cursor = self.conn.execute(
+            'SELECT "车型ID", SUM(CASE WHEN "发表时间" >= ? THEN 1 ELSE 0 END), MAX("爬取时间") '
+            'FROM reviews GROUP BY "车型ID"', (since_date,))
+        return {row[0]: {'近期评论数': row[1] or 0, '最近爬取时间': row[2]} for row in cursor}
+
+    def list_review_links(self, car_ids=None):
+        """列出已入库评论的ID和链接，可按车型过滤"""
+        if car_ids:
+            placeholders = ", ".join("?" for _ in car_ids)
+            cursor = self.conn.execute(
+                f'SELECT "评论ID", "评论链接" FROM reviews WHERE "车型ID" IN ({placeholders}) ORDER BY rowid',
+                [str(car_id) for car_id in car_ids])
+        else:
+            cursor = self.conn.execute('SELECT "评论ID", "评论链接" FROM reviews ORDER BY rowid')
+        return cursor.fetchall()
+
+    def append_counters(self, rows):
+        """追加互动数据快照并更新评论表中的最新值，rows为(评论ID, 采集时间, 观看数, 点赞数, 评论数)"""
+        if not rows:
+            return 0
+
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO review_counters ("评论ID", "采集时间", "观看数", "点赞数", "评论数") '
+                    'VALUES (?, ?, ?, ?, ?)', rows)
+                self.conn.executemany(
+                    'UPDATE reviews SET "观看数" = ?, "点赞数" = ?, "评论数" = ?, "更新时间" = ? WHERE "评论ID" = ?',
+                    [(views, goods, comments, collected_at, review_id)
+                     for review_id, collected_at, views, goods, comments in rows])
+            self.touch_models(self.review_car_ids([row[0] for row in rows]))
+            return len(rows)
+
+        except Exception as e:
+            logging.error(f"写入互动数据快照失败: {e}")
+            return 0
+
+    def review_car_ids(self, review_ids, chunk_size=500):
+        """评论ID所属的车型ID集合"""
+        car_ids = set()
+        for start in range(0, len(review_ids), chunk_size):
+            chunk = review_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor = self.conn.execute(
+                f'SELECT DISTINCT "车型ID" FROM reviews WHERE "评论ID" IN ({placeholders})', chunk)
+            car_ids.update(row[0] for row in cursor)
+        return car_ids
+
+    def touch_models(self, car_ids):
+        """递增车型的数据版本"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO model_versions ("车型ID", "版本", "更新时间") VALUES (?, 1, ?) '
+                    'ON CONFLICT("车型ID") DO UPDATE SET "版本" = "版本" + 1, "更新时间" = excluded."更新时间"',
+                    [(str(car_id), now) for car_id in car_ids])
+        except Exception as e:
+            logging.error(f"更新车型数据版本失败: {e}")
+
+    def update_validators(self, rows):
+        """更新详情页校验信息，rows为(评论ID, ETag, 最后修改时间, 内容哈希, 检查时间)，为None的项保留原值"""
+        if not rows:
+            return 0
+
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO page_validators ("评论ID", "ETag", "最后修改时间", "内容哈希", "检查时间", "变化时间") '
+                    'VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT("评论ID") DO UPDATE SET '
+                    '"ETag" = COALESCE(excluded."ETag", page_validators."ETag"), '
+                    '"最后修改时间" = COALESCE(excluded."最后修改时间", page_validators."最后修改时间"), '
+                    '"内容哈希" = COALESCE(excluded."内容哈希", page_validators."内容哈希"), '
+                    '"检查时间" = excluded."检查时间", '
+                    '"变化时间" = CASE WHEN excluded."内容哈希" IS NOT NULL '
+                    'AND excluded."内容哈希" IS NOT page_validators."内容哈希" '
+                    'THEN excluded."检查时间" ELSE page_validators."变化时间" END',
+                    [(review_id, etag, last_modified, digest, checked_at, checked_at if digest else None)
+                     for review_id, etag, last_modified, digest, checked_at in rows])
+            return len(rows)
+
+        except Exception as e:
+            logging.error(f"更新详情页校验信息失败: {e}")
+            return 0
+
+    def list_refresh_targets(self, car_ids=None):
+        """列出待复查的评论: (评论ID, 车型ID, 评论链接, ETag, 最后修改时间, 内容哈希)
+        还没有记录内容哈希的评论（旧数据）按已入库的正文补算"""
+        content_sql = ", ".join(f'r."{name}"' for name in CONTENT_FIELDS)
+        sql = (f'SELECT r."评论ID", r."车型ID", r."评论链接", v."ETag", v."最后修改时间", v."内容哈希", {content_sql} '
+               f'FROM reviews r LEFT JOIN page_validators v ON v."评论ID" = r."评论ID" '
+               f'WHERE r."评论链接" IS NOT NULL AND r."评论链接" != \'\'')
+        params = []
+        if car_ids:
+            sql += f' AND r."车型ID" IN ({", ".join("?" for _ in car_ids)})'
+            params = [str(car_id) for car_id in car_ids]
+
+        targets = []
+        for row in self.conn.execute(sql + ' ORDER BY r.rowid', params):
+            digest = row[5] or content_hash(dict(zip(CONTENT_FIELDS, row[6:])))
+            targets.append(row[:5] + (digest,))
+        return targets
+
+    def upsert_cards(self, car_id, cards):
+        """写入快速模式的列表页精简记录，同一评论以最新一次为准"""
+        rows = []
+        for card in cards:
+            review_id = parse_review_id(card.get('评论链接', ''))
+            if review_id:
+                rows.append([review_id] + [str(car_id) if name == '车型ID' else card.get(name, '')
+                                           for name in CARD_FIELDNAMES])
+        if not rows:
+            return 0
+
+        column_sql = ", ".join(f'"{name}"' for name in ['评论ID'] + CARD_FIELDNAMES)
+        placeholders = ", ".join("?" for _ in range(len(CARD_FIELDNAMES) + 1))
+        try:
+            with self.conn:
+                self.conn.executemany(f'INSERT OR REPLACE INTO review_cards ({column_sql}) VALUES ({placeholders})', rows)
+            logging.info(f"车型{car_id}写入列表页记录{len(rows)}条")
+            return len(rows)
+
+        except Exception as e:
+            logging.error(f"写入列表页记录失败: {e}")
+            return 0
+
+    def record_samples(self, car_id, sampled_at, review_links, population):
+        """记录一次抽样的样本评论和抽样权重（简单随机抽样，权重均为 总体数/样本数）"""
+        review_ids = [parse_review_id(link) for link in review_links if link]
+        if not review_ids:
+            return 0
+
+        weight = population / len(review_ids)
+        try:
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT OR REPLACE INTO review_samples VALUES (?, ?, ?, ?, ?, ?)',
+                    [(sampled_at, str(car_id), review_id, population, len(review_ids), weight)
+                     for review_id in review_ids])
+            return len(review_ids)
+
+        except Exception as e:
+            logging.error(f"记录抽样权重失败: {e}")
+            return 0
+
+    def export_cards_csv(self, car_id, filepath):
+        """将指定车型的列表页精简记录导出为CSV"""
+        try:
+            column_sql = ", ".join(f'"{name}"' for name in CARD_FIELDNAMES)
+            cursor = self.conn.execute(
+                f'SELECT {column_sql} FROM review_cards WHERE "车型ID" = ? ORDER BY "发表时间" DESC',
+                (str(car_id),))
+
+            count = 0
+            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(CARD_FIELDNAMES)
+                for row in cursor:
+                    writer.writerow(['' if value is None else value for value in row])
+                    count += 1
+
+            logging.info(f"车型{car_id}共导出{count}条列表页记录到 {filepath}")
+            return count
+
+        except Exception as e:
+            logging.error(f"导出车型{car_id}列表页记录失败: {e}")
+            return 0
+
+    def export_model_csv(self, car_id, filepath):
+        """将指定车型的评论从存储导出为CSV，标准化数值列附在原始字段之后"""
+        try:
+            export_fields = REVIEW_FIELDNAMES + NORMALIZED_FIELDNAMES
+            column_sql = ", ".join(f'"{name}"' for name in export_fields)
+            cursor = self.conn.execute(
+                f'SELECT {column_sql} FROM reviews WHERE "车型ID" = ? ORDER BY "发表时间" DESC',
+                (str(car_id),))
+
+            count = 0
+            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(export_fields)
+                for row in cursor:
+                    writer.writerow(['' if value is None else value for value in row])
+                    count += 1
+
+            logging.info(f"车型{car_id}共导出{count}条评论到 {filepath}")
+            return count
+
+        except Exception as e:
+            logging.error(f"导出车型{car_id}评论失败: {e}")
+            return 0
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+备选选择器命中率登记
+记录每组备选选择器的命中情况，按历史命中率排序优先尝试最可能命中的选择器；
+统计结果持久化到JSON，长期占优的选择器连续失效时发出警告（通常意味着页面改版）
+"""
+
+import os
+import json
+import logging
+import threading
+
+
+class SelectorRegistry:
+    def __init__(self, path="selector_stats.json", min_trials=20, dominance_rate=0.8, alert_failures=5):
+        self.path = path
+        self.min_trials = min_trials          # 判定为占优选择器所需的最少尝试次数
+        self.dominance_rate = dominance_rate  # 判定为占优选择器的命中率
+        self.alert_failures = alert_failures  # 占优选择器连续失败多少次时告警
+        self.stats = {}                       # {分组: {选择器: [命中次数, 尝试次数]}}
+        self.consecutive_failures = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """读取历史命中统计"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+            logging.info(f"选择器命中统计已加载: {self.path}")
+        except Exception as e:
+            logging.warning(f"读取选择器命中统计失败，将重新统计: {e}")
+            self.stats = {}
+
+    def save(self):
+        """保存命中统计"""
+        try:
+            with self.lock:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.error(f"保存选择器命中统计失败: {e}")
+
+    def _score(self, group, selector):
+        """拉普拉斯平滑后的命中率，未尝试过的选择器为0.5"""
+        hits, trials = self.stats.get(group, {}).get(selector, (0, 0))
+        return (hits + 1) / (trials + 2)
+
+    def ordered(self, group, selectors):
+        """按命中率从高到低返回选择器，命中率相同时保持原有顺序"""
+        with self.lock:
+            indexed = sorted(enumerate(selectors), key=lambda item: (-self._score(group, item[1]), item[0]))
+        return [selector for _, selector in indexed]
+
+    def record(self, group, selector, hit):
+        """记录一次尝试结果"""
+        with self.lock:
+            counts = self.stats.setdefault(group, {}).setdefault(selector, [0, 0])
+            dominant = counts[1] >= self.min_trials and counts[0] / counts[1] >= self.dominance_rate
+            counts[1] += 1
+            failures = self.consecutive_failures.setdefault(group, {})
+
+            if hit:
+                counts[0] += 1
+                failures[selector] = 0
+                return
+
+            failures[selector] = failures.get(selector, 0) + 1
+            if dominant and failures[selector] == self.alert_failures:
+                logging.warning(f"选择器组[{group}]中原本占优的选择器已连续失败{failures[selector]}次，"
+                                f"页面结构可能已变化: {selector} (历史命中率{counts[0] / counts[1]:.0%})")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+多节点分片协调
+车型任务队列保存在共享存储上的SQLite文件中，各节点租用车型并定期续租；
+节点宕机后租约过期，车型会被其他节点重新租用，无需手工拆分车型CSV；
+已用完重试次数的车型租约过期后记为失败
+"""
+
+import time
+import sqlite3
+import logging
+import threading
+
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class ShardCoordinator:
+    def __init__(self, db_path="autohome_shards.db", lease_seconds=600, max_attempts=3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # 手动控制事务，租用时使用 BEGIN IMMEDIATE 保证多节点互斥
+        self.conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        self.setup_database()
+
+    def setup_database(self):
+        """创建任务表"""
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS car_tasks (
+                "车型ID" TEXT PRIMARY KEY,
+                "销量排名" INTEGER,
+                "车型名称" TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                review_count INTEGER,
+                last_error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_car_tasks_status ON car_tasks (status, "销量排名")')
+
+    def seed(self, car_info_list):
+        """导入车型列表，已存在的车型保持原有进度"""
+        now = time.time()
+        rows = [(str(car['车型ID']), int(car['销量排名']), car['车型名称'], now) for car in car_info_list]
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO car_tasks ("车型ID", "销量排名", "车型名称", updated_at) VALUES (?, ?, ?, ?)', rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        logging.info(f"分片队列导入{len(rows)}个车型")
+
+    def lease(self, worker_id):
+        """租用一个待处理或租约已过期的车型，没有可租用车型时返回None"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.expire_exhausted(now)
+            row = self.conn.execute(
+                'SELECT "车型ID", "销量排名", "车型名称", status, worker_id FROM car_tasks '
+                'WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND attempts < ? '
+                'ORDER BY "销量排名" LIMIT 1',
+                (STATUS_PENDING, STATUS_LEASED, now, self.max_attempts)).fetchone()
+
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            car_id, ranking, car_name, status, previous_worker = row
+            self.conn.execute(
+                'UPDATE car_tasks SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, '
+                'updated_at = ? WHERE "车型ID" = ?',
+                (STATUS_LEASED, worker_id, now + self.lease_seconds, now, car_id))
+            self.conn.execute("COMMIT")
+
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        if status == STATUS_LEASED:
+            logging.warning(f"车型{car_id}的租约已过期（原节点{previous_worker}），由节点{worker_id}重新租用")
+
+        return {'车型ID': car_id, '销量排名': ranking, '车型名称': car_name}
+
+    def expire_exhausted(self, now=None):
+        """最后一次尝试的节点宕机后租约过期、不会再被租用，直接记为失败，返回记为失败的车型数"""
+        now = now or time.time()
+        cursor = self.conn.execute(
+            'UPDATE car_tasks SET status = ?, last_error = COALESCE(last_error, ?), lease_expires = NULL, '
+            'updated_at = ? WHERE status = ? AND lease_expires < ? AND attempts >= ?',
+            (STATUS_FAILED, f"租约过期，已达到最大尝试次数{self.max_attempts}", now, STATUS_LEASED, now,
+             self.max_attempts))
+        if cursor.rowcount > 0:
+            logging.warning(f"{cursor.rowcount}个车型租约过期且已达到最大尝试次数，记为失败")
+        return cursor.rowcount
+
+    def heartbeat(self, worker_id, car_id):
+        """续租，返回租约是否仍属于本节点"""
+        now = time.time()
+        cursor = self.conn.execute(
+            'UPDATE car_tasks SET lease_expires = ?, updated_at = ? '
+            'WHERE "车型ID" = ? AND worker_id = ? AND status = ?',
+            (now + self.lease_seconds, now, str(car_id), worker_id, STATUS_LEASED))
+        return cursor.rowcount > 0
+
+    def complete(self, worker_id, car_id, review_count):
+        """标记车型完成"""
+        self.conn.execute(
+            'UPDATE car_tasks SET status = ?, review_count = ?, lease_expires = NULL, updated_at = ? '
+            'WHERE "车型ID" = ? AND worker_id = ?',
+            (STATUS_DONE, review_count, time.time(), str(car_id), worker_id))
+
+    def fail(self, worker_id, car_id, error):
+        """标记车型失败，未超过重试次数时放回队列"""
+        self.conn.execute(
+            'UPDATE car_tasks SET status = CASE WHEN attempts < ? THEN ? ELSE ? END, '
+            'last_error = ?, lease_expires = NULL, updated_at = ? WHERE "车型ID" = ? AND worker_id = ?',
+            (self.max_attempts, STATUS_PENDING, STATUS_FAILED, error, time.time(), str(car_id), worker_id))
+
+    def progress(self):
+        """各状态的车型数量"""
+        self.expire_exhausted()
+        rows = self.conn.execute('SELECT status, COUNT(*) FROM car_tasks GROUP BY status').fetchall()
+        return dict(rows)
+
+    def close(self):
+        """关闭数据库连接"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+class LeaseHeartbeat(threading.Thread):
+    """后台续租线程，使用独立的数据库连接"""
+
+    def __init__(self, db_path, worker_id, car_id, lease_seconds=600):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.worker_id = worker_id
+        self.car_id = car_id
+        self.lease_seconds = lease_seconds
+        self.interval = max(1, lease_seconds // 3)
+        self.stop_event = threading.Event()
+
+    def run(self):
+        coordinator = ShardCoordinator(self.db_path, lease_seconds=self.lease_seconds)
+        try:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    if not coordinator.heartbeat(self.worker_id, self.car_id):
+                        logging.warning(f"车型{self.car_id}的租约已不属于节点{self.worker_id}")
+                        break
+                except Exception as e:
+                    logging.warning(f"车型{self.car_id}续租失败: {e}")
+        finally:
+            coordinator.close()
+
+    def stop(self):
+        """停止续租"""
+        self.stop_event.set()
+        self.join(timeout=5)
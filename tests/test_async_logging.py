@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""逐字段消息的计数汇总"""
+
+import logging
+import threading
+
+from async_logging import CounterFilter, message_type
+
+
+def make_record(message, level=logging.INFO):
+    return logging.LogRecord('test', level, __file__, 1, message, None, None)
+
+
+def test_prefixed_info_messages_are_counted():
+    counter = CounterFilter(interval=3600)
+    assert not counter.filter(make_record('成功提取观看数: 12'))
+    assert not counter.filter(make_record('成功提取观看数: 30'))
+    assert counter.filter(make_record('成功提取观看数: 30', logging.WARNING))
+    assert counter.filter(make_record('开始处理车型'))
+    assert counter.counts == {message_type('成功提取观看数: 12'): 2}
+
+
+def test_flush_does_not_let_other_threads_through(caplog, monkeypatch):
+    counter = CounterFilter(interval=3600)
+    counter.filter(make_record('成功提取点赞数: 1'))
+    passed = []
+
+    # 汇总输出期间，其他线程的同类消息仍然计数
+    def emit_from_other_thread():
+        passed.append(counter.filter(make_record('成功提取点赞数: 2')))
+
+    def log_summary(message, *args, **kwargs):
+        thread = threading.Thread(target=emit_from_other_thread)
+        thread.start()
+        thread.join()
+        logging.getLogger().info(message)
+
+    monkeypatch.setattr(logging, 'info', log_summary)
+    with caplog.at_level(logging.INFO):
+        counter.flush()
+
+    assert passed == [False]
+    assert counter.counts == {message_type('成功提取点赞数: 2'): 1}
+    assert '字段提取统计' in caplog.text
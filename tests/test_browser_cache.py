@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""浏览器配置目录：槽位文件锁、模板和缓存状态"""
+
+import os
+
+import pytest
+
+from browser_cache import BrowserProfileCache
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "browser_cache")
+
+
+def test_busy_slot_uses_next_directory(root):
+    cache = BrowserProfileCache(root)
+    first = cache.acquire('worker')
+    second = cache.acquire('worker')
+    assert os.path.basename(first) == 'worker'
+    assert os.path.basename(second) == 'worker-2'
+
+
+def test_slot_locked_by_another_cache_instance_is_skipped(root):
+    # 另一个实例的文件锁相当于另一个进程持有该目录
+    other = BrowserProfileCache(root)
+    held = other.acquire('worker')
+    cache = BrowserProfileCache(root)
+    assert os.path.basename(cache.acquire('worker')) == 'worker-2'
+    other.release(held)
+    assert os.path.basename(cache.acquire('worker')) == 'worker'
+
+
+def test_first_release_saves_template_and_states(root):
+    cache = BrowserProfileCache(root)
+    profile = cache.acquire('worker')
+    assert cache.states[profile] == '冷启动'
+    with open(os.path.join(profile, 'Preferences'), 'w') as f:
+        f.write('{}')
+    open(os.path.join(profile, 'SingletonLock'), 'w').close()
+    cache.release(profile)
+
+    assert os.path.exists(os.path.join(cache.template_dir, 'Preferences'))
+    assert not os.path.exists(os.path.join(cache.template_dir, 'SingletonLock'))
+    assert cache.states[cache.acquire('worker')] == '复用'
+    assert cache.states[cache.acquire('fresh')] == '模板'
+
+
+def test_summary_by_state_and_first_page(root, tmp_path):
+    cache = BrowserProfileCache(root, metrics_file=str(tmp_path / "metrics.csv"))
+    profile = cache.acquire('worker')
+    cache.record_page(profile, 'http://localhost/1', 2.0, {'bytes': 3000, 'resources': 5, 'cached': 0}, True)
+    cache.record_page(profile, 'http://localhost/2', 1.0, {'bytes': 1000, 'resources': 5, 'cached': 5}, False)
+    summary = cache.summary()['冷启动']
+    assert summary['页面数'] == 2
+    assert summary['每页字节'] == 2000
+    assert summary['首页加载秒'] == 2.0
+    assert summary['后续页加载秒'] == 1.0
+    with open(tmp_path / "metrics.csv", encoding='utf-8-sig') as f:
+        assert len(f.readlines()) == 3
+
+
+def test_chrome_arguments_set_cache_size(root):
+    cache = BrowserProfileCache(root, max_mb=1)
+    profile = cache.acquire('worker')
+    arguments = cache.chrome_arguments(profile)
+    assert f'--user-data-dir={os.path.abspath(profile)}' in arguments
+    assert '--disk-cache-size=1048576' in arguments
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""展示文本到数值列的标准化"""
+
+import pandas as pd
+
+from field_normalizer import NORMALIZED_FIELDNAMES, normalize_reviews, parse_dates, parse_quantity
+from review_record import ReviewRecord
+from review_store import ReviewStore
+
+
+def test_parse_quantity_handles_units_and_wan():
+    values = parse_quantity(pd.Series(['12.58万', '3500公里', '1.2万公里', '1,234 km', '13.5kWh/100km', '', None]))
+    assert values.tolist()[:5] == [125800.0, 3500.0, 12000.0, 1234.0, 13.5]
+    assert values.iloc[5:].isna().all()
+
+
+def test_parse_dates_accepts_common_formats():
+    dates = parse_dates(pd.Series(['2024-05', '2024年5月', '2024/05/01', '2023.12.31', '未知', None]))
+    assert dates.tolist()[:4] == ['2024-05-01', '2024-05-01', '2024-05-01', '2023-12-31']
+    assert dates.iloc[4:].isna().all()
+
+
+def test_normalize_reviews_keeps_order_and_uses_none_for_missing():
+    rows = normalize_reviews([{'行驶里程': '1.5万公里', '裸车购买价': '18.98万', '购买时间': '2024年3月'},
+                              {'冬季续航': '320km'}])
+    assert list(rows[0]) == NORMALIZED_FIELDNAMES
+    assert rows[0]['行驶里程_km'] == 15000.0
+    assert rows[0]['裸车购买价_元'] == 189800.0
+    assert rows[0]['购买日期'] == '2024-03-01'
+    assert rows[0]['冬季续航_km'] is None
+    assert rows[1]['冬季续航_km'] == 320.0
+    assert rows[1]['购买日期'] is None
+    assert normalize_reviews([]) == []
+
+
+def test_store_writes_normalized_columns(tmp_path):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    review = ReviewRecord({'评论链接': 'https://k.autohome.com.cn/detail/view_01aaa.html',
+                           '车型名称': '测试车型', '行驶里程': '3500公里', '裸车购买价': '12.58万'})
+    store.upsert_reviews('100', [review])
+    row = store.conn.execute('SELECT "行驶里程_km", "裸车购买价_元", "购买日期" FROM reviews').fetchone()
+    assert row == (3500.0, 125800.0, None)
+    store.close()
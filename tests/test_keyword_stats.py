@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""关键词统计：分块有上限时的汇总结果，以及不限字段时评论数按评论去重"""
+
+import pandas as pd
+import pytest
+
+from keyword_stats import KeywordStats
+
+
+@pytest.fixture
+def stats(tmp_path):
+    rows = [
+        {'最满意': '异响 异响', '最不满意': '异响', '空间评论': ''},
+        {'最满意': '', '最不满意': '异响', '空间评论': '隔音'},
+        {'最满意': '隔音', '最不满意': '', '空间评论': ''},
+    ]
+    pd.DataFrame(rows * 3).to_csv(tmp_path / '001_测试车型_5769.csv', index=False, encoding='utf-8-sig')
+    stats = KeywordStats(str(tmp_path), max_workers=1, chunk_size=2)
+    yield stats
+    stats.close()
+
+
+def test_term_by_model_counts_each_review_once(stats):
+    assert stats.update() == 1
+    [(car_id, count, docs, total)] = stats.term_by_model('异响')
+    assert (car_id, count, docs, total) == ('5769', 12, 6, 9)
+    [(_, count, docs, _)] = stats.term_by_model('异响', '最不满意')
+    assert (count, docs) == (6, 6)
+
+
+def test_top_terms_without_field_counts_each_review_once(stats):
+    stats.update()
+    terms = {term: (count, docs) for term, count, docs in stats.top_terms()}
+    assert terms['隔音'] == (6, 6)
+    assert terms['异响'] == (12, 6)
+
+
+def test_unchanged_files_are_skipped(stats):
+    stats.update()
+    assert stats.update() == 0
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""评分聚合的增量结果与全量重建一致，近似重复的标记和取消都会反映到分布中"""
+
+import numpy as np
+import pytest
+
+from rating_aggregator import RatingAggregator
+from review_minhash import NearDuplicateIndex
+from review_record import ReviewRecord
+from review_store import ReviewStore
+
+ORIGINAL = '这款车的后排空间非常宽敞，底盘扎实，高速行驶很稳，续航也基本达标，整体很满意'
+EDITED = '车机经常卡顿死机，售后处理很慢，冬天续航打对折，充电也不方便，不推荐购买'
+
+
+def make_review(review_id, space, text=ORIGINAL):
+    return ReviewRecord({'评论链接': f'https://k.autohome.com.cn/detail/view_{review_id}.html',
+                         '车型名称': '测试车型', '车型版本': '2024款 长续航版', '最满意': text, '空间评分': space})
+
+
+@pytest.fixture
+def env(tmp_path):
+    db_path = str(tmp_path / "reviews.db")
+    store = ReviewStore(db_path)
+    duplicates = NearDuplicateIndex(db_path)
+    aggregator = RatingAggregator(db_path, cache_path=str(tmp_path / "cache.npz"))
+    yield store, duplicates, aggregator, db_path
+    duplicates.close()
+    store.close()
+
+
+def save(store, duplicates, aggregator, reviews):
+    store.upsert_reviews('100', reviews)
+    duplicates.add_reviews('100', reviews)
+    aggregator.refresh()
+
+
+def space_count(aggregator):
+    stats = aggregator.get_stats('车型ID')
+    row = stats[stats['分类'] == '空间']
+    return int(row['样本数'].iloc[0]) if len(row) else 0
+
+
+def assert_matches_rebuild(aggregator, db_path):
+    rebuilt = RatingAggregator(db_path, cache_path=aggregator.cache_path + ".rebuild")
+    rebuilt.rebuild()
+    for key, row in rebuilt.group_index.items():
+        np.testing.assert_array_equal(aggregator.counts[aggregator.group_index[key]], rebuilt.counts[row])
+    assert aggregator.counts.sum() == rebuilt.counts.sum()
+
+
+def test_review_marked_duplicate_later_is_subtracted(env):
+    store, duplicates, aggregator, db_path = env
+    save(store, duplicates, aggregator, [make_review('01aaa', 4.5), make_review('01bbb', 3.0, EDITED)])
+    assert space_count(aggregator) == 2
+
+    # 重新爬取后第二条与第一条近似重复，已计入的评分应减去
+    save(store, duplicates, aggregator, [make_review('01bbb', 3.0)])
+    assert space_count(aggregator) == 1
+    assert_matches_rebuild(aggregator, db_path)
+
+
+def test_duplicate_mark_removed_is_added_back(env):
+    store, duplicates, aggregator, db_path = env
+    save(store, duplicates, aggregator, [make_review('01aaa', 4.5), make_review('01bbb', 3.0)])
+    assert space_count(aggregator) == 1
+
+    # 重复期间评分变化不计入，内容修改后不再重复，按当前评分加回
+    save(store, duplicates, aggregator, [make_review('01bbb', 2.0)])
+    save(store, duplicates, aggregator, [make_review('01bbb', 2.5, EDITED)])
+    assert space_count(aggregator) == 2
+    assert_matches_rebuild(aggregator, db_path)
+
+
+def test_rating_change_of_counted_review_replaces_old_value(env):
+    store, duplicates, aggregator, db_path = env
+    save(store, duplicates, aggregator, [make_review('01aaa', 4.5)])
+    save(store, duplicates, aggregator, [make_review('01aaa', 3.5)])
+    assert space_count(aggregator) == 1
+    assert_matches_rebuild(aggregator, db_path)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""查询服务的结果缓存：LRU、过期、按车型淘汰，以及计算期间发生淘汰时不写入"""
+
+import json
+
+import pytest
+
+from review_api import ResultCache, ReviewQueryService
+from review_record import ReviewRecord
+from review_store import ReviewStore
+
+
+def make_review(review_id):
+    return ReviewRecord({'评论链接': f'https://k.autohome.com.cn/detail/view_{review_id}.html',
+                         '车型名称': '测试车型', '最满意': '空间大'})
+
+
+def test_lru_evicts_oldest_entry():
+    cache = ResultCache(max_entries=2)
+    cache.put(('reviews', '1', 'stats', ()), b'1')
+    cache.put(('reviews', '2', 'stats', ()), b'2')
+    cache.get(('reviews', '1', 'stats', ()))
+    cache.put(('reviews', '3', 'stats', ()), b'3')
+    assert cache.get(('reviews', '2', 'stats', ())) is None
+    assert cache.get(('reviews', '1', 'stats', ())) == b'1'
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResultCache(ttl=-1)
+    cache.put(('reviews', '1', 'stats', ()), b'1')
+    assert cache.get(('reviews', '1', 'stats', ())) is None
+    assert cache.stats()['未命中'] == 1
+
+
+def test_invalidate_model_keeps_other_models():
+    cache = ResultCache()
+    cache.put(('reviews', '1', 'stats', ()), b'1')
+    cache.put(('reviews', '2', 'stats', ()), b'2')
+    cache.put(('reviews', None, 'models', ()), b'all')
+    assert cache.invalidate('reviews', {'1'}) == 2
+    assert cache.get(('reviews', '2', 'stats', ())) == b'2'
+    assert cache.get(('reviews', None, 'models', ())) is None
+
+
+def test_result_computed_across_invalidation_is_not_cached():
+    cache = ResultCache()
+    key = ('reviews', '1', 'stats', ())
+    token = cache.token('reviews', '1')
+    cache.invalidate('reviews', {'1'})
+    assert not cache.put(key, b'stale', token)
+    assert cache.get(key) is None
+    # 其他车型的淘汰不影响
+    token = cache.token('reviews', '1')
+    cache.invalidate('reviews', {'2'})
+    assert cache.put(key, b'fresh', token)
+
+
+@pytest.fixture
+def service(tmp_path):
+    db_path = str(tmp_path / "reviews.db")
+    store = ReviewStore(db_path)
+    store.upsert_reviews('100', [make_review('01aaa')])
+    store.touch_models(['100'])
+    service = ReviewQueryService(db_path, poll_interval=3600).start()
+    yield store, service
+    service.stop()
+    store.close()
+
+
+def test_model_update_invalidates_cached_stats(service):
+    store, service = service
+    assert json.loads(service.model_stats('100'))['评论数量'] == 1
+
+    store.upsert_reviews('100', [make_review('01bbb')])
+    # 数据版本未变化前返回缓存结果
+    assert json.loads(service.model_stats('100'))['评论数量'] == 1
+    store.touch_models(['100'])
+    service.check_versions()
+    assert json.loads(service.model_stats('100'))['评论数量'] == 2
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""去重过滤器只记录已成功入库的评论"""
+
+import pytest
+
+from review_dedup import ReviewDedupFilter
+from review_record import ReviewRecord
+from review_store import ReviewStore
+
+
+def make_review(review_id, missing=''):
+    return ReviewRecord({'评论链接': f'https://k.autohome.com.cn/detail/view_{review_id}.html',
+                         '车型名称': '测试车型', '最满意': '空间大', '缺失字段': missing})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def dedup(tmp_path):
+    dedup = ReviewDedupFilter(str(tmp_path / "review_ids.bloom"), capacity=1000)
+    yield dedup
+    dedup.close()
+
+
+def test_written_reviews_are_marked_seen(store, dedup):
+    reviews = [make_review('01aaa'), make_review('01bbb')]
+    written = []
+    assert store.upsert_reviews('100', reviews, written_reviews=written) == 2
+    assert dedup.add_reviews(written) == 2
+    assert dedup.contains(reviews[0]['评论链接'])
+    assert dedup.contains(reviews[1]['评论链接'])
+
+
+def test_failed_write_leaves_reviews_unseen(store, dedup):
+    # 模拟数据库写入失败：upsert_reviews 内部捕获异常，只返回写入条数
+    store.conn.execute('CREATE TRIGGER reject_reviews BEFORE INSERT ON reviews BEGIN SELECT RAISE(ABORT, "locked"); END')
+    review = make_review('01ccc')
+    written = []
+    assert store.upsert_reviews('100', [review], written_reviews=written) == 0
+    assert written == []
+    dedup.add_reviews(written)
+    assert not dedup.contains(review['评论链接'])
+
+
+def test_partial_reviews_are_not_marked_seen(store, dedup):
+    review = make_review('01ddd', missing='互动数据')
+    written = []
+    store.upsert_reviews('100', [review], written_reviews=written)
+    assert written == [review]
+    assert dedup.add_reviews(written) == 0
+    assert not dedup.contains(review['评论链接'])
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""近似重复检测：MinHash签名、代表评论和重新入库"""
+
+import numpy as np
+import pytest
+
+from review_minhash import NearDuplicateIndex, shingle_hashes
+from review_record import ReviewRecord
+
+TEXT = '这款车的后排空间非常宽敞，底盘扎实，高速行驶很稳，续航也基本达标，整体很满意'
+OTHER = '车机经常卡顿死机，售后处理很慢，冬天续航打对折，充电也不方便，不推荐购买'
+
+
+def make_review(review_id, text):
+    return ReviewRecord({'评论链接': f'https://k.autohome.com.cn/detail/view_{review_id}.html', '最满意': text})
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / "reviews.db"))
+    yield index
+    index.close()
+
+
+def test_shingles_ignore_punctuation():
+    assert set(shingle_hashes('空间大，很满意')) == set(shingle_hashes('空间大 很满意！'))
+    assert len(shingle_hashes('短')) == 0
+
+
+def test_identical_signatures_for_identical_text(index):
+    signatures = index.signatures([shingle_hashes(TEXT), shingle_hashes(TEXT), shingle_hashes(OTHER)])
+    assert np.array_equal(signatures[0], signatures[1])
+    assert (signatures[0] == signatures[2]).mean() < 0.5
+
+
+def test_duplicates_point_to_representative(index):
+    assert index.add_reviews('100', [make_review('01aaa', TEXT), make_review('01ccc', OTHER)]) == 0
+    assert index.add_reviews('100', [make_review('01bbb', TEXT + '！')]) == 1
+    assert index.add_reviews('200', [make_review('01ddd', TEXT)]) == 1
+    assert index.duplicate_ids() == {'01bbb', '01ddd'}
+    assert index.duplicate_ids('200') == {'01ddd'}
+    assert index.clusters() == {'01aaa': ['01aaa', '01bbb', '01ddd']}
+
+
+def test_rescraped_review_with_new_text_is_no_longer_duplicate(index):
+    index.add_reviews('100', [make_review('01aaa', TEXT), make_review('01bbb', TEXT)])
+    assert index.duplicate_ids() == {'01bbb'}
+    index.add_reviews('100', [make_review('01bbb', OTHER)])
+    assert index.duplicate_ids() == set()
+
+
+def test_short_reviews_are_not_compared(index):
+    assert index.add_reviews('100', [make_review('01aaa', '很好'), make_review('01bbb', '很好')]) == 0
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""抽样停止条件：分类样本数下限和稀疏分类"""
+
+import random
+
+from review_sampler import SampleEstimator, required_sample_size
+
+
+def review(space=None, fuel=None):
+    return {'空间评分': space, '油耗评分': fuel}
+
+
+def test_small_category_sample_does_not_stop():
+    estimator = SampleEstimator(1000, margin=0.15, min_samples=10)
+    # 前10条评分完全相同，方差为0，但样本数不足以判定
+    for _ in range(10):
+        estimator.add(review(4.0))
+    assert estimator.error_bound('空间') == 0
+    assert not estimator.satisfied()
+
+
+def test_stops_once_category_has_enough_samples():
+    estimator = SampleEstimator(1000, margin=0.15)
+    for _ in range(30):
+        estimator.add(review(4.0))
+    assert estimator.satisfied()
+
+
+def test_sparse_category_does_not_block_stopping():
+    estimator = SampleEstimator(1000, margin=0.15)
+    rng = random.Random(1)
+    for i in range(60):
+        # 少数评论带油耗评分，且分散，误差界远未达标
+        estimator.add(review(4.0, fuel=rng.choice([1.0, 5.0]) if i % 20 == 0 else None))
+    assert estimator.moments['油耗'][0] == 3
+    assert estimator.error_bound('油耗') > 0.15
+    assert estimator.satisfied()
+
+
+def test_common_category_below_minimum_blocks_stopping():
+    estimator = SampleEstimator(1000, margin=0.15)
+    for i in range(40):
+        estimator.add(review(4.0, fuel=3.0 if i % 2 == 0 else None))
+    # 油耗出现比例50%，只有20条样本，继续抽样
+    assert not estimator.satisfied()
+
+
+def test_full_population_always_stops():
+    estimator = SampleEstimator(5)
+    for _ in range(5):
+        estimator.add(review())
+    assert estimator.satisfied()
+
+
+def test_required_sample_size_uses_finite_population_correction():
+    assert required_sample_size(0, 0.15) == 0
+    assert required_sample_size(50, 0.15) < 50
+    assert required_sample_size(100000, 0.15) == 171
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""全文索引取自入库后的评论行"""
+
+import pytest
+
+from review_record import ReviewRecord
+from review_search import ReviewSearchIndex
+from review_store import ReviewStore
+
+LINK = 'https://k.autohome.com.cn/detail/view_01aaa.html'
+
+
+@pytest.fixture
+def index(tmp_path):
+    db_path = str(tmp_path / "reviews.db")
+    store = ReviewStore(db_path)
+    index = ReviewSearchIndex(db_path)
+    yield store, index
+    index.close()
+    store.close()
+
+
+def test_partial_rescrape_keeps_indexed_text(index):
+    store, index = index
+    full = ReviewRecord({'评论链接': LINK, '车型名称': '测试车型', '最不满意': '底盘异响', '空间评论': '后排宽敞'})
+    store.upsert_reviews('100', [full])
+    index.index_reviews([full])
+
+    # 部分重爬只拿到空间评论，评论表保留旧的最不满意，索引也应保留
+    partial = ReviewRecord({'评论链接': LINK, '车型名称': '测试车型', '空间评论': '后排宽敞'})
+    store.upsert_reviews('100', [partial])
+    assert index.index_reviews([partial]) == 1
+
+    results = index.search('异响')
+    assert [item['评论ID'] for item in results] == ['01aaa']
+    assert results[0]['匹配字段'] == ['最不满意']
+
+
+def test_reviews_not_in_store_are_skipped(index):
+    _, index = index
+    assert index.index_reviews([ReviewRecord({'评论链接': LINK})]) == 0
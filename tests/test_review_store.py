@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""评论存储：评论ID解析、upsert保留已有内容、按车型导出"""
+
+import csv
+
+import pytest
+
+from review_record import ReviewRecord
+from review_store import ReviewStore, parse_review_id
+
+LINK = 'https://k.autohome.com.cn/detail/view_01jabc.html'
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ReviewStore(str(tmp_path / "reviews.db"))
+    yield store
+    store.close()
+
+
+def test_parse_review_id():
+    assert parse_review_id(LINK) == '01jabc'
+    assert parse_review_id('https://k.autohome.com.cn/detail/view_2345678_1.html') == '2345678'
+    assert parse_review_id('https://k.autohome.com.cn/review?id=12345678') == '12345678'
+    assert parse_review_id('') == ''
+
+
+def test_upsert_keeps_existing_text_when_rescrape_is_empty(store):
+    store.upsert_reviews('100', [ReviewRecord({'评论链接': LINK, '车型名称': '测试车型', '最满意': '空间大',
+                                               '观看数': 10})])
+    store.upsert_reviews('100', [ReviewRecord({'评论链接': LINK, '车型名称': '测试车型', '最满意': '',
+                                               '观看数': 25, '缺失字段': '互动数据'})])
+    [review] = store.fetch_model_reviews('100')
+    assert review['最满意'] == '空间大'
+    assert int(review['观看数']) == 25
+    assert review['缺失字段'] == '互动数据'
+    assert store.count_reviews() == 1
+
+
+def test_reviews_without_link_are_skipped(store):
+    written = []
+    count = store.upsert_reviews('100', [ReviewRecord({'车型名称': '测试车型'}),
+                                         ReviewRecord({'评论链接': LINK, '车型名称': '测试车型'})],
+                                 written_reviews=written)
+    assert count == 1
+    assert [review['评论链接'] for review in written] == [LINK]
+
+
+def test_export_model_csv(store, tmp_path):
+    store.upsert_reviews('100', [ReviewRecord({'评论链接': LINK, '车型名称': '测试车型', '行驶里程': '3500公里'})])
+    store.upsert_reviews('200', [ReviewRecord({'评论链接': LINK.replace('01jabc', '01jdef'), '车型名称': '其他车型'})])
+    filepath = tmp_path / "model.csv"
+    assert store.export_model_csv('100', str(filepath)) == 1
+    with open(filepath, encoding='utf-8-sig') as f:
+        [row] = list(csv.DictReader(f))
+    assert row['评论链接'] == LINK
+    assert row['行驶里程_km'] == '3500.0'
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""分片租约：过期重租、重试上限和最后一次租约过期"""
+
+import pytest
+
+from shard_coordinator import ShardCoordinator, STATUS_DONE, STATUS_FAILED, STATUS_LEASED, STATUS_PENDING
+
+CARS = [{'车型ID': '5769', '销量排名': 1, '车型名称': '车型A'},
+        {'车型ID': '6388', '销量排名': 2, '车型名称': '车型B'}]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "shards.db")
+
+
+def coordinator(db_path, lease_seconds=600, max_attempts=3):
+    shards = ShardCoordinator(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    shards.seed(CARS)
+    return shards
+
+
+def test_lease_in_ranking_order_and_complete(db_path):
+    shards = coordinator(db_path)
+    assert shards.lease('node-1')['车型ID'] == '5769'
+    assert shards.lease('node-2')['车型ID'] == '6388'
+    assert shards.lease('node-3') is None
+    shards.complete('node-1', '5769', 120)
+    assert shards.progress() == {STATUS_DONE: 1, STATUS_LEASED: 1}
+    shards.close()
+
+
+def test_expired_lease_is_taken_over(db_path):
+    # 租约时长为负数，租用后立即过期
+    expired = coordinator(db_path, lease_seconds=-1)
+    assert expired.lease('node-1')['车型ID'] == '5769'
+    assert not expired.heartbeat('node-2', '5769')
+
+    shards = coordinator(db_path)
+    assert shards.lease('node-2')['车型ID'] == '5769'
+    assert shards.heartbeat('node-2', '5769')
+    expired.close()
+    shards.close()
+
+
+def test_expired_last_attempt_is_marked_failed(db_path):
+    shards = coordinator(db_path, lease_seconds=-1, max_attempts=2)
+    assert shards.lease('node-1')['车型ID'] == '5769'
+    assert shards.lease('node-2')['车型ID'] == '5769'
+    # 第二次租约也已过期，不会再被租用，直接记为失败
+    assert shards.progress() == {STATUS_FAILED: 1, STATUS_PENDING: 1}
+    error = shards.conn.execute('SELECT last_error FROM car_tasks WHERE "车型ID" = ?', ('5769',)).fetchone()[0]
+    assert '最大尝试次数' in error
+    assert shards.lease('node-3')['车型ID'] == '6388'
+    shards.close()
+
+
+def test_failed_car_is_retried_until_max_attempts(db_path):
+    shards = coordinator(db_path, max_attempts=2)
+    shards.lease('node-1')
+    shards.fail('node-1', '5769', '页面加载超时')
+    assert shards.lease('node-1')['车型ID'] == '5769'
+    shards.fail('node-1', '5769', '页面加载超时')
+    assert shards.lease('node-1')['车型ID'] == '6388'
+    assert shards.progress()[STATUS_FAILED] == 1
+    shards.close()
+
+
+def test_seed_keeps_existing_progress(db_path):
+    shards = coordinator(db_path)
+    shards.lease('node-1')
+    shards.complete('node-1', '5769', 10)
+    shards.seed(CARS)
+    assert shards.progress() == {STATUS_DONE: 1, STATUS_PENDING: 1}
+    shards.close()
@@ -9,7 +9,9 @@ import time
 import json
 import re
 import csv
+from contextlib import nullcontext
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -17,22 +19,33 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import logging
+from async_logging import setup_logging
+from ranking_snapshots import RankingSnapshotStore
+from selector_registry import SelectorRegistry
+from profiling import ModelProfiler
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('autohome_sales_scraper.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# 历史月度排名页地址模板，{category}为车型级别筛选，{month}为YYYY-MM（网站改版时按实际地址调整）
+HISTORY_RANK_URL = "https://www.autohome.com.cn/rank/1-{category}-x-x/{month}.html"
+
+# 车型级别筛选
+RANK_CATEGORIES = {
+    '全部': '1',
+    '轿车': '2',
+    'SUV': '3',
+    'MPV': '4'
+}
 
 
 class AutohomeSalesScraper:
-    def __init__(self):
+    def __init__(self, snapshot_db="autohome_rankings.db", selectors=None, profiler=None):
         self.driver = None
         self.wait = None
+        self.snapshot_db = snapshot_db  # 排名快照库，为None时不保存快照
+        self.profiler = profiler  # 性能剖析，按比例剖析各次页面数据提取
+        self.profile_name = "sales"  # 剖析结果文件名前缀
+        self.extract_count = 0
+        # 备选选择器命中统计，按历史命中率优先尝试
+        self.selectors = selectors or SelectorRegistry("selector_stats_sales.json")
         self.setup_driver()
 
     def setup_driver(self):
@@ -58,6 +71,12 @@ class AutohomeSalesScraper:
 
     def extract_sales_data_from_page(self):
         """从当前页面提取销量数据"""
+        self.extract_count += 1
+        with self.profiler.profile(f"{self.profile_name}_page{self.extract_count:03d}") if self.profiler else nullcontext():
+            return self._extract_sales_data_from_page()
+
+    def _extract_sales_data_from_page(self):
+        """提取当前页面已加载的全部车型数据"""
         sales_data = []
 
         try:
@@ -89,13 +108,15 @@ class AutohomeSalesScraper:
                         ]
 
                         car_name = ""
-                        for selector in name_selectors:
+                        for selector in self.selectors.ordered('车型名称', name_selectors):
                             try:
                                 name_elem = car_element.find_element(By.CSS_SELECTOR, selector)
                                 car_name = name_elem.text.strip()
+                                self.selectors.record('车型名称', selector, bool(car_name))
                                 if car_name:
                                     break
                             except:
+                                self.selectors.record('车型名称', selector, False)
                                 continue
 
                         car_info['车型名称'] = car_name
@@ -113,7 +134,7 @@ class AutohomeSalesScraper:
                         ]
 
                         monthly_sales = ""
-                        for selector in sales_selectors:
+                        for selector in self.selectors.ordered('车型月销量', sales_selectors):
                             try:
                                 sales_elems = car_element.find_elements(By.CSS_SELECTOR, selector)
                                 for elem in sales_elems:
@@ -122,9 +143,11 @@ class AutohomeSalesScraper:
                                     if text.isdigit() and len(text) >= 2:
                                         monthly_sales = text
                                         break
+                                self.selectors.record('车型月销量', selector, bool(monthly_sales))
                                 if monthly_sales:
                                     break
                             except:
+                                self.selectors.record('车型月销量', selector, False)
                                 continue
 
                         car_info['车型月销量'] = int(monthly_sales) if monthly_sales else 0
@@ -142,13 +165,15 @@ class AutohomeSalesScraper:
                         ]
 
                         series_id = ""
-                        for selector in id_selectors:
+                        for selector in self.selectors.ordered('车型ID', id_selectors):
                             try:
                                 id_elem = car_element.find_element(By.CSS_SELECTOR, selector)
                                 series_id = id_elem.get_attribute("data-series-id")
+                                self.selectors.record('车型ID', selector, bool(series_id))
                                 if series_id:
                                     break
                             except:
+                                self.selectors.record('车型ID', selector, False)
                                 continue
 
                         car_info['车型ID'] = series_id if series_id else ""
@@ -165,14 +190,16 @@ class AutohomeSalesScraper:
                         ]
 
                         price_range = ""
-                        for selector in price_selectors:
+                        for selector in self.selectors.ordered('价格区间', price_selectors):
                             try:
                                 price_elem = car_element.find_element(By.CSS_SELECTOR, selector)
                                 price_text = price_elem.text.strip()
+                                self.selectors.record('价格区间', selector, "万" in price_text)
                                 if "万" in price_text:
                                     price_range = price_text
                                     break
                             except:
+                                self.selectors.record('价格区间', selector, False)
                                 continue
 
                         car_info['价格区间'] = price_range
@@ -188,7 +215,7 @@ class AutohomeSalesScraper:
                         ]
 
                         score = ""
-                        for selector in score_selectors:
+                        for selector in self.selectors.ordered('用户评分', score_selectors):
                             try:
                                 score_elems = car_element.find_elements(By.CSS_SELECTOR, selector)
                                 for elem in score_elems:
@@ -197,9 +224,11 @@ class AutohomeSalesScraper:
                                     if re.match(r'^\d+\.\d+$', text):
                                         score = text
                                         break
+                                self.selectors.record('用户评分', selector, bool(score))
                                 if score:
                                     break
                             except:
+                                self.selectors.record('用户评分', selector, False)
                                 continue
 
                         car_info['用户评分'] = float(score) if score else 0.0
@@ -255,7 +284,7 @@ class AutohomeSalesScraper:
                     ]
 
                     load_more_clicked = False
-                    for selector in load_more_selectors:
+                    for selector in self.selectors.ordered('加载更多', load_more_selectors):
                         try:
                             if selector.startswith("//"):
                                 load_more_btn = self.driver.find_element(By.XPATH, selector)
@@ -265,10 +294,13 @@ class AutohomeSalesScraper:
                             if load_more_btn.is_enabled() and load_more_btn.is_displayed():
                                 self.driver.execute_script("arguments[0].click();", load_more_btn)
                                 load_more_clicked = True
+                                self.selectors.record('加载更多', selector, True)
                                 logging.info("点击加载更多按钮")
                                 time.sleep(5)  # 等待新数据加载
                                 break
+                            self.selectors.record('加载更多', selector, False)
                         except:
+                            self.selectors.record('加载更多', selector, False)
                             continue
 
                     # 如果没有找到加载更多按钮，尝试滚动加载
@@ -309,12 +341,11 @@ class AutohomeSalesScraper:
             logging.error(f"加载数据过程中发生错误: {e}")
             return all_data
 
-    def scrape_sales_ranking(self, target_count=500):
+    def scrape_sales_ranking(self, target_count=500, base_url="https://www.autohome.com.cn/rank/"):
         """爬取汽车销量排名数据"""
-        base_url = "https://www.autohome.com.cn/rank/"
 
         try:
-            logging.info("开始访问汽车销量排名页面")
+            logging.info(f"开始访问汽车销量排名页面: {base_url}")
             self.driver.get(base_url)
             time.sleep(5)
 
@@ -361,18 +392,46 @@ class AutohomeSalesScraper:
         except Exception as e:
             logging.error(f"保存CSV文件失败: {e}")
 
-    def run(self, target_count=500):
+    def save_snapshot(self, sales_data):
+        """写入排名快照并输出与上一次快照的对比"""
+        if not self.snapshot_db:
+            return None
+
+        try:
+            store = RankingSnapshotStore(self.snapshot_db)
+            try:
+                store.ingest(sales_data)
+                ranking_diff = store.diff()
+            finally:
+                store.close()
+
+            if ranking_diff['旧快照']:
+                for item in ranking_diff['新上榜']:
+                    logging.info(f"新上榜: 排名{item['销量排名']} - {item['车型名称']} (ID: {item['车型ID']})")
+                for item in ranking_diff['落榜']:
+                    logging.info(f"落榜: 原排名{item['销量排名']} - {item['车型名称']} (ID: {item['车型ID']})")
+                risers = [item for item in ranking_diff['排名变化'] if item['排名变化'] > 0]
+                logging.info(f"排名上升{len(risers)}个车型，上升最多: " +
+                             ", ".join(f"{item['车型名称']}(+{item['排名变化']})" for item in risers[:5]))
+            return ranking_diff
+
+        except Exception as e:
+            logging.error(f"保存排名快照失败: {e}")
+            return None
+
+    def run(self, target_count=500, base_url="https://www.autohome.com.cn/rank/"):
         """运行爬虫"""
         try:
             logging.info(f"开始执行汽车销量排名爬取任务，目标数据量: {target_count}")
 
             # 爬取销量数据
-            sales_data = self.scrape_sales_ranking(target_count)
+            sales_data = self.scrape_sales_ranking(target_count, base_url)
 
             if sales_data:
                 # 保存数据
                 filename = f"autohome_sales_ranking_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
                 self.save_to_csv(sales_data, filename)
+                self.save_snapshot(sales_data)
 
                 # 打印统计信息
                 logging.info(f"爬取完成！")
@@ -390,15 +449,111 @@ class AutohomeSalesScraper:
             logging.error(f"爬虫运行失败: {e}")
             return []
         finally:
+            self.selectors.save()
             if self.driver:
                 self.driver.quit()
 
 
+def month_range(start_month, end_month):
+    """生成 start_month 到 end_month（含）的月份列表，格式YYYY-MM"""
+    year, month = map(int, start_month.split('-'))
+    end_year, end = map(int, end_month.split('-'))
+    months = []
+    while (year, month) <= (end_year, end):
+        months.append(f"{year:04d}-{month:02d}")
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+    return months
+
+
+def scrape_history_month(month, category, target_count=500, selectors=None, profiler=None):
+    """用独立的浏览器爬取一个月份、一个级别的排名"""
+    url = HISTORY_RANK_URL.format(category=RANK_CATEGORIES[category], month=month)
+    scraper = AutohomeSalesScraper(snapshot_db=None, selectors=selectors, profiler=profiler)
+    scraper.profile_name = f"sales_{month}_{RANK_CATEGORIES[category]}"
+    try:
+        data = scraper.scrape_sales_ranking(target_count, base_url=url)
+        for item in data:
+            item['月份'] = month
+            item['类别'] = category
+        logging.info(f"{month} {category} 排名爬取完成，共{len(data)}条")
+        return data
+    finally:
+        if scraper.driver:
+            scraper.driver.quit()
+
+
+def run_history(start_month, end_month, categories=None, max_workers=4, target_count=500, filename=None,
+                profiler=None):
+    """并行爬取历史月度排名，所有月份写入同一个带月份列的CSV"""
+    categories = categories or ['全部']
+    tasks = [(month, category) for month in month_range(start_month, end_month) for category in categories]
+    logging.info(f"开始爬取历史排名: {start_month} ~ {end_month}，类别{categories}，共{len(tasks)}个任务，并发{max_workers}")
+
+    all_data = []
+    failed_tasks = []
+    selectors = SelectorRegistry("selector_stats_sales.json")  # 各线程共用同一份命中统计
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(scrape_history_month, month, category, target_count, selectors, profiler):
+                   (month, category)
+                   for month, category in tasks}
+        for future in as_completed(futures):
+            month, category = futures[future]
+            try:
+                data = future.result()
+                if data:
+                    all_data.extend(data)
+                else:
+                    failed_tasks.append((month, category))
+            except Exception as e:
+                logging.error(f"{month} {category} 排名爬取失败: {e}")
+                failed_tasks.append((month, category))
+
+    selectors.save()
+    if failed_tasks:
+        logging.warning(f"以下月份未获取到数据: {sorted(failed_tasks)}")
+
+    if not all_data:
+        logging.error("未获取到任何历史排名数据")
+        return []
+
+    all_data.sort(key=lambda x: (x['月份'], x['类别'], x.get('销量排名', 999999)))
+    filename = filename or f"autohome_sales_ranking_history_{start_month}_{end_month}.csv"
+    fieldnames = ['月份', '类别', '销量排名', '车型名称', '车型月销量', '车型ID', '价格区间', '用户评分', '爬取时间']
+    try:
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(all_data)
+        logging.info(f"历史排名共{len(all_data)}条，已保存到 {filename}")
+    except Exception as e:
+        logging.error(f"保存历史排名失败: {e}")
+
+    return all_data
+
+
 def main():
     """主函数"""
     target_count = 500  # 目标爬取数据量
+    history_months = None  # 历史模式：设置为 ("2023-09", "2025-08") 时并行爬取该区间的月度排名
+    history_categories = ['全部']  # 历史模式的车型级别筛选，取值见 RANK_CATEGORIES
+    history_workers = 4  # 历史模式的并发浏览器数
+    profile_mode = None  # 性能剖析："sampling"（采样，开销低）或 "cprofile"（确定性），None表示关闭
+    profile_rate = 0.2  # 被剖析的页面提取比例
+
+    profiler = ModelProfiler("profiles_sales", profile_mode, profile_rate) if profile_mode else None
+
+    if history_months:
+        try:
+            run_history(history_months[0], history_months[1], history_categories, history_workers, target_count,
+                        profiler=profiler)
+        finally:
+            if profiler:
+                profiler.close()
+        return
 
-    scraper = AutohomeSalesScraper()
+    scraper = AutohomeSalesScraper(profiler=profiler)
 
     try:
         logging.info("=" * 50)
@@ -425,8 +580,13 @@ def main():
     except Exception as e:
         logging.error(f"程序执行出错: {e}")
     finally:
+        if profiler:
+            profiler.close()
         logging.info("程序结束")
 
 
 if __name__ == "__main__":
+    # 配置日志：后台线程异步写入轮转压缩文件，逐字段提取成功的消息改为定期汇总计数
+    # 只在主进程配置，子进程重新导入本模块时不会各自打开同一个轮转日志文件
+    setup_logging('autohome_sales_scraper.log')
     main()
\ No newline at end of file
@@ -8,8 +8,15 @@
 
 import time
 import re
-import csv
 import os
+import math
+import random
+import queue
+import socket
+import threading
+import urllib.error
+import urllib.request
+from contextlib import nullcontext
 import pandas as pd
 from datetime import datetime
 from selenium import webdriver
@@ -21,24 +28,179 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.service import Service
 import logging
+from async_logging import setup_logging
+from review_store import ReviewStore, parse_review_id
+from review_record import ReviewRecord, NUMERIC_FIELDS, write_csv, write_parquet, content_hash
+from review_dedup import ReviewDedupFilter
+from review_search import ReviewSearchIndex
+from review_minhash import NearDuplicateIndex
+from rating_aggregator import RatingAggregator
+from shard_coordinator import ShardCoordinator, LeaseHeartbeat
+from crawl_scheduler import CrawlScheduler
+from ranking_snapshots import RankingSnapshotStore
+from selector_registry import SelectorRegistry
+from deadline import Deadline
+from review_sampler import SampleEstimator, required_sample_size, purpose_shares
+from page_parser import ParsePipeline, parse_star_rating, parse_publish_date, parse_review_payload
+from profiling import ModelProfiler
+from adaptive_concurrency import AIMDController
+from browser_cache import BrowserProfileCache, PAGE_BYTES_JS
+
+
+REVIEW_SITE_URL = "https://k.autohome.com.cn"  # 口碑站点地址，压测时指向本地模拟站点
+BROWSER_CHECK_URL = "https://www.baidu.com"  # 浏览器初始化后的连通性测试页面
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.7258.128'
+
+# 直接读取交互数据（包括隐藏元素）的脚本
+INTERACTION_JS = """
+var result = {views: 0, goods: 0, comments: 0};
+
+// 获取观看数
+var viewElements = document.querySelectorAll('span.option-views');
+for (var i = 0; i < viewElements.length; i++) {
+    var text = viewElements[i].textContent.trim();
+    if (/^\d+$/.test(text)) {
+        result.views = parseInt(text);
+        break;
+    }
+}
+
+// 获取点赞数
+var goodElements = document.querySelectorAll('span.option-goods');
+for (var i = 0; i < goodElements.length; i++) {
+    var text = goodElements[i].textContent.trim();
+    if (/^\d+$/.test(text)) {
+        result.goods = parseInt(text);
+        break;
+    }
+}
+
+// 获取评论数
+var commentElements = document.querySelectorAll('span.option-comments');
+for (var i = 0; i < commentElements.length; i++) {
+    var text = commentElements[i].textContent.trim();
+    if (/^\d+$/.test(text)) {
+        result.comments = parseInt(text);
+        break;
+    }
+}
+
+return result;
+"""
+
+# 交互数据字段与详情页元素class的对应关系
+COUNTER_CLASSES = {'观看数': 'option-views', '点赞数': 'option-goods', '评论数': 'option-comments'}
+
+# 快速模式：一次性读取列表页所有评论卡片的脚本
+# 从每个“查看完整口碑”链接向上找到只包含这一个链接的最外层容器，作为该评论的卡片
+LIST_CARD_JS = """
+var cards = [];
+var links = Array.prototype.filter.call(document.querySelectorAll('a'), function (a) {
+    return a.textContent.indexOf('查看完整口碑') !== -1 && a.href;
+});
+
+function countLinks(node) {
+    var count = 0;
+    for (var i = 0; i < links.length; i++) {
+        if (node.contains(links[i])) count++;
+    }
+    return count;
+}
+
+for (var i = 0; i < links.length; i++) {
+    var card = links[i];
+    while (card.parentElement && card.parentElement !== document.body && countLinks(card.parentElement) === 1) {
+        card = card.parentElement;
+    }
+
+    var purposes = [];
+    var purposeItems = card.querySelectorAll('li[class*="list_target"]');
+    for (var j = 0; j < purposeItems.length; j++) {
+        var purpose = purposeItems[j].textContent.trim();
+        if (purpose) purposes.push(purpose);
+    }
+
+    var ratings = [];
+    var ratingItems = card.querySelectorAll('[class*="list_nice_value"]');
+    for (var j = 0; j < ratingItems.length; j++) {
+        var holder = ratingItems[j].parentElement || ratingItems[j];
+        var rating = holder.textContent.replace(/\\s+/g, ' ').trim();
+        if (rating) ratings.push(rating);
+    }
+
+    cards.push({
+        link: links[i].href,
+        purposes: purposes,
+        ratings: ratings,
+        text: card.innerText || card.textContent || ''
+    });
+}
+
+return cards;
+"""
+
+PAGE_LOAD_TIMEOUT = 60  # 单次页面加载的最长等待秒数
+
+# 详情页各提取阶段对应的字段，预算用完跳过该阶段时这些字段记为缺失
+CAR_INFO_FIELDS = ['车型名称', '车型版本', '发表时间', '行驶里程', '夏季电耗', '春秋电耗', '冬季电耗',
+                   '夏季续航', '春秋续航', '冬季续航', '百公里油耗', '裸车购买价', '购买时间', '购买地点']
+REVIEW_DETAIL_FIELDS = ['最满意', '最不满意'] + [
+    f'{category}{suffix}' for category in ['空间', '驾驶感受', '续航', '外观', '内饰', '性价比', '智能化', '油耗', '配置']
+    for suffix in ('评分', '评论')] + ['追加口碑']
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('autohome_scraper.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+
+def parse_counters_html(html):
+    """从详情页HTML中解析互动数据，解析不全时返回None"""
+    counters = {}
+    for field, css_class in COUNTER_CLASSES.items():
+        match = re.search(rf'class="[^"]*\b{css_class}\b[^"]*"[^>]*>\s*(\d+)\s*<', html)
+        if match:
+            counters[field] = int(match.group(1))
+    return counters if len(counters) == len(COUNTER_CLASSES) else None
 
 
 class AutohomeReviewScraper:
-    def __init__(self, output_dir="autohome_reviews_output"):
+    def __init__(self, output_dir="autohome_reviews_output", db_path=None, dedup_path=None,
+                 run_budget=None, model_budget=None, review_budget=None, parse_workers=None, site_url=REVIEW_SITE_URL,
+                 export_parquet=False, profiler=None, controller=None, browser_cache=None, selectors=None,
+                 rating_aggregator=None):
         self.driver = None
+        self.profiler = profiler  # 性能剖析，按比例剖析各车型的评论爬取
+        self.controller = controller  # 自适应并发控制，决定同时请求的浏览器数和请求速率
+        self.browser_cache = browser_cache  # 持久化浏览器配置和磁盘缓存，重启后静态资源从缓存读取
+        self.profile_dir = None
+        self.pages_loaded = 0
+        self.site_url = site_url.rstrip('/')
         self.wait = None
+        # 运行、单车型、单条评论的时间预算（秒），None表示不限时
+        self.run_budget = run_budget
+        self.model_budget = model_budget
+        self.review_budget = review_budget
+        self.run_deadline = Deadline(name='运行')
+        self.model_deadline = self.run_deadline
+        self.deadline = self.run_deadline  # 当前生效的最内层预算
+        self.missing_fields = []
         self.output_dir = output_dir
+        self.export_parquet = export_parquet  # 汇总数据同时输出Parquet文件（需要pyarrow）
         self.setup_output_directory()
+        # 评论持久化存储，分车型CSV从存储导出
+        self.review_store = ReviewStore(db_path or os.path.join(self.output_dir, "autohome_reviews.db"))
+        # 评论全文索引，与评论存储共用同一个数据库文件
+        self.search_index = ReviewSearchIndex(self.review_store.db_path)
+        # 近似重复检测（MinHash + LSH），重复评论不计入评分分布和汇总统计
+        self.near_duplicates = NearDuplicateIndex(self.review_store.db_path)
+        # 分类评分分布聚合，随评论入库增量更新
+        self.rating_aggregator = rating_aggregator or RatingAggregator(self.review_store.db_path)
+        # 备选选择器命中统计，按历史命中率优先尝试
+        self.selectors = selectors or SelectorRegistry(os.path.join(self.output_dir, "selector_stats.json"))
+        # 并发模式下额外的浏览器共用主实例的选择器统计和评分聚合，由主实例关闭时统一保存
+        self.shared_stats = selectors is not None or rating_aggregator is not None
+        # 已爬取评论ID的去重过滤器，跨车型、跨运行有效
+        self.dedup_filter = ReviewDedupFilter(dedup_path or os.path.join(self.output_dir, "review_ids.bloom"))
+        # 设置解析进程数时，浏览器只负责抓取页面，车辆信息和评论详情交给进程池解析
+        self.parse_workers = parse_workers
+        self.parse_pipeline = ParsePipeline(parse_workers) if parse_workers else None
         self.setup_driver()
 
     def setup_output_directory(self):
@@ -70,6 +232,9 @@ class AutohomeReviewScraper:
                     '销量排名': int(row['销量排名']),
                     '车型名称': str(row['车型名称']).strip()
                 }
+                # 月销量用于按价值分配页数预算（可选列）
+                if '车型月销量' in df.columns and pd.notna(row['车型月销量']):
+                    car_info['车型月销量'] = int(row['车型月销量'])
                 car_info_list.append(car_info)
 
             logging.info(f"从{csv_file}读取到{len(car_info_list)}个车型信息")
@@ -82,6 +247,41 @@ class AutohomeReviewScraper:
             logging.error(f"读取CSV文件失败: {e}")
             return []
 
+    def load_car_info_from_ranking_diff(self, ranking_db="autohome_rankings.db", include_unchanged=True):
+        """根据最近两次排名快照的对比生成车型列表：新上榜优先，其次排名上升的车型，落榜车型不再爬取"""
+        try:
+            store = RankingSnapshotStore(ranking_db)
+            try:
+                ranking_diff = store.diff()
+            finally:
+                store.close()
+
+            if not ranking_diff['新快照']:
+                logging.error(f"排名快照库中没有数据: {ranking_db}")
+                return []
+
+            ordered = list(ranking_diff['新上榜'])
+            risers = [item for item in ranking_diff['排名变化'] if item['排名变化'] > 0]
+            ordered.extend(risers)
+            if include_unchanged:
+                others = [item for item in ranking_diff['排名变化'] if item['排名变化'] <= 0]
+                ordered.extend(sorted(others, key=lambda x: x['销量排名']))
+
+            car_info_list = [{
+                '车型ID': str(item['车型ID']),
+                '销量排名': int(item['销量排名']),
+                '车型名称': str(item['车型名称']).strip(),
+                '车型月销量': int(item['车型月销量'] or 0)
+            } for item in ordered]
+
+            logging.info(f"从排名快照对比读取到{len(car_info_list)}个车型：新上榜{len(ranking_diff['新上榜'])}个，"
+                         f"排名上升{len(risers)}个，落榜{len(ranking_diff['落榜'])}个")
+            return car_info_list
+
+        except Exception as e:
+            logging.error(f"读取排名快照对比失败: {e}")
+            return []
+
     def setup_driver(self):
         """配置Chrome浏览器 - 使用本地ChromeDriver"""
         chrome_options = Options()
@@ -91,8 +291,13 @@ class AutohomeReviewScraper:
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_argument(
-            '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/139.0.7258.128')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+        if self.browser_cache:
+            # 按线程名取得固定的配置目录，同一个浏览器位置每次启动都复用上次的缓存
+            if self.profile_dir is None:
+                self.profile_dir = self.browser_cache.acquire(threading.current_thread().name)
+            for argument in self.browser_cache.chrome_arguments(self.profile_dir):
+                chrome_options.add_argument(argument)
 
         try:
             # 指定本地 ChromeDriver 路径
@@ -106,7 +311,7 @@ class AutohomeReviewScraper:
             logging.info("浏览器初始化成功")
 
             # 添加测试验证
-            self.driver.get("https://www.baidu.com")
+            self.driver.get(BROWSER_CHECK_URL)
             logging.info(f"浏览器测试成功！标题: {self.driver.title}")
             return True
         except Exception as e:
@@ -122,7 +327,7 @@ class AutohomeReviewScraper:
                 self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
                 self.wait = WebDriverWait(self.driver, 10)
                 logging.info("浏览器初始化成功（使用WebDriver Manager）")
-                self.driver.get("https://www.baidu.com")
+                self.driver.get(BROWSER_CHECK_URL)
                 logging.info(f"浏览器测试成功！标题: {self.driver.title}")
                 return True
             except Exception as fallback_e:
@@ -130,16 +335,47 @@ class AutohomeReviewScraper:
                 logging.error(traceback.format_exc())
                 return False
 
+    def sleep(self, seconds):
+        """在当前时间预算内休眠"""
+        return self.deadline.sleep(seconds)
+
+    def wait_for(self, condition, timeout=10):
+        """按当前时间预算截断超时的显式等待"""
+        return WebDriverWait(self.driver, self.deadline.timeout(timeout)).until(condition)
+
+    def load_page(self, url):
+        """打开页面，加载时间受当前预算限制，超时则停止加载并使用已加载的内容"""
+        remaining = self.deadline.remaining()
+        if remaining != math.inf:
+            self.driver.set_page_load_timeout(max(1, min(PAGE_LOAD_TIMEOUT, remaining)))
+        started = time.monotonic()
+        try:
+            self.driver.get(url)
+        except TimeoutException:
+            logging.warning(f"页面加载超出时间预算，使用已加载的内容: {url}")
+            self.driver.execute_script("window.stop();")
+
+        if self.browser_cache:
+            latency = time.monotonic() - started
+            try:
+                page_bytes = self.driver.execute_script(PAGE_BYTES_JS)
+            except Exception:
+                page_bytes = None
+            self.browser_cache.record_page(self.profile_dir, url, latency, page_bytes, self.pages_loaded == 0)
+        self.pages_loaded += 1
+
+    def mark_missing(self, data, fields, stage):
+        """时间预算用完跳过某个提取阶段时，将对应字段置空并记录；评分和互动数据记为未赋值（None），
+        避免空字符串参与数值汇总"""
+        for field in fields:
+            data[field] = None if field in NUMERIC_FIELDS else ''
+        self.missing_fields.append(stage)
+
     def extract_star_rating(self, star_element):
         """从星级元素中提取评分"""
         try:
             star_fill = star_element.find_element(By.CLASS_NAME, "kb-star")
-            width_style = star_fill.get_attribute("style")
-            width_match = re.search(r'width:\s*(\d+)%', width_style)
-            if width_match:
-                width_percent = int(width_match.group(1))
-                return round(width_percent / 20, 1)  # 转换为5分制
-            return 0
+            return parse_star_rating(star_fill.get_attribute("style"))  # 转换为5分制
         except:
             return 0
     def extract_publish_time(self):
@@ -153,7 +389,7 @@ class AutohomeReviewScraper:
                 ".timeline-con span"
             ]
 
-            for selector in timeline_selectors:
+            for selector in self.selectors.ordered('发表时间', timeline_selectors):
                 try:
                     if 'contains' in selector:
                         # 使用XPath查找包含"首次发表"的span
@@ -162,34 +398,23 @@ class AutohomeReviewScraper:
                         timeline_elem = self.driver.find_element(By.CSS_SELECTOR, selector)
 
                     timeline_text = timeline_elem.text.strip()
-                    logging.info(f"找到时间线文本: {timeline_text}")
-
-                    # 提取日期，支持多种格式
-                    date_patterns = [
-                        r'(\d{4}-\d{2}-\d{2})\s+首次发表',  # 2025-08-15 首次发表
-                        r'(\d{4}-\d{1,2}-\d{1,2})\s+首次发表',  # 支持单数日期
-                        r'(\d{4}/\d{2}/\d{2})\s+首次发表',  # 2025/08/15 首次发表
-                        r'(\d{4}\.\d{2}\.\d{2})\s+首次发表',  # 2025.08.15 首次发表
-                        r'(\d{4}-\d{2}-\d{2})',  # 仅日期格式
-                    ]
+                    logging.debug(f"找到时间线文本: {timeline_text}")
 
-                    for pattern in date_patterns:
-                        match = re.search(pattern, timeline_text)
-                        if match:
-                            publish_date = match.group(1)
-                            # 标准化日期格式为 YYYY-MM-DD
-                            if '/' in publish_date:
-                                publish_date = publish_date.replace('/', '-')
-                            elif '.' in publish_date:
-                                publish_date = publish_date.replace('.', '-')
-
-                            logging.info(f"成功提取发表时间: {publish_date}")
-                            return publish_date
+                    # 提取日期，支持多种格式，统一为 YYYY-MM-DD
+                    publish_date = parse_publish_date(timeline_text)
+                    if publish_date:
+                        logging.debug(f"成功提取发表时间: {publish_date}")
+                        self.selectors.record('发表时间', selector, True)
+                        return publish_date
+
+                    self.selectors.record('发表时间', selector, False)
 
                 except NoSuchElementException:
+                    self.selectors.record('发表时间', selector, False)
                     continue
                 except Exception as e:
                     logging.debug(f"尝试选择器 {selector} 失败: {e}")
+                    self.selectors.record('发表时间', selector, False)
                     continue
 
             # 如果上面的方法都失败，尝试更通用的方法
@@ -202,7 +427,7 @@ class AutohomeReviewScraper:
                         date_match = re.search(r'(\d{4}-\d{1,2}-\d{1,2})', text)
                         if date_match:
                             publish_date = date_match.group(1)
-                            logging.info(f"通过遍历找到发表时间: {publish_date}")
+                            logging.debug(f"通过遍历找到发表时间: {publish_date}")
                             return publish_date
             except Exception as e:
                 logging.debug(f"遍历span查找时间失败: {e}")
@@ -278,13 +503,14 @@ class AutohomeReviewScraper:
 
         try:
             # 等待页面完全加载
-            WebDriverWait(self.driver, 15).until(
-                lambda driver: driver.execute_script("return document.readyState") == "complete"
-            )
-            time.sleep(2)
+            try:
+                self.wait_for(lambda driver: driver.execute_script("return document.readyState") == "complete", 15)
+            except TimeoutException:
+                logging.warning("等待页面加载完成超时，继续尝试提取交互数据")
+            self.sleep(2)
 
             # 关键步骤：触发隐藏元素显示
-            logging.info("尝试触发隐藏的交互数据元素显示...")
+            logging.debug("尝试触发隐藏的交互数据元素显示...")
 
             # 方法1：滚动到页面中间位置触发元素显示
             try:
@@ -293,13 +519,13 @@ class AutohomeReviewScraper:
                 scroll_to = page_height // 2
 
                 self.driver.execute_script(f"window.scrollTo(0, {scroll_to});")
-                time.sleep(1)
+                self.sleep(1)
 
                 # 再滚动一点确保触发
                 self.driver.execute_script("window.scrollBy(0, 200);")
-                time.sleep(1)
+                self.sleep(1)
 
-                logging.info(f"已滚动到页面中间位置 ({scroll_to}px)")
+                logging.debug(f"已滚动到页面中间位置 ({scroll_to}px)")
 
             except Exception as e:
                 logging.warning(f"滚动触发失败: {e}")
@@ -319,12 +545,12 @@ class AutohomeReviewScraper:
                         trigger_element = self.driver.find_element(By.CSS_SELECTOR, selector)
                         # 滚动到元素位置
                         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", trigger_element)
-                        time.sleep(1)
+                        self.sleep(1)
 
                         # 模拟鼠标悬停
                         from selenium.webdriver.common.action_chains import ActionChains
                         ActionChains(self.driver).move_to_element(trigger_element).perform()
-                        time.sleep(1)
+                        self.sleep(1)
                         break
                     except:
                         continue
@@ -339,9 +565,9 @@ class AutohomeReviewScraper:
                 for element in hidden_options:
                     # 使用JavaScript移除fn-hide类
                     self.driver.execute_script("arguments[0].classList.remove('fn-hide');", element)
-                    logging.info("已移除fn-hide类，元素应该显示了")
+                    logging.debug("已移除fn-hide类，元素应该显示了")
 
-                time.sleep(1)  # 等待元素显示
+                self.sleep(1)  # 等待元素显示
 
             except Exception as e:
                 logging.warning(f"移除fn-hide类失败: {e}")
@@ -369,8 +595,8 @@ class AutohomeReviewScraper:
 
                 hidden_count = self.driver.execute_script(show_script)
                 if hidden_count > 0:
-                    logging.info(f"通过JavaScript显示了 {hidden_count} 个隐藏的options元素")
-                    time.sleep(1)  # 等待显示完成
+                    logging.debug(f"通过JavaScript显示了 {hidden_count} 个隐藏的options元素")
+                    self.sleep(1)  # 等待显示完成
 
             except Exception as e:
                 logging.warning(f"JavaScript显示元素失败: {e}")
@@ -386,7 +612,7 @@ class AutohomeReviewScraper:
                         text = elem.text.strip()
                         if text.isdigit():
                             interaction_data['观看数'] = int(text)
-                            logging.info(f"成功提取观看数: {interaction_data['观看数']}")
+                            logging.debug(f"成功提取观看数: {interaction_data['观看数']}")
                             break
 
                 # 点赞数
@@ -396,7 +622,7 @@ class AutohomeReviewScraper:
                         text = elem.text.strip()
                         if text.isdigit():
                             interaction_data['点赞数'] = int(text)
-                            logging.info(f"成功提取点赞数: {interaction_data['点赞数']}")
+                            logging.debug(f"成功提取点赞数: {interaction_data['点赞数']}")
                             break
 
                 # 评论数
@@ -406,7 +632,7 @@ class AutohomeReviewScraper:
                         text = elem.text.strip()
                         if text.isdigit():
                             interaction_data['评论数'] = int(text)
-                            logging.info(f"成功提取评论数: {interaction_data['评论数']}")
+                            logging.debug(f"成功提取评论数: {interaction_data['评论数']}")
                             break
 
             except Exception as e:
@@ -418,43 +644,7 @@ class AutohomeReviewScraper:
 
                 try:
                     # 使用JavaScript直接获取元素内容，绕过显示状态检查
-                    interaction_script = """
-                    var result = {views: 0, goods: 0, comments: 0};
-
-                    // 获取观看数
-                    var viewElements = document.querySelectorAll('span.option-views');
-                    for (var i = 0; i < viewElements.length; i++) {
-                        var text = viewElements[i].textContent.trim();
-                        if (/^\d+$/.test(text)) {
-                            result.views = parseInt(text);
-                            break;
-                        }
-                    }
-
-                    // 获取点赞数
-                    var goodElements = document.querySelectorAll('span.option-goods');
-                    for (var i = 0; i < goodElements.length; i++) {
-                        var text = goodElements[i].textContent.trim();
-                        if (/^\d+$/.test(text)) {
-                            result.goods = parseInt(text);
-                            break;
-                        }
-                    }
-
-                    // 获取评论数
-                    var commentElements = document.querySelectorAll('span.option-comments');
-                    for (var i = 0; i < commentElements.length; i++) {
-                        var text = commentElements[i].textContent.trim();
-                        if (/^\d+$/.test(text)) {
-                            result.comments = parseInt(text);
-                            break;
-                        }
-                    }
-
-                    return result;
-                    """
-
-                    js_result = self.driver.execute_script(interaction_script)
+                    js_result = self.driver.execute_script(INTERACTION_JS)
                     if js_result:
                         interaction_data['观看数'] = js_result.get('views', 0)
                         interaction_data['点赞数'] = js_result.get('goods', 0)
@@ -484,7 +674,7 @@ class AutohomeReviewScraper:
 
                         # 滚动到容器位置
                         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", container)
-                        time.sleep(1)
+                        self.sleep(1)
 
                         # 在这个容器中查找交互数据
                         try:
@@ -510,12 +700,18 @@ class AutohomeReviewScraper:
 
                         # 如果在这个容器中找到了数据，就退出循环
                         if any(value > 0 for value in interaction_data.values()):
-                            logging.info(f"在options容器中成功找到交互数据")
+                            logging.debug(f"在options容器中成功找到交互数据")
                             break
 
                 except Exception as e:
                     logging.error(f"策略3失败: {e}")
 
+            # 时间预算用完仍未取到数据时记为缺失，而不是记为0
+            if all(value == 0 for value in interaction_data.values()) and self.deadline.expired():
+                self.mark_missing(interaction_data, list(interaction_data.keys()), '互动数据')
+                logging.warning("时间预算已用完，互动数据记为缺失")
+                return interaction_data
+
             # 调试：输出最终状态
             if all(value == 0 for value in interaction_data.values()):
                 logging.warning("所有策略都失败，进行最终调试...")
@@ -622,13 +818,15 @@ class AutohomeReviewScraper:
                 "//div[contains(@class, 'kb-item')]//h1[contains(text(), '最满意')]/../p[@class='kb-item-msg']"
             ]
 
-            for selector in satisfied_selectors:
+            for selector in self.selectors.ordered('最满意', satisfied_selectors):
                 try:
                     satisfied_elem = self.driver.find_element(By.XPATH, selector)
                     review_data['最满意'] = satisfied_elem.text.strip()
-                    logging.info(f"成功提取最满意内容: {review_data['最满意'][:50]}...")
+                    self.selectors.record('最满意', selector, True)
+                    logging.debug(f"成功提取最满意内容: {review_data['最满意'][:50]}...")
                     break
                 except:
+                    self.selectors.record('最满意', selector, False)
                     continue
 
             # 修复：提取最不满意 - 使用多种选择器尝试
@@ -640,13 +838,15 @@ class AutohomeReviewScraper:
                 "//div[contains(@class, 'kb-item')]//h1[contains(text(), '最不满意')]/../p[@class='kb-item-msg']"
             ]
 
-            for selector in unsatisfied_selectors:
+            for selector in self.selectors.ordered('最不满意', unsatisfied_selectors):
                 try:
                     unsatisfied_elem = self.driver.find_element(By.XPATH, selector)
                     review_data['最不满意'] = unsatisfied_elem.text.strip()
-                    logging.info(f"成功提取最不满意内容: {review_data['最不满意'][:50]}...")
+                    self.selectors.record('最不满意', selector, True)
+                    logging.debug(f"成功提取最不满意内容: {review_data['最不满意'][:50]}...")
                     break
                 except:
+                    self.selectors.record('最不满意', selector, False)
                     continue
 
             # 打印页面源码用于调试（可选）
@@ -664,20 +864,30 @@ class AutohomeReviewScraper:
             # 提取各项评分和评论
             categories = ['空间', '驾驶感受', '续航', '外观', '内饰', '性价比', '智能化', '油耗', '配置']
 
-            for category in categories:
+            for index, category in enumerate(categories):
+                if self.deadline.expired():
+                    # 时间预算用完，剩余分类记为缺失
+                    skipped = categories[index:]
+                    self.mark_missing(review_data, [f'{c}{suffix}' for c in skipped for suffix in ('评分', '评论')],
+                                      '分类评价')
+                    logging.warning(f"时间预算已用完，跳过分类: {skipped}")
+                    break
+
                 try:
                     # 使用更灵活的选择器查找分类
                     category_selectors = [
-                        f"//h1[contains(text(), '{category}')]",
-                        f"//div[@class='space kb-item']//h1[contains(text(), '{category}')]"
+                        "//h1[contains(text(), '{category}')]",
+                        "//div[@class='space kb-item']//h1[contains(text(), '{category}')]"
                     ]
 
                     category_elem = None
-                    for selector in category_selectors:
+                    for selector in self.selectors.ordered('分类标题', category_selectors):
                         try:
-                            category_elem = self.driver.find_element(By.XPATH, selector)
+                            category_elem = self.driver.find_element(By.XPATH, selector.format(category=category))
+                            self.selectors.record('分类标题', selector, True)
                             break
                         except:
+                            self.selectors.record('分类标题', selector, False)
                             continue
 
                     if category_elem:
@@ -697,12 +907,14 @@ class AutohomeReviewScraper:
                         ]
 
                         comment_text = ""
-                        for comment_selector in comment_selectors:
+                        for comment_selector in self.selectors.ordered('分类评论', comment_selectors):
                             try:
                                 comment_elem = category_elem.find_element(By.XPATH, comment_selector)
                                 comment_text = comment_elem.text.strip()
+                                self.selectors.record('分类评论', comment_selector, True)
                                 break
                             except:
+                                self.selectors.record('分类评论', comment_selector, False)
                                 continue
 
                         review_data[f'{category}评论'] = comment_text
@@ -715,51 +927,153 @@ class AutohomeReviewScraper:
                     review_data[f'{category}评分'] = 0
                     review_data[f'{category}评论'] = ""
 
+            # 追加口碑：车主后续补充的使用感受，可能有多条
+            followups = []
+            try:
+                for h1 in self.driver.find_elements(By.XPATH, "//h1[contains(text(), '追加')]"):
+                    try:
+                        message = h1.find_element(By.XPATH, "./following-sibling::p[@class='kb-item-msg']").text.strip()
+                    except NoSuchElementException:
+                        continue
+                    if message:
+                        followups.append(f"{h1.text.strip()}\n{message}")
+            except Exception as e:
+                logging.debug(f"提取追加口碑失败: {e}")
+            review_data['追加口碑'] = "\n\n".join(followups)
+
             return review_data
 
         except Exception as e:
             logging.error(f"提取评论详情失败: {e}")
             return review_data
 
-    def scrape_review_page(self, review_url):
-        """爬取单个评论详情页"""
+    def open_review_page(self, review_url):
+        """打开评论详情页并等待关键元素加载，超时返回False；启用并发控制时上报结果和加载耗时"""
+        started = time.monotonic()
         try:
-            self.driver.get(review_url)
-            time.sleep(1)  # 增加等待时间
-
-            # 添加调试
-            #self.debug_page_structure()  # 添加这行
-
-            # 等待页面关键元素加载
+            opened = self._open_review_page(review_url)
+        except Exception:
+            if self.controller:
+                self.controller.record(False, latency=time.monotonic() - started)
+            raise
+        if self.controller:
+            self.controller.record(opened, timed_out=not opened, latency=time.monotonic() - started)
+        return opened
+
+    def _open_review_page(self, review_url):
+        """加载详情页，等待评论内容或车型信息出现"""
+        self.load_page(review_url)
+        self.sleep(1)  # 增加等待时间
+
+        # 添加调试
+        #self.debug_page_structure()  # 添加这行
+
+        # 等待页面关键元素加载
+        try:
+            self.wait_for(EC.presence_of_element_located((By.CLASS_NAME, "kb-item")))
+        except TimeoutException:
+            # 如果kb-item没有加载，尝试等待其他关键元素
             try:
-                self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "kb-item")))
+                self.wait_for(EC.presence_of_element_located((By.CSS_SELECTOR, ".main-series")))
             except TimeoutException:
-                # 如果kb-item没有加载，尝试等待其他关键元素
-                try:
-                    self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".main-series")))
-                except TimeoutException:
-                    logging.error(f"页面加载超时: {review_url}")
-                    return None
+                logging.error(f"页面加载超时: {review_url}")
+                return False
+        return True
+
+    def request_slot(self):
+        """启用并发控制时占用一个请求名额，超出当前并发数时等待"""
+        return self.controller.slot() if self.controller else nullcontext()
+
+    def pace(self):
+        """详情页请求之间的间隔：启用并发控制时按当前请求速率，否则固定1秒"""
+        if self.controller:
+            self.controller.pace()
+        else:
+            time.sleep(1)  # 增加延时避免被封
+
+    def scrape_review_page(self, review_url):
+        """爬取单个评论详情页，时间预算用完时返回缺失部分字段的记录"""
+        with self.request_slot():
+            return self._scrape_review_page(review_url)
+
+    def _scrape_review_page(self, review_url):
+        """打开详情页并依次提取车辆信息、评论详情和互动数据"""
+        self.deadline = self.model_deadline.child(self.review_budget, '评论')
+        self.missing_fields = []
+        try:
+            if not self.open_review_page(review_url):
+                return None
 
             # 提取车辆信息
-            car_info = self.extract_car_info()
+            car_info = {}
+            if self.deadline.expired():
+                self.mark_missing(car_info, CAR_INFO_FIELDS, '车辆信息')
+            else:
+                car_info = self.extract_car_info()
 
             # 提取评论详情
-            review_details = self.extract_review_details()
+            review_details = {}
+            if self.deadline.expired():
+                self.mark_missing(review_details, REVIEW_DETAIL_FIELDS, '评论详情')
+            else:
+                review_details = self.extract_review_details()
 
             # 提取互动数据（观看数、点赞数、评论数）
-            interaction_data = self.extract_interaction_data()
+            interaction_data = {}
+            if self.deadline.expired():
+                self.mark_missing(interaction_data, list(COUNTER_CLASSES.keys()), '互动数据')
+            else:
+                interaction_data = self.extract_interaction_data()
 
             # 合并数据
-            result = {**car_info, **review_details, **interaction_data}
+            result = ReviewRecord(car_info, review_details, interaction_data)
             result['评论链接'] = review_url
             result['爬取时间'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            result['缺失字段'] = ",".join(self.missing_fields)
+
+            if self.missing_fields:
+                logging.warning(f"{self.deadline.expired_scope()}时间预算用完，记录部分字段缺失({result['缺失字段']}): {review_url}")
 
             return result
 
         except Exception as e:
             logging.error(f"爬取评论页面失败 {review_url}: {e}")
             return None
+        finally:
+            self.deadline = self.model_deadline
+
+    def capture_review_page(self, review_url):
+        """抓取阶段：只做必须在浏览器内完成的加载和互动数据读取，返回页面源码交给解析进程"""
+        with self.request_slot():
+            return self._capture_review_page(review_url)
+
+    def _capture_review_page(self, review_url):
+        """打开详情页，读取互动数据和页面源码"""
+        self.deadline = self.model_deadline.child(self.review_budget, '评论')
+        self.missing_fields = []
+        try:
+            if not self.open_review_page(review_url):
+                return None
+
+            interaction_data = {}
+            if self.deadline.expired():
+                self.mark_missing(interaction_data, list(COUNTER_CLASSES.keys()), '互动数据')
+            else:
+                interaction_data = self.extract_interaction_data()
+
+            return {
+                'html': self.driver.page_source,
+                '互动数据': interaction_data,
+                '评论链接': review_url,
+                '爬取时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                '缺失字段': ",".join(self.missing_fields)
+            }
+
+        except Exception as e:
+            logging.error(f"抓取评论页面失败 {review_url}: {e}")
+            return None
+        finally:
+            self.deadline = self.model_deadline
 
     def extract_purchase_purposes(self, review_elements):
         """从列表页面提取购车目的，为每个评论建立映射"""
@@ -790,24 +1104,60 @@ class AutohomeReviewScraper:
         if len(purchase_purposes) > len(review_elements):
             purchase_purposes = purchase_purposes[:len(review_elements)]
 
-        logging.info(f"提取到{len(purchase_purposes)}个购车目的")
+        logging.debug(f"提取到{len(purchase_purposes)}个购车目的")
         return purchase_purposes
 
+    def click_next_page(self):
+        """点击列表页的下一页按钮，已到最后一页时返回False"""
+        try:
+            # 尝试多种下一页按钮选择器
+            next_selectors = [
+                "//a[contains(@class, 'athm-page-next')]",
+                "//a[@class='ace-pagination__btn next']",
+                "//a[contains(text(), '下一页')]"
+            ]
+
+            for selector in self.selectors.ordered('下一页', next_selectors):
+                try:
+                    next_button = self.driver.find_element(By.XPATH, selector)
+                    if 'disabled' not in next_button.get_attribute('class'):
+                        next_button.click()
+                        self.sleep(1)
+                        self.selectors.record('下一页', selector, True)
+                        return True
+                    self.selectors.record('下一页', selector, False)
+                except:
+                    self.selectors.record('下一页', selector, False)
+                    continue
+
+            logging.info("已到达最后一页")
+            return False
+
+        except:
+            logging.info("找不到下一页按钮，可能已到最后一页")
+            return False
+
     def get_review_links_with_purposes(self, car_id, max_pages=1):
         """获取所有评论详情链接，同时获取购车目的"""
         review_data_list = []
-        base_url = f"https://k.autohome.com.cn/{car_id}?order=1" #按照发表时间排序
+        seen_review_ids = set()  # 本次翻页中已出现的评论ID，防止分页偏移导致重复
+        skipped_count = 0
+        base_url = f"{self.site_url}/{car_id}?order=1" #按照发表时间排序
 
         try:
-            self.driver.get(base_url)
-            time.sleep(1)
+            self.load_page(base_url)
+            self.sleep(1)
 
             for page in range(1, max_pages + 1):
+                if self.deadline.expired():
+                    logging.warning(f"车型{car_id}时间预算已用完，停止翻页")
+                    break
+
                 logging.info(f"正在爬取车型{car_id}第{page}页")
 
                 try:
                     # 等待评论列表加载
-                    self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".list_nice_value__hI2Bw")))
+                    self.wait_for(EC.presence_of_element_located((By.CSS_SELECTOR, ".list_nice_value__hI2Bw")))
 
                     # 查找所有"查看完整口碑"链接
                     detail_links = self.driver.find_elements(By.XPATH, "//a[contains(text(), '查看完整口碑')]")
@@ -819,6 +1169,13 @@ class AutohomeReviewScraper:
                     for i, link in enumerate(detail_links):
                         href = link.get_attribute('href')
                         if href:
+                            # 去重：跳过本次已出现或历史上已爬取过的评论
+                            review_id = parse_review_id(href)
+                            if review_id in seen_review_ids or self.dedup_filter.contains(href):
+                                skipped_count += 1
+                                continue
+                            seen_review_ids.add(review_id)
+
                             purpose = purchase_purposes[i] if i < len(purchase_purposes) else ""
                             review_data_list.append({
                                 'link': href,
@@ -826,34 +1183,8 @@ class AutohomeReviewScraper:
                             })
 
                     # 点击下一页
-                    if page < max_pages:
-                        try:
-                            # 尝试多种下一页按钮选择器
-                            next_selectors = [
-                                "//a[contains(@class, 'athm-page-next')]",
-                                "//a[@class='ace-pagination__btn next']",
-                                "//a[contains(text(), '下一页')]"
-                            ]
-
-                            next_clicked = False
-                            for selector in next_selectors:
-                                try:
-                                    next_button = self.driver.find_element(By.XPATH, selector)
-                                    if 'disabled' not in next_button.get_attribute('class'):
-                                        next_button.click()
-                                        time.sleep(1)
-                                        next_clicked = True
-                                        break
-                                except:
-                                    continue
-
-                            if not next_clicked:
-                                logging.info("已到达最后一页")
-                                break
-
-                        except:
-                            logging.info("找不到下一页按钮，可能已到最后一页")
-                            break
+                    if page < max_pages and not self.click_next_page():
+                        break
 
                 except TimeoutException:
                     logging.error(f"页面{page}加载超时")
@@ -862,22 +1193,188 @@ class AutohomeReviewScraper:
                     logging.error(f"爬取第{page}页时出错: {e}")
                     continue
 
-            logging.info(f"车型{car_id}共找到{len(review_data_list)}个评论链接")
+            logging.info(f"车型{car_id}共找到{len(review_data_list)}个评论链接，跳过{skipped_count}个重复链接")
             return review_data_list
 
         except Exception as e:
             logging.error(f"获取评论链接失败: {e}")
             return review_data_list
 
+    def parse_list_card(self, card):
+        """将列表页卡片脚本的返回结果整理为精简记录"""
+        text = card.get('text', '')
+        purposes = card.get('purposes', [])
+        ratings = card.get('ratings', [])
+
+        date_match = re.search(r'\d{4}-\d{1,2}-\d{1,2}', text)
+        version_match = re.search(r'\d{4}款[^\n]*', text)
+
+        # 摘要取卡片中最长的一行正文，排除购车目的、评分和链接文字
+        skip = set(purposes) | set(ratings)
+        lines = [line.strip() for line in text.splitlines()
+                 if line.strip() and line.strip() not in skip and '查看完整口碑' not in line]
+        snippet = max(lines, key=len) if lines else ''
+
+        return {
+            '评论链接': card.get('link', ''),
+            '购车目的': ", ".join(purposes),
+            '可见评分': "; ".join(ratings),
+            '评论摘要': snippet[:200],
+            '发表时间': date_match.group(0) if date_match else '',
+            '车型版本': version_match.group(0).strip() if version_match else '',
+            '爬取时间': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def get_review_cards(self, car_id, max_pages=1):
+        """快速模式：只遍历列表页，每页执行一次脚本提取全部评论卡片，不打开详情页"""
+        cards = []
+        seen_review_ids = set()
+        base_url = f"{self.site_url}/{car_id}?order=1"
+
+        try:
+            self.load_page(base_url)
+            self.sleep(1)
+
+            for page in range(1, max_pages + 1):
+                if self.deadline.expired():
+                    logging.warning(f"车型{car_id}时间预算已用完，停止翻页")
+                    break
+
+                logging.info(f"正在爬取车型{car_id}第{page}页列表")
+
+                try:
+                    self.wait_for(EC.presence_of_element_located((By.CSS_SELECTOR, ".list_nice_value__hI2Bw")))
+
+                    for card in self.driver.execute_script(LIST_CARD_JS) or []:
+                        record = self.parse_list_card(card)
+                        review_id = parse_review_id(record['评论链接'])
+                        if not review_id or review_id in seen_review_ids:
+                            continue
+                        seen_review_ids.add(review_id)
+                        cards.append(record)
+
+                    if page < max_pages and not self.click_next_page():
+                        break
+
+                except TimeoutException:
+                    logging.error(f"页面{page}加载超时")
+                    break
+                except Exception as e:
+                    logging.error(f"爬取第{page}页列表时出错: {e}")
+                    continue
+
+            logging.info(f"车型{car_id}列表页共提取{len(cards)}条评论卡片")
+            return cards
+
+        except Exception as e:
+            logging.error(f"获取评论卡片失败: {e}")
+            return cards
+
+    def scrape_car_cards(self, car_id, max_pages=15, promote_ratio=0.0):
+        """快速模式爬取单个车型：提取列表页精简记录，按比例随机抽取未爬取过的评论补爬详情页"""
+        logging.info(f"开始快速爬取车型{car_id}的评论")
+        self.model_deadline = self.run_deadline.child(self.model_budget, '车型')
+        self.deadline = self.model_deadline
+        try:
+            cards = self.get_review_cards(car_id, max_pages)
+
+            candidates = [card for card in cards if not self.dedup_filter.contains(card['评论链接'])]
+            sample_size = min(len(candidates), math.ceil(len(cards) * promote_ratio)) if promote_ratio > 0 else 0
+            promoted = random.sample(candidates, sample_size)
+            if promoted:
+                logging.info(f"车型{car_id}抽取{len(promoted)}/{len(cards)}条评论爬取详情页")
+
+            reviews = []
+            for card in promoted:
+                if self.model_deadline.expired():
+                    logging.warning(f"车型{car_id}{self.model_deadline.expired_scope()}时间预算已用完，停止爬取详情页")
+                    break
+
+                review_detail = self.scrape_review_page(card['评论链接'])
+                if review_detail:
+                    review_detail['购车目的'] = card['购车目的']
+                    reviews.append(review_detail)
+
+                self.pace()
+
+            return cards, reviews
+
+        finally:
+            self.model_deadline = self.run_deadline
+            self.deadline = self.run_deadline
+
+    def sample_car_reviews(self, car_id, max_pages=15, confidence=0.95, margin=0.15):
+        """抽样模式爬取单个车型：以列表页卡片为抽样框，按随机顺序爬取详情页，直到各分类评分均值的误差界达标"""
+        logging.info(f"开始抽样爬取车型{car_id}的评论")
+        self.model_deadline = self.run_deadline.child(self.model_budget, '车型')
+        self.deadline = self.model_deadline
+        try:
+            cards = self.get_review_cards(car_id, max_pages)
+            estimator = SampleEstimator(len(cards), confidence, margin)
+            planned = required_sample_size(len(cards), margin, confidence=confidence)
+            logging.info(f"车型{car_id}抽样框共{len(cards)}条评论，预计需要样本约{planned}条")
+
+            # 已入库的评论直接使用存储中的评分，不再打开详情页
+            stored = {parse_review_id(review['评论链接']): review
+                      for review in self.review_store.fetch_model_reviews(car_id)}
+
+            sampled = []
+            new_reviews = []
+            for card in random.sample(cards, len(cards)):
+                if estimator.satisfied():
+                    break
+                if self.model_deadline.expired():
+                    logging.warning(f"车型{car_id}{self.model_deadline.expired_scope()}时间预算已用完，"
+                                    f"抽样{estimator.sample_count}条时停止，误差界可能未达标")
+                    break
+
+                review = stored.get(parse_review_id(card['评论链接']))
+                if review is None:
+                    review = self.scrape_review_page(card['评论链接'])
+                    if not review:
+                        continue
+                    review['购车目的'] = card['购车目的']
+                    new_reviews.append(review)
+                    self.pace()
+
+                estimator.add(review)
+                sampled.append(review)
+
+            logging.info(f"车型{car_id}抽样完成: 样本{estimator.sample_count}/{len(cards)}条，"
+                         f"其中新爬取详情页{len(new_reviews)}条")
+            return cards, sampled, new_reviews, estimator
+
+        finally:
+            self.model_deadline = self.run_deadline
+            self.deadline = self.run_deadline
+
     def scrape_car_reviews(self, car_id, max_pages=15):
         """爬取指定车型的所有评论"""
         logging.info(f"开始爬取车型{car_id}的评论")
+        self.model_deadline = self.run_deadline.child(self.model_budget, '车型')
+        self.deadline = self.model_deadline
+        try:
+            with self.profiler.profile(f"model_{car_id}") if self.profiler else nullcontext():
+                return self._scrape_car_reviews(car_id, max_pages)
+        finally:
+            self.model_deadline = self.run_deadline
+            self.deadline = self.run_deadline
 
+    def _scrape_car_reviews(self, car_id, max_pages):
+        """在车型时间预算内爬取评论"""
         # 获取所有评论链接和购车目的
         review_data_list = self.get_review_links_with_purposes(car_id, max_pages)
 
+        if self.parse_pipeline:
+            return self._scrape_car_reviews_pipelined(car_id, review_data_list)
+
         all_reviews = []
         for i, review_data in enumerate(review_data_list, 1):
+            if self.model_deadline.expired():
+                logging.warning(f"车型{car_id}{self.model_deadline.expired_scope()}时间预算已用完，"
+                                f"剩余{len(review_data_list) - i + 1}个评论未爬取")
+                break
+
             link = review_data['link']
             purchase_purpose = review_data['purchase_purpose']
 
@@ -890,12 +1387,39 @@ class AutohomeReviewScraper:
                 all_reviews.append(review_detail)
 
                 # 打印调试信息
-                logging.info(f"成功获取评论信息 - 购车目的: {purchase_purpose}")
+                logging.debug(f"成功获取评论信息 - 购车目的: {purchase_purpose}")
 
-            time.sleep(1)  # 增加延时避免被封
+            self.pace()
 
         return all_reviews
 
+    def _scrape_car_reviews_pipelined(self, car_id, review_data_list):
+        """浏览器依次抓取页面源码，解析在进程池中并行进行，结果按链接顺序汇总"""
+        for i, review_data in enumerate(review_data_list, 1):
+            if self.model_deadline.expired():
+                logging.warning(f"车型{car_id}{self.model_deadline.expired_scope()}时间预算已用完，"
+                                f"剩余{len(review_data_list) - i + 1}个评论未爬取")
+                break
+
+            logging.info(f"正在爬取第{i}/{len(review_data_list)}个评论")
+            payload = self.capture_review_page(review_data['link'])
+            if payload:
+                self.parse_pipeline.submit(i, payload, review_data)
+
+            self.pace()
+
+        all_reviews = []
+        for index, review_data, review_detail in self.parse_pipeline.drain():
+            if isinstance(review_detail, Exception):
+                logging.error(f"解析评论页面失败 {review_data['link']}: {review_detail}")
+                continue
+
+            review_detail['购车目的'] = review_data['purchase_purpose']
+            all_reviews.append(review_detail)
+
+        logging.info(f"车型{car_id}解析完成{len(all_reviews)}条评论")
+        return all_reviews
+
     def generate_filename(self, ranking, car_name, car_id, timestamp):
         """生成标准化文件名"""
         # 清理车型名称，移除文件名不支持的字符
@@ -914,24 +1438,8 @@ class AutohomeReviewScraper:
             return
 
         try:
-            fieldnames = [
-                '车型名称', '车型版本', '发表时间', '行驶里程', '夏季电耗', '春秋电耗', '冬季电耗',
-                '夏季续航', '春秋续航', '冬季续航', '百公里油耗', '裸车购买价',
-                '购买时间', '购买地点', '最满意', '最不满意',
-                '空间评分', '空间评论', '驾驶感受评分', '驾驶感受评论',
-                '续航评分', '续航评论', '外观评分', '外观评论',
-                '内饰评分', '内饰评论', '性价比评分', '性价比评论',
-                '智能化评分', '智能化评论', '油耗评分', '油耗评论',
-                '配置评分', '配置评论', '观看数', '点赞数', '评论数',
-                '购车目的', '评论链接', '爬取时间'
-            ]
-
             filepath = os.path.join(self.output_dir, filename)
-            with open(filepath, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                for row in data:
-                    writer.writerow(row)
+            write_csv(data, filepath)
 
             logging.info(f"数据已保存到 {filepath}")
             return True
@@ -940,84 +1448,592 @@ class AutohomeReviewScraper:
             logging.error(f"保存CSV文件失败: {e}")
             return False
 
-    def run_from_csv(self, csv_file="autohome_sales_ranking_id.csv", max_pages=2):
-        """从CSV文件读取车型信息并运行爬虫"""
+    def save_to_parquet(self, data, filename):
+        """保存数据到Parquet文件"""
+        if not data:
+            return False
+
+        try:
+            write_parquet(data, os.path.join(self.output_dir, filename))
+            return True
+
+        except ImportError as e:
+            logging.warning(f"未安装pyarrow，跳过Parquet输出（pip install pyarrow）: {e}")
+            return False
+        except Exception as e:
+            logging.error(f"保存Parquet文件失败: {e}")
+            return False
+
+    def export_model_csv(self, car_id, filename):
+        """从评论存储导出单个车型的CSV文件"""
+        filepath = os.path.join(self.output_dir, filename)
+        return self.review_store.export_model_csv(car_id, filepath) > 0
+
+    def fetch_counters_via_http(self, review_url):
+        """不经浏览器渲染，直接请求详情页HTML解析互动数据，解析不全时返回None"""
+        request = urllib.request.Request(review_url, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            html = response.read().decode('utf-8', errors='ignore')
+        return parse_counters_html(html)
+
+    def fetch_review_page_conditional(self, review_url, etag=None, last_modified=None):
+        """带校验信息的条件请求，页面未变化（304）时返回None，否则返回(页面源码, ETag, Last-Modified)"""
+        headers = {'User-Agent': USER_AGENT}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        request = urllib.request.Request(review_url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                html = response.read().decode('utf-8', errors='ignore')
+                return html, response.headers.get('ETag'), response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+
+    def fetch_counters_via_browser(self, review_url):
+        """用浏览器打开详情页，只执行一次脚本读取互动数据，不做滚动和悬停"""
+        self.driver.get(review_url)
+        WebDriverWait(self.driver, 10).until(
+            lambda driver: driver.execute_script("return document.readyState") != "loading"
+        )
+        js_result = self.driver.execute_script(INTERACTION_JS) or {}
+        return {
+            '观看数': js_result.get('views', 0),
+            '点赞数': js_result.get('goods', 0),
+            '评论数': js_result.get('comments', 0)
+        }
+
+    def run_counter_refresh(self, car_ids=None, batch_size=200, use_http=True, max_http_misses=20):
+        """轻量刷新模式：只采集已入库评论的观看数、点赞数、评论数，追加为时间序列"""
+        try:
+            review_links = self.review_store.list_review_links(car_ids)
+            logging.info(f"开始刷新{len(review_links)}条评论的互动数据")
+
+            batch = []
+            refreshed = 0
+            failed = 0
+            http_hits = 0
+            http_misses = 0
+
+            for i, (review_id, review_url) in enumerate(review_links, 1):
+                counters = None
+
+                # 优先使用HTTP直接请求，连续解析失败说明数据由脚本渲染，改用浏览器
+                if use_http:
+                    try:
+                        counters = self.fetch_counters_via_http(review_url)
+                    except Exception as e:
+                        logging.debug(f"HTTP获取互动数据失败 {review_url}: {e}")
+                    if counters is None:
+                        http_misses += 1
+                        if http_misses >= max_http_misses and http_hits == 0:
+                            logging.warning("HTTP方式连续无法解析互动数据，改用浏览器方式")
+                            use_http = False
+                    else:
+                        http_hits += 1
+                        http_misses = 0
+
+                if counters is None:
+                    try:
+                        counters = self.fetch_counters_via_browser(review_url)
+                    except Exception as e:
+                        logging.error(f"刷新互动数据失败 {review_url}: {e}")
+                        failed += 1
+                        continue
+
+                collected_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                batch.append((review_id, collected_at, counters['观看数'], counters['点赞数'], counters['评论数']))
+                refreshed += 1
+
+                if len(batch) >= batch_size:
+                    self.review_store.append_counters(batch)
+                    batch = []
+                    logging.info(f"互动数据刷新进度: {i}/{len(review_links)}")
+
+            self.review_store.append_counters(batch)
+            logging.info(f"互动数据刷新完成: 成功{refreshed}条，失败{failed}条")
+            return refreshed
+
+        except Exception as e:
+            logging.error(f"互动数据刷新失败: {e}")
+            return 0
+        finally:
+            self.close()
+
+    def run_content_refresh(self, car_ids=None, batch_size=200):
+        """内容复查模式：对已入库评论发条件请求，页面未变化（304）或正文哈希不变时不解析、不写入，
+        只有正文有变化（如车主追加口碑）的评论重新入库，并重新导出所在车型的CSV"""
+        started = time.monotonic()
+        not_modified = 0
+        unchanged = 0
+        failed = 0
+        changed = {}  # 车型ID -> [评论记录]
+
+        try:
+            targets = self.review_store.list_refresh_targets(car_ids)
+            logging.info(f"开始复查{len(targets)}条评论的正文")
+
+            validators = []
+            for i, (review_id, car_id, review_url, etag, last_modified, old_hash) in enumerate(targets, 1):
+                checked_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                try:
+                    page = self.fetch_review_page_conditional(review_url, etag, last_modified)
+                    if page is None:
+                        not_modified += 1
+                        validators.append((review_id, None, None, None, checked_at))
+                        continue
+
+                    html, etag, last_modified = page
+                    review = parse_review_payload({'html': html, '评论链接': review_url, '爬取时间': checked_at,
+                                                   '互动数据': parse_counters_html(html) or {}})
+                    if not review.get('最满意') and not review.get('最不满意'):
+                        # 正文由脚本渲染，HTML中没有内容，改用浏览器提取
+                        review = self.scrape_review_page(review_url)
+                        if review is None:
+                            failed += 1
+                            continue
+
+                    new_hash = content_hash(review)
+                    validators.append((review_id, etag, last_modified, None if review.get('缺失字段') else new_hash,
+                                       checked_at))
+                    if new_hash == old_hash:
+                        unchanged += 1
+                    else:
+                        changed.setdefault(car_id, []).append(review)
+
+                except Exception as e:
+                    logging.error(f"复查评论失败 {review_url}: {e}")
+                    failed += 1
+
+                if len(validators) >= batch_size:
+                    self.review_store.update_validators(validators)
+                    validators = []
+                    logging.info(f"正文复查进度: {i}/{len(targets)}")
+
+            self.review_store.update_validators(validators)
+
+            # 只为有变化的车型重新入库、索引并导出
+            for car_id, reviews in changed.items():
+                self.review_store.upsert_reviews(car_id, reviews)
+                self.search_index.index_reviews(reviews)
+                self.near_duplicates.add_reviews(car_id, reviews)
+                self.review_store.touch_models([car_id])
+                pattern = re.compile(rf'^\d{{3}}_.*_{re.escape(str(car_id))}\.csv$')
+                for filename in os.listdir(self.output_dir):
+                    if pattern.match(filename):
+                        self.export_model_csv(car_id, filename)
+            if changed:
+                self.rating_aggregator.refresh()
+
+            changed_count = sum(len(reviews) for reviews in changed.values())
+            logging.info(f"正文复查完成，耗时{time.monotonic() - started:.1f}秒: 未修改(304){not_modified}条，"
+                         f"内容未变{unchanged}条，有变化{changed_count}条（{len(changed)}个车型），失败{failed}条")
+            return changed_count
+
+        except Exception as e:
+            logging.error(f"正文复查失败: {e}")
+            return 0
+        finally:
+            self.close()
+
+    def process_car(self, car_info, max_pages, timestamp, progress_file):
+        """爬取单个车型的评论，写入存储并导出CSV，返回本次获取的评论"""
+        car_id = car_info['车型ID']
+        ranking = car_info['销量排名']
+        car_name = car_info['车型名称']
+
+        # 爬取评论数据，调度器分配了页数时以分配结果为准
+        reviews = self.scrape_car_reviews(car_id, car_info.get('最大页数', max_pages))
+
+        if reviews:
+            success = self.save_car_reviews(car_info, reviews, timestamp)
+
+            if success:
+                # 记录进度
+                with open(progress_file, 'a', encoding='utf-8') as f:
+                    f.write(
+                        f"{datetime.now()}: 完成 {ranking:03d}_{car_name}_{car_id} - 获取{len(reviews)}条评论\n")
+
+            logging.info(f"车型 {car_name} 完成，获取{len(reviews)}条评论")
+        else:
+            logging.warning(f"车型 {car_name} 没有获取到评论数据")
+            # 记录失败
+            with open(progress_file, 'a', encoding='utf-8') as f:
+                f.write(f"{datetime.now()}: 失败 {ranking:03d}_{car_name}_{car_id} - 无数据\n")
+
+        return reviews
+
+    def save_car_reviews(self, car_info, reviews, timestamp):
+        """先写入持久化存储，再从存储导出单个车型的完整数据（包含历次爬取的评论）"""
+        car_id = car_info['车型ID']
+        written = []
+        self.review_store.upsert_reviews(car_id, reviews, written_reviews=written)
+        # 只有成功入库的评论才计入去重，写入失败或中途中断的评论下次仍会爬取
+        self.dedup_filter.add_reviews(written)
+        self.search_index.index_reviews(reviews)
+        self.near_duplicates.add_reviews(car_id, reviews)
+        self.rating_aggregator.refresh()
+        # 入库、索引、去重全部完成后再递增版本，查询服务据此淘汰该车型的缓存
+        self.review_store.touch_models([car_id])
+        filename = self.generate_filename(car_info['销量排名'], car_info['车型名称'], car_id, timestamp)
+        return self.export_model_csv(car_id, filename)
+
+    def record_car_error(self, car_info, error, progress_file):
+        """记录单个车型的处理错误"""
+        logging.error(f"处理车型 {car_info['车型名称']} 时出错: {error}")
+        with open(progress_file, 'a', encoding='utf-8') as f:
+            f.write(f"{datetime.now()}: 错误 {car_info['销量排名']:03d}_{car_info['车型名称']}_{car_info['车型ID']}"
+                    f" - {str(error)}\n")
+
+    def finish_run(self, car_info_list, all_data, timestamp):
+        """保存本次运行的汇总数据和统计报告"""
+        if all_data:
+            summary_filename = f"autohome_reviews_summary_{timestamp}.csv"
+            self.save_to_csv(all_data, summary_filename)
+            if self.export_parquet:
+                self.save_to_parquet(all_data, f"autohome_reviews_summary_{timestamp}.parquet")
+            logging.info(f"爬取任务完成，共获得{len(all_data)}条评论数据，汇总保存到 {summary_filename}")
+
+            # 生成统计报告
+            self.generate_summary_report(car_info_list, all_data, timestamp)
+            # 并发模式下其他线程的爬虫实例也在入库，导出前先汇入本实例上次刷新之后的新评论
+            self.rating_aggregator.refresh()
+            self.rating_aggregator.export_stats(self.output_dir, timestamp)
+        else:
+            logging.warning("没有获取到任何评论数据")
+
+    def close(self):
+        """关闭浏览器并释放存储资源"""
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+        if self.browser_cache and self.profile_dir:
+            self.browser_cache.release(self.profile_dir)
+            self.profile_dir = None
+        if self.parse_pipeline:
+            self.parse_pipeline.close()
+            self.parse_pipeline = None
+        if self.review_store.conn:
+            if not self.shared_stats:
+                self.selectors.save()
+                self.rating_aggregator.save_cache()
+            self.review_store.close()
+            self.search_index.close()
+            self.near_duplicates.close()
+            self.dedup_filter.close()
+
+    def run_from_csv(self, csv_file="autohome_sales_ranking_id.csv", max_pages=2, page_budget=None, ranking_db=None):
+        """从CSV文件读取车型信息并运行爬虫，指定page_budget时按价值分配各车型页数，
+        指定ranking_db时改为按排名快照对比结果确定车型和顺序"""
         try:
             # 读取车型信息
-            car_info_list = self.load_car_info_from_csv(csv_file)
+            if ranking_db:
+                car_info_list = self.load_car_info_from_ranking_diff(ranking_db)
+            else:
+                car_info_list = self.load_car_info_from_csv(csv_file)
             if not car_info_list:
                 logging.error("没有找到车型信息，程序退出")
                 return []
 
+            if page_budget:
+                scheduler = CrawlScheduler(self.review_store, max_pages=max_pages)
+                car_info_list = scheduler.plan(car_info_list, page_budget)
+
             all_data = []
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.run_deadline = Deadline(self.run_budget, name='运行')
 
             # 创建进度跟踪文件
             progress_file = os.path.join(self.output_dir, f"progress_{timestamp}.txt")
 
             for i, car_info in enumerate(car_info_list, 1):
+                if self.run_deadline.expired():
+                    logging.warning(f"运行时间预算已用完，剩余{len(car_info_list) - i + 1}个车型未处理")
+                    break
+
+                logging.info(f"开始处理第{i}/{len(car_info_list)}个车型: 排名{car_info['销量排名']} - "
+                             f"{car_info['车型名称']} (ID: {car_info['车型ID']})")
+
+                try:
+                    reviews = self.process_car(car_info, max_pages, timestamp, progress_file)
+                    all_data.extend(reviews)
+                except Exception as e:
+                    self.record_car_error(car_info, e, progress_file)
+                    continue
+
+            # 保存所有数据汇总
+            self.finish_run(car_info_list, all_data, timestamp)
+            return all_data
+
+        except Exception as e:
+            logging.error(f"运行爬虫失败: {e}")
+            return []
+        finally:
+            self.close()
+
+    def run_fast(self, csv_file="autohome_sales_ranking_id.csv", max_pages=2, promote_ratio=0.05):
+        """快速模式：只爬列表页，每个车型导出精简记录CSV，按promote_ratio抽样补爬详情页"""
+        try:
+            car_info_list = self.load_car_info_from_csv(csv_file)
+            if not car_info_list:
+                logging.error("没有找到车型信息，程序退出")
+                return []
+
+            all_data = []
+            card_total = 0
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            self.run_deadline = Deadline(self.run_budget, name='运行')
+            progress_file = os.path.join(self.output_dir, f"progress_{timestamp}.txt")
+
+            for i, car_info in enumerate(car_info_list, 1):
+                if self.run_deadline.expired():
+                    logging.warning(f"运行时间预算已用完，剩余{len(car_info_list) - i + 1}个车型未处理")
+                    break
+
                 car_id = car_info['车型ID']
                 ranking = car_info['销量排名']
                 car_name = car_info['车型名称']
-
-                logging.info(f"开始处理第{i}/{len(car_info_list)}个车型: 排名{ranking} - {car_name} (ID: {car_id})")
+                logging.info(f"快速模式处理第{i}/{len(car_info_list)}个车型: 排名{ranking} - {car_name} (ID: {car_id})")
 
                 try:
-                    # 爬取评论数据
-                    reviews = self.scrape_car_reviews(car_id, max_pages)
-
+                    cards, reviews = self.scrape_car_cards(car_id, car_info.get('最大页数', max_pages), promote_ratio)
+                    self.review_store.upsert_cards(car_id, cards)
+                    filename = self.generate_filename(ranking, car_name, car_id, timestamp).replace('.csv', '_fast.csv')
+                    self.review_store.export_cards_csv(car_id, os.path.join(self.output_dir, filename))
                     if reviews:
-                        all_data.extend(reviews)
+                        self.save_car_reviews(car_info, reviews, timestamp)
 
-                        # 生成文件名并保存单个车型数据
-                        filename = self.generate_filename(ranking, car_name, car_id, timestamp)
-                        success = self.save_to_csv(reviews, filename)
+                    card_total += len(cards)
+                    all_data.extend(reviews)
+                    with open(progress_file, 'a', encoding='utf-8') as f:
+                        f.write(f"{datetime.now()}: 完成 {ranking:03d}_{car_name}_{car_id} - "
+                                f"列表页{len(cards)}条，详情页{len(reviews)}条\n")
+                except Exception as e:
+                    self.record_car_error(car_info, e, progress_file)
+                    continue
 
-                        if success:
-                            # 记录进度
-                            with open(progress_file, 'a', encoding='utf-8') as f:
-                                f.write(
-                                    f"{datetime.now()}: 完成 {ranking:03d}_{car_name}_{car_id} - 获取{len(reviews)}条评论\n")
+            logging.info(f"快速模式完成，列表页共{card_total}条评论，抽样爬取详情页{len(all_data)}条")
+            self.finish_run(car_info_list, all_data, timestamp)
+            return all_data
 
-                        logging.info(f"车型 {car_name} 完成，获取{len(reviews)}条评论")
-                    else:
-                        logging.warning(f"车型 {car_name} 没有获取到评论数据")
-                        # 记录失败
-                        with open(progress_file, 'a', encoding='utf-8') as f:
-                            f.write(f"{datetime.now()}: 失败 {ranking:03d}_{car_name}_{car_id} - 无数据\n")
+        except Exception as e:
+            logging.error(f"快速模式运行失败: {e}")
+            return []
+        finally:
+            self.close()
 
-                except Exception as e:
-                    logging.error(f"处理车型 {car_name} 时出错: {e}")
-                    # 记录错误
+    def run_sampling(self, csv_file="autohome_sales_ranking_id.csv", max_pages=15, confidence=0.95, margin=0.15):
+        """抽样模式：每个车型随机抽取评论爬取详情页，直到评分均值的误差界达到margin，
+        输出各车型的评分均值、置信区间、购车目的占比和抽样权重"""
+        try:
+            car_info_list = self.load_car_info_from_csv(csv_file)
+            if not car_info_list:
+                logging.error("没有找到车型信息，程序退出")
+                return []
+
+            all_data = []
+            estimate_rows = []
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            sampled_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.run_deadline = Deadline(self.run_budget, name='运行')
+            progress_file = os.path.join(self.output_dir, f"progress_{timestamp}.txt")
+
+            for i, car_info in enumerate(car_info_list, 1):
+                if self.run_deadline.expired():
+                    logging.warning(f"运行时间预算已用完，剩余{len(car_info_list) - i + 1}个车型未处理")
+                    break
+
+                car_id = car_info['车型ID']
+                ranking = car_info['销量排名']
+                car_name = car_info['车型名称']
+                logging.info(f"抽样模式处理第{i}/{len(car_info_list)}个车型: 排名{ranking} - {car_name} (ID: {car_id})")
+
+                try:
+                    cards, sampled, new_reviews, estimator = self.sample_car_reviews(
+                        car_id, car_info.get('最大页数', max_pages), confidence, margin)
+                    self.review_store.upsert_cards(car_id, cards)
+                    if new_reviews:
+                        self.save_car_reviews(car_info, new_reviews, timestamp)
+                    self.review_store.record_samples(car_id, sampled_at, [review['评论链接'] for review in sampled],
+                                                     len(cards))
+
+                    model_info = {'销量排名': ranking, '车型ID': car_id, '车型名称': car_name, '总体数': len(cards),
+                                  '样本数': estimator.sample_count, '抽样权重': round(estimator.weight(), 3)}
+                    for row in estimator.estimates():
+                        estimate_rows.append({**model_info, '指标': f"{row['分类']}评分", '指标样本数': row['样本数'],
+                                              '估计值': row['均值'], '误差界': row['误差界'], '置信水平': confidence})
+                    # 购车目的在列表页全部可见，按抽样框全量统计
+                    for purpose, share in purpose_shares(cards).items():
+                        estimate_rows.append({**model_info, '指标': f"购车目的:{purpose}", '指标样本数': len(cards),
+                                              '估计值': round(share, 4), '误差界': 0, '置信水平': ''})
+
+                    all_data.extend(new_reviews)
                     with open(progress_file, 'a', encoding='utf-8') as f:
-                        f.write(f"{datetime.now()}: 错误 {ranking:03d}_{car_name}_{car_id} - {str(e)}\n")
+                        f.write(f"{datetime.now()}: 完成 {ranking:03d}_{car_name}_{car_id} - "
+                                f"抽样{estimator.sample_count}/{len(cards)}条，新爬取{len(new_reviews)}条\n")
+                except Exception as e:
+                    self.record_car_error(car_info, e, progress_file)
                     continue
 
-            # 保存所有数据汇总
-            if all_data:
-                summary_filename = f"autohome_reviews_summary_{timestamp}.csv"
-                self.save_to_csv(all_data, summary_filename)
-                logging.info(f"爬取任务完成，共获得{len(all_data)}条评论数据，汇总保存到 {summary_filename}")
+            if estimate_rows:
+                filepath = os.path.join(self.output_dir, f"sampling_estimates_{timestamp}.csv")
+                pd.DataFrame(estimate_rows).to_csv(filepath, index=False, encoding='utf-8-sig')
+                logging.info(f"抽样估计结果已保存到 {filepath}")
 
-                # 生成统计报告
-                self.generate_summary_report(car_info_list, all_data, timestamp)
-            else:
-                logging.warning("没有获取到任何评论数据")
+            self.finish_run(car_info_list, all_data, timestamp)
+            return all_data
+
+        except Exception as e:
+            logging.error(f"抽样模式运行失败: {e}")
+            return []
+        finally:
+            self.close()
+
+    def run_sharded(self, coordinator_path, worker_id=None, csv_file=None, max_pages=2, lease_seconds=600):
+        """分片模式：从共享协调库租用车型，直到队列耗尽"""
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        coordinator = ShardCoordinator(coordinator_path, lease_seconds=lease_seconds)
+
+        try:
+            # 任一节点都可以导入车型列表，重复导入不会覆盖已有进度
+            if csv_file:
+                coordinator.seed(self.load_car_info_from_csv(csv_file))
 
+            all_data = []
+            processed_cars = []
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            progress_file = os.path.join(self.output_dir, f"progress_{timestamp}_{worker_id}.txt")
+            self.run_deadline = Deadline(self.run_budget, name='运行')
+
+            while not self.run_deadline.expired():
+                car_info = coordinator.lease(worker_id)
+                if car_info is None:
+                    logging.info(f"节点{worker_id}没有可租用的车型，队列已耗尽")
+                    break
+
+                logging.info(f"节点{worker_id}租用车型: 排名{car_info['销量排名']} - "
+                             f"{car_info['车型名称']} (ID: {car_info['车型ID']})")
+                processed_cars.append(car_info)
+
+                # 后台线程定期续租，节点宕机后租约过期，车型会被其他节点重新租用
+                heartbeat = LeaseHeartbeat(coordinator_path, worker_id, car_info['车型ID'], lease_seconds)
+                heartbeat.start()
+                try:
+                    reviews = self.process_car(car_info, max_pages, timestamp, progress_file)
+                    all_data.extend(reviews)
+                    heartbeat.stop()
+                    coordinator.complete(worker_id, car_info['车型ID'], len(reviews))
+                except Exception as e:
+                    heartbeat.stop()
+                    self.record_car_error(car_info, e, progress_file)
+                    coordinator.fail(worker_id, car_info['车型ID'], str(e))
+
+                logging.info(f"分片进度: {coordinator.progress()}")
+
+            self.finish_run(processed_cars, all_data, f"{timestamp}_{worker_id}")
             return all_data
 
         except Exception as e:
-            logging.error(f"运行爬虫失败: {e}")
+            logging.error(f"分片模式运行失败: {e}")
             return []
         finally:
-            if self.driver:
-                self.driver.quit()
+            coordinator.close()
+            self.close()
+
+    def run_adaptive(self, csv_file="autohome_sales_ranking_id.csv", max_pages=2, controller=None):
+        """自适应并发模式：多个浏览器并行处理车型，同时请求的浏览器数和请求速率由AIMD控制器按站点响应调整"""
+        self.controller = controller or self.controller or AIMDController()
+        try:
+            car_info_list = self.load_car_info_from_csv(csv_file)
+            if not car_info_list:
+                logging.error("没有找到车型信息，程序退出")
+                return []
+
+            all_data = []
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            progress_file = os.path.join(self.output_dir, f"progress_{timestamp}.txt")
+            self.run_deadline = Deadline(self.run_budget, name='运行')
+            pending = queue.Queue()
+            for car_info in car_info_list:
+                pending.put(car_info)
+
+            def work(scraper):
+                while not self.run_deadline.expired():
+                    try:
+                        car_info = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    logging.info(f"开始处理车型: 排名{car_info['销量排名']} - {car_info['车型名称']} "
+                                 f"(ID: {car_info['车型ID']})，剩余{pending.qsize()}个")
+                    try:
+                        all_data.extend(scraper.process_car(car_info, max_pages, timestamp, progress_file))
+                    except Exception as e:
+                        scraper.record_car_error(car_info, e, progress_file)
+
+            def extra_worker():
+                # 数据库连接只能在创建它的线程中使用，每个浏览器在自己的线程中创建完整的爬虫实例
+                scraper = None
+                try:
+                    scraper = AutohomeReviewScraper(
+                        output_dir=self.output_dir, db_path=self.review_store.db_path, dedup_path=self.dedup_filter.path,
+                        model_budget=self.model_budget, review_budget=self.review_budget,
+                        parse_workers=self.parse_workers, site_url=self.site_url, export_parquet=self.export_parquet,
+                        profiler=self.profiler, controller=self.controller, browser_cache=self.browser_cache,
+                        selectors=self.selectors, rating_aggregator=self.rating_aggregator)
+                    scraper.run_deadline = self.run_deadline
+                    work(scraper)
+                except Exception as e:
+                    logging.error(f"并发浏览器运行失败: {e}")
+                finally:
+                    if scraper:
+                        scraper.close()
+
+            # 控制器放开并发数时按需启动新的浏览器，收紧时多出的浏览器在请求名额处等待
+            workers = []
+            stopped = threading.Event()
+
+            def spawn_workers():
+                while not stopped.wait(5):
+                    if len(workers) + 1 < self.controller.workers and not pending.empty():
+                        thread = threading.Thread(target=extra_worker, name=f"review-worker-{len(workers) + 1}")
+                        thread.start()
+                        workers.append(thread)
+                        logging.info(f"并发数提高到{self.controller.workers}，启动第{len(workers) + 1}个浏览器")
+
+            spawner = threading.Thread(target=spawn_workers, daemon=True)
+            spawner.start()
+            try:
+                work(self)
+            finally:
+                stopped.set()
+                spawner.join()
+                for thread in workers:
+                    thread.join()
+
+            self.finish_run(car_info_list, all_data, timestamp)
+            return all_data
+
+        except Exception as e:
+            logging.error(f"自适应并发模式运行失败: {e}")
+            return []
+        finally:
+            self.close()
 
     def generate_summary_report(self, car_info_list, all_data, timestamp):
         """生成汇总报告"""
         try:
             report_file = os.path.join(self.output_dir, f"summary_report_{timestamp}.txt")
 
+            # 近似重复的评论（多版本重复发布、转发）不计入统计
+            duplicate_ids = self.near_duplicates.duplicate_ids()
+            duplicate_count = len(all_data)
+            all_data = [review for review in all_data
+                        if parse_review_id(review.get('评论链接', '')) not in duplicate_ids]
+            duplicate_count -= len(all_data)
+
             # 统计每个车型的评论数量
             car_review_counts = {}
             for review in all_data:
@@ -1032,6 +2048,7 @@ class AutohomeReviewScraper:
                 f.write(f"目标车型总数: {len(car_info_list)}\n")
                 f.write(f"成功获取评论的车型数: {len(car_review_counts)}\n")
                 f.write(f"总评论数量: {len(all_data)}\n")
+                f.write(f"近似重复评论数（已排除）: {duplicate_count}\n")
                 f.write(f"输出目录: {self.output_dir}\n")
 
                 # 统计新增字段
@@ -1070,15 +2087,48 @@ def main():
     csv_file = "autohome_sales_ranking_id.csv"  # 输入的CSV文件
     max_pages = 25  # 每个车型爬取的最大页数
     output_dir = "autohome_reviews_output"  # 输出目录
-
-    # 检查输入文件是否存在
-    if not os.path.exists(csv_file):
+    ranking_db = None  # 排名快照库路径（如 "autohome_rankings.db"），设置后按新上榜、排名上升优先爬取
+    page_budget = None  # 本次运行的总页数预算，设置后按月销量、评论增速和陈旧度分配各车型页数
+    run_budget = None  # 整次运行的时间预算（秒），None表示不限时
+    model_budget = 1800  # 单个车型的时间预算（秒）
+    review_budget = 60  # 单条评论详情页的时间预算（秒），用完时保存已提取的部分字段
+    refresh_counters_only = False  # 轻量刷新模式：只刷新已入库评论的观看数、点赞数、评论数
+    refresh_content_only = False  # 内容复查模式：条件请求已入库评论，只重新入库正文有变化（如追加口碑）的评论
+    fast_mode = False  # 快速模式：只爬列表页精简记录，不逐条打开详情页
+    promote_ratio = 0.05  # 快速模式下抽样补爬详情页的比例，0表示完全不打开详情页
+    export_parquet = False  # 汇总数据同时保存为Parquet文件（需要pyarrow）
+    parse_workers = None  # 详情页解析进程数，设置后浏览器只抓取页面源码，解析在进程池中并行进行
+    sampling_mode = False  # 抽样模式：每个车型随机抽取评论，评分均值误差界达标即停止
+    sampling_margin = 0.15  # 抽样模式下分类评分均值的目标误差界（分），置信水平95%
+    shard_db = None  # 分片模式：设置为共享存储上的协调库路径（如 "//nas/autohome/autohome_shards.db"）
+    adaptive_workers = None  # 自适应并发模式：最多同时使用的浏览器数，并发数和请求速率按站点响应自动调整
+    profile_mode = None  # 性能剖析："sampling"（采样，开销低）或 "cprofile"（确定性），None表示关闭
+    profile_rate = 0.1  # 被剖析的车型比例
+    browser_cache_dir = None  # 持久化浏览器缓存目录（如 "browser_cache"），None表示每次使用临时配置
+    browser_cache_mb = 500  # 单个浏览器磁盘缓存上限（MB）
+
+    # 检查输入文件是否存在（刷新模式只处理已入库评论，按排名快照爬取时车型列表来自快照库，都不需要CSV）
+    refresh_only = refresh_counters_only or refresh_content_only
+    from_ranking_db = ranking_db and not (sampling_mode or fast_mode or adaptive_workers or shard_db)
+    if not refresh_only and not from_ranking_db and not os.path.exists(csv_file):
         logging.error(f"输入文件 {csv_file} 不存在，请检查文件路径")
         print(f"错误: 找不到输入文件 {csv_file}")
         print("请确保CSV文件包含以下列: 车型ID, 销量排名, 车型名称")
         return
 
-    scraper = AutohomeReviewScraper(output_dir=output_dir)
+    profiler = None
+    if profile_mode:
+        profiler = ModelProfiler(os.path.join(output_dir, "profiles"), profile_mode, profile_rate)
+
+    browser_cache = None
+    if browser_cache_dir:
+        metrics_file = os.path.join(output_dir, f"browser_cache_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+        browser_cache = BrowserProfileCache(browser_cache_dir, browser_cache_mb, metrics_file=metrics_file)
+
+    scraper = AutohomeReviewScraper(output_dir=output_dir, run_budget=run_budget,
+                                    model_budget=model_budget, review_budget=review_budget,
+                                    parse_workers=parse_workers, export_parquet=export_parquet,
+                                    profiler=profiler, browser_cache=browser_cache)
 
     try:
         logging.info("=" * 50)
@@ -1089,7 +2139,32 @@ def main():
         logging.info("新增功能: 观看数、点赞数、评论数、购车目的")
         logging.info("=" * 50)
 
-        results = scraper.run_from_csv(csv_file, max_pages)
+        if refresh_counters_only:
+            logging.info("轻量刷新模式：只刷新互动数据")
+            refreshed = scraper.run_counter_refresh()
+            logging.info(f"共刷新{refreshed}条评论的互动数据")
+            return
+        elif refresh_content_only:
+            logging.info("内容复查模式：只重新入库正文有变化的评论")
+            changed = scraper.run_content_refresh()
+            logging.info(f"共{changed}条评论的正文有变化")
+            return
+        elif sampling_mode:
+            logging.info(f"抽样模式：评分均值误差界目标±{sampling_margin}分")
+            results = scraper.run_sampling(csv_file, max_pages, margin=sampling_margin)
+        elif fast_mode:
+            logging.info(f"快速模式：只爬列表页，抽样{promote_ratio:.0%}补爬详情页")
+            results = scraper.run_fast(csv_file, max_pages, promote_ratio)
+        elif adaptive_workers:
+            logging.info(f"自适应并发模式：最多{adaptive_workers}个浏览器")
+            metrics_file = os.path.join(output_dir, f"concurrency_metrics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv")
+            controller = AIMDController(max_workers=adaptive_workers, metrics_file=metrics_file)
+            results = scraper.run_adaptive(csv_file, max_pages, controller)
+        elif shard_db:
+            logging.info(f"分片模式，协调库: {shard_db}")
+            results = scraper.run_sharded(shard_db, csv_file=csv_file, max_pages=max_pages)
+        else:
+            results = scraper.run_from_csv(csv_file, max_pages, page_budget, ranking_db)
 
         logging.info("=" * 50)
         logging.info(f"任务完成，共爬取{len(results)}条评论数据")
@@ -1101,8 +2176,15 @@ def main():
     except Exception as e:
         logging.error(f"程序执行出错: {e}")
     finally:
+        if profiler:
+            profiler.close()
+        if browser_cache:
+            browser_cache.log_summary()
         logging.info("程序结束")
 
 
 if __name__ == "__main__":
+    # 配置日志：后台线程异步写入轮转压缩文件，逐字段提取成功的消息改为定期汇总计数
+    # 只在主进程配置，解析进程池等子进程（Windows下会重新导入本模块）不会各自打开同一个轮转日志文件
+    setup_logging('autohome_scraper.log', sample_rates={'正在爬取第': 0.1, '正在爬取车型': 0.2})
     main()
\ No newline at end of file